@@ -0,0 +1,155 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.fixtures import write_pdf, write_images, synthetic_text
+from benchmarks.harness import measure, peak_rss_mb, hit_rate
+from benchmarks.stub_server import StubTranslationServer
+from polybiblioglot.components import Converter, MultiTranslator, OcrCache, TranslationMemory, Preprocessor, \
+    DEFAULT_OCR_PROFILE, OCR_PROFILES, DEFAULT_OCR_BACKEND, OCR_BACKENDS, TRANSLATOR_TYPES
+
+# Version of the JSON output, bumped when its structure changes
+SCHEMA_VERSION = 1
+STAGES = ('rasterize', 'convert_pdf', 'convert_file', 'translate')
+
+parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                 description='Benchmarks the conversion and translation pipelines on synthetic '
+                                             'documents derived from sample_files/page.jpg')
+parser.add_argument('--sizes', action='store', default='1,5,20',
+                    help='comma separated number of pages of the synthetic documents')
+parser.add_argument('--stages', action='store', default=','.join(STAGES),
+                    help=f'comma separated stages to run ({", ".join(STAGES)})')
+parser.add_argument('--runs', action='store', type=int, default=2,
+                    help='number of runs of every stage. Caches are cold on the first run and warm afterwards.')
+parser.add_argument('-w', '--workers', action='store', type=int, default=1, help='number of OCR worker processes')
+parser.add_argument('-p', '--profile', action='store', default=DEFAULT_OCR_PROFILE, choices=list(OCR_PROFILES.keys()))
+parser.add_argument('--ocr-backend', action='store', default=DEFAULT_OCR_BACKEND, choices=list(OCR_BACKENDS.keys()))
+parser.add_argument('--preprocess', action='store', default=None, help='preprocessing steps (see polybiblioglot)')
+parser.add_argument('--no-cache', action='store_true', help='disable the OCR cache and translation memory')
+parser.add_argument('--concurrency', action='store', type=int, default=4, help='translation requests in flight')
+parser.add_argument('--stub-latency', action='store', type=float, default=0.05,
+                    help='latency of the stub translation server, in seconds')
+parser.add_argument('--seed', action='store', type=int, default=0, help='seed of the synthetic documents')
+parser.add_argument('-o', '--output', action='store', default='-', help="JSON output file ('-' for stdout)")
+parser.add_argument('-l', '--log-level', action='store', default='WARNING')
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_stage(stage: str, size: int, run: int, pages, cache=None) -> dict:
+    """
+    Runs and measures a single stage.
+
+    :param stage: stage name
+    :param size: number of pages of the document
+    :param run: run number (1 is the cold run)
+    :param pages: iterable yielding the pages produced by the stage
+    :param cache: (optional) cache used by the stage (OcrCache or TranslationMemory), its hit rate is reported
+    :return: result record
+    """
+    record = {'stage': stage, 'size': size, 'run': run, 'error': None, 'cache': None}
+    before = cache.stats() if cache is not None else None
+    try:
+        record.update(measure(pages))
+    except Exception as e:
+        record['error'] = f'{type(e).__name__}: {e}'
+    if cache is not None:
+        record['cache'] = hit_rate(before, cache.stats())
+    record['peak_rss_mb'] = peak_rss_mb()
+    return record
+
+
+def report(record: dict):
+    if record['error'] is not None:
+        line = f'error: {record["error"]}'
+    else:
+        latency = record['latency_ms']
+        line = (f'{record["pages_per_second"]:8.2f} pages/s  p50 {latency["p50"]:8.1f}ms  p90 {latency["p90"]:8.1f}ms'
+                f'  p99 {latency["p99"]:8.1f}ms')
+        if record['cache'] is not None and record['cache']['hit_rate'] is not None:
+            line += f'  hit rate {record["cache"]["hit_rate"]:.0%}'
+    print(f'{record["stage"]:>12} {record["size"]:>5} pages  run {record["run"]}  {line}', file=sys.stderr)
+
+
+def main(args) -> dict:
+    logging.basicConfig(level=args.log_level)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    stages = [stage.strip() for stage in args.stages.split(',')]
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error(f'Unknown stage: {stage}')
+
+    started = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    results = []
+    with tempfile.TemporaryDirectory(prefix='polybiblioglot-benchmark-') as directory:
+        cache = None if args.no_cache else OcrCache(os.path.join(directory, 'ocr_cache'))
+        memory = None if args.no_cache else TranslationMemory(os.path.join(directory, 'memory.sqlite3'))
+        preprocessor = Preprocessor.from_steps(args.preprocess) if args.preprocess else None
+        converter = Converter(workers=args.workers, cache=cache, profile=args.profile, ocr_backend=args.ocr_backend,
+                              preprocessor=preprocessor)
+        server = StubTranslationServer(latency=args.stub_latency).start()
+        translator = MultiTranslator(TRANSLATOR_TYPES.ibm, memory=memory, max_concurrency=args.concurrency,
+                                     ibm_url=server.url)
+        try:
+            for size in sizes:
+                # every size gets its own pages, so the first run of every size starts with cold caches
+                seed = args.seed * 1000 + size
+                pdf_path = write_pdf(os.path.join(directory, f'document_{size}.pdf'), size, seed=seed)
+                image_paths = write_images(os.path.join(directory, f'images_{size}'), size, seed=seed)
+                texts = synthetic_text(size, seed=seed)
+                for run in range(1, args.runs + 1):
+                    for stage in stages:
+                        if stage == 'rasterize':
+                            record = run_stage(stage, size, run, Converter.iter_pdf_images(
+                                pdf_path, dpi=converter.profile.dpi, grayscale=converter.profile.grayscale))
+                        elif stage == 'convert_pdf':
+                            record = run_stage(stage, size, run, converter.iter_pdf(pdf_path), cache)
+                        elif stage == 'convert_file':
+                            record = run_stage(stage, size, run, (page for path in image_paths
+                                                                  for page in converter.iter_file(path)), cache)
+                        else:
+                            record = run_stage(stage, size, run, (
+                                translator.translate(text, 'de', 'fr', authentication={'token': 'benchmark'})
+                                for text in texts), memory)
+                        report(record)
+                        results += [record]
+        finally:
+            server.stop()
+            converter.close()
+            if memory is not None:
+                memory.close()
+
+    return {
+        'schema': SCHEMA_VERSION,
+        'started': started,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': vars(args),
+        'preprocessing': preprocessor.stats() if preprocessor is not None else None,
+        'stub_server': {'requests': server.requests, 'segments': server.segments},
+        'results': results,
+    }
+
+
+if __name__ == '__main__':
+    arguments = parser.parse_args()
+    output = json.dumps(main(arguments), indent=2)
+    if arguments.output == '-':
+        print(output)
+    else:
+        with open(arguments.output, 'w') as f:
+            f.write(output)
@@ -0,0 +1,88 @@
+import os
+import random
+
+from PIL import Image, ImageEnhance
+
+from polybiblioglot.lang.samples import samples
+
+# Page every synthetic document is derived from
+SEED_PAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_files', 'page.jpg')
+
+
+def synthetic_pages(count: int, seed: int = 0, seed_page: str = SEED_PAGE, width: int = 1700):
+    """
+    Generates pages derived from a seed page. Every page is slightly rotated, shifted and has a different contrast, so
+    caches and duplicate detection don't short-circuit the pipeline: every page costs a full OCR.
+
+    :param count: number of pages
+    :param seed: random seed, the same seed always generates the same pages
+    :param seed_page: path to the seed page image
+    :param width: width of the pages in pixels (about 200 dpi for an A4 page by default)
+    :return: generator of PIL images
+    """
+    rng = random.Random(seed)
+    base = Image.open(seed_page).convert('RGB')
+    if base.width > base.height:
+        base = base.rotate(90, expand=True)
+    base = base.resize((width, round(base.height * width / base.width)), Image.LANCZOS)
+    for _ in range(count):
+        page = base.rotate(rng.uniform(-1.5, 1.5), resample=Image.BILINEAR, fillcolor=(255, 255, 255),
+                           translate=(rng.randint(-20, 20), rng.randint(-20, 20)))
+        yield ImageEnhance.Contrast(page).enhance(rng.uniform(0.8, 1.2))
+
+
+def write_pdf(path: str, count: int, seed: int = 0, dpi: int = 200) -> str:
+    """
+    Writes a synthetic multi-page pdf (see synthetic_pages).
+
+    :param path: path of the pdf
+    :param count: number of pages
+    :param seed: random seed
+    :param dpi: resolution stored in the pdf
+    :return: path
+    """
+    pages = list(synthetic_pages(count, seed=seed))
+    pages[0].save(path, format='PDF', save_all=True, append_images=pages[1:], resolution=dpi)
+    return path
+
+
+def write_images(directory: str, count: int, seed: int = 0) -> [str]:
+    """
+    Writes synthetic pages as separate PNG images (see synthetic_pages).
+
+    :param directory: directory the images are written to
+    :param count: number of images
+    :param seed: random seed
+    :return: paths of the images
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for number, page in enumerate(synthetic_pages(count, seed=seed), start=1):
+        paths += [os.path.join(directory, f'page_{number:04}.png')]
+        page.save(paths[-1])
+    return paths
+
+
+def synthetic_text(count: int, seed: int = 0, language: str = 'de', page_chars: int = 1800) -> [str]:
+    """
+    Generates pages of text to translate, made of words of a reference text (see polybiblioglot.lang.samples) in a
+    random order. Paragraphs and sentences vary, so the translation memory doesn't short-circuit the first run.
+
+    :param count: number of pages
+    :param seed: random seed
+    :param language: language code of the words
+    :param page_chars: approximate number of characters per page
+    :return: list of pages
+    """
+    rng = random.Random(seed)
+    words = samples[language].replace('.', '').replace(',', '').split()
+    pages = []
+    for _ in range(count):
+        paragraphs, length = [], 0
+        while length < page_chars:
+            sentences = [' '.join(rng.choice(words) for _ in range(rng.randint(6, 20))).capitalize() + '.'
+                         for _ in range(rng.randint(2, 6))]
+            paragraphs += [' '.join(sentences)]
+            length += len(paragraphs[-1])
+        pages += ['\n\n'.join(paragraphs)]
+    return pages
@@ -0,0 +1,74 @@
+import math
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Latency percentiles reported for every stage
+PERCENTILES = (50, 90, 99)
+
+
+def percentiles(values: [float], points: (int,) = PERCENTILES) -> dict:
+    """
+    Computes nearest-rank percentiles.
+
+    :param values: measurements
+    :param points: percentiles to compute (0 to 100)
+    :return: dictionary mapping 'p<point>' to the percentile, plus 'max'. Values are None when there is no measurement.
+    """
+    ordered = sorted(values)
+    result = {f'p{point}': ordered[max(math.ceil(point / 100 * len(ordered)) - 1, 0)] if ordered else None
+              for point in points}
+    result['max'] = ordered[-1] if ordered else None
+    return result
+
+
+def peak_rss_mb() -> dict:
+    """
+    Returns the peak resident set size of the benchmark process and of its (finished) child processes, such as
+    tesseract and the OCR workers. Peaks only ever grow during a process' lifetime, so they are cumulative over runs.
+
+    :return: dictionary with the 'self' and 'children' peaks in MiB (None when unavailable)
+    """
+    if resource is None:
+        return {'self': None, 'children': None}
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit,
+            'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit}
+
+
+def measure(items) -> dict:
+    """
+    Consumes an iterable of pages (eg. Converter.iter_pdf) and measures how fast pages come out of it.
+    The latency of a page is the time elapsed since the previous page (or since the start for the first page), which is
+    what a user waiting on the pipeline experiences.
+
+    :param items: iterable yielding one element per page
+    :return: dictionary with the number of 'pages', the elapsed 'seconds', 'pages_per_second' and 'latency_ms'
+    percentiles
+    """
+    latencies = []
+    start = previous = time.perf_counter()
+    for _ in items:
+        now = time.perf_counter()
+        latencies += [(now - previous) * 1000]
+        previous = now
+    seconds = time.perf_counter() - start
+    return {'pages': len(latencies), 'seconds': seconds,
+            'pages_per_second': len(latencies) / seconds if seconds else None, 'latency_ms': percentiles(latencies)}
+
+
+def hit_rate(before: dict, after: dict) -> dict:
+    """
+    Returns the cache statistics of a run given the statistics of a cache (see OcrCache.stats) before and after it.
+
+    :param before: statistics before the run
+    :param after: statistics after the run
+    :return: dictionary with the 'hits', 'misses' and 'hit_rate' of the run
+    """
+    hits, misses = after['hits'] - before['hits'], after['misses'] - before['misses']
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses) if hits + misses else None}
@@ -0,0 +1,74 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        self.server.count_request(len(body.get('text', [])))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        # the "translation" of a segment is the segment upper cased, so outputs are easy to check
+        response = json.dumps({'translations': [{'translation': text.upper()} for text in body.get('text', [])],
+                               'word_count': sum(len(text.split()) for text in body.get('text', [])),
+                               'character_count': sum(len(text) for text in body.get('text', []))}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *_):
+        pass
+
+
+class StubTranslationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        """
+        Local HTTP server answering like the IBM translation API (see MultiTranslator's ibm_url), so translation
+        benchmarks measure the client and not the network or a remote service.
+        The server runs in a background thread between start and stop (or in a with block).
+
+        :param latency: time spent by the server on every request, in seconds (simulates the API's latency)
+        :param host: interface to listen on
+        :param port: port to listen on, a free port is picked when 0
+        """
+        super().__init__((host, port), _StubHandler)
+        self.latency = latency
+        self.requests = 0
+        self.segments = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v3/translate?version=2018-05-01'
+
+    def count_request(self, segments: int):
+        with self._lock:
+            self.requests += 1
+            self.segments += segments
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+        return False
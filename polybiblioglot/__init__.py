@@ -1,2 +1,12 @@
-from .polybiblioglot import Polybiblioglot, Payload
+import importlib
+
 __all__ = ["polybiblioglot", "Polybiblioglot", "Payload"]
+
+
+def __getattr__(name):
+    # the GUI (and dearpygui) is only imported when it is used, so the headless commands (batch, worker, coordinator,
+    # search) and the components run on machines without the GUI toolkit
+    if name in ("polybiblioglot", "Polybiblioglot", "Payload"):
+        gui = importlib.import_module(f"{__name__}.polybiblioglot")
+        return gui if name == "polybiblioglot" else getattr(gui, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
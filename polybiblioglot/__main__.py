@@ -1,16 +1,166 @@
 import argparse
+import json
 import logging
+import os
+import sys
+
+from polybiblioglot.batch import BatchRunner, collect_inputs, resolve_language
+from polybiblioglot.distributed import Coordinator, QueueWorker
+from polybiblioglot.lang import AUTO_DETECT
+from polybiblioglot.components import Converter, MultiTranslator, OcrCache, TranslationMemory, Preprocessor, \
+    Metrics, SearchIndex, OcrAutoscaler, WorkQueue, QueueServer, RemoteQueue, is_loopback, DEFAULT_SEARCH_INDEX, \
+    DEFAULT_WORK_QUEUE, PREPROCESSING_STEPS, DEFAULT_JOURNAL_DIR, DEFAULT_OCR_PROFILE, OCR_PROFILES, \
+    DEFAULT_OCR_BACKEND, OCR_BACKENDS, TRANSLATOR_TYPES, TRANSLATION_BACKENDS, DEFAULT_PHRASE_TABLE_DIR
+
+
+def shared_options(command: bool = False) -> argparse.ArgumentParser:
+    """
+    Returns a parser holding the options shared by the GUI and the batch, coordinator and worker commands, so they can
+    be given before or after the command.
+
+    :param command: build the copy attached to a command. It leaves options that aren't given unset, so they don't
+    override the ones given before the command.
+    :return: parent parser
+    """
+    options = argparse.ArgumentParser(add_help=False)
+
+    def default(value):
+        return argparse.SUPPRESS if command else value
+
+    options.add_argument('-l', '--log-level', action='store', default=default('INFO'), dest='log_level')
+    options.add_argument('-w', '--workers', action='store', type=int, default=default(1), dest='workers',
+                         help='number of OCR worker processes (0 = one per CPU)')
+    options.add_argument('--autoscale', action='store_true', default=default(False), dest='autoscale',
+                         help='tune how many pages are OCR\'d at once and how many tesseract threads each uses from '
+                              'the CPU time and memory of every page, and pause rasterization when memory runs low. '
+                              '--workers is the upper bound (one per CPU when left to 1).')
+    options.add_argument('--translate-jobs', action='store', type=int, default=default(2), dest='translate_jobs',
+                         help='number of pages translated at once, while the next pages are being converted')
+    options.add_argument('--max-jobs', action='store', type=int, default=default(2), dest='max_jobs',
+                         help='maximum number of conversions/translations running at once in the GUI')
+    options.add_argument('--ocr-cache', action='store', default=default(None), dest='ocr_cache',
+                         help='directory used to cache OCR results between runs')
+    options.add_argument('--translation-memory', action='store', default=default(None), dest='translation_memory',
+                         help='SQLite file used to remember translated paragraphs between runs')
+    options.add_argument('-p', '--profile', action='store', default=default(DEFAULT_OCR_PROFILE),
+                         choices=list(OCR_PROFILES.keys()), dest='profile',
+                         help='OCR profile, trading accuracy for speed')
+    options.add_argument('--ocr-backend', action='store', default=default(DEFAULT_OCR_BACKEND),
+                         choices=list(OCR_BACKENDS.keys()), dest='ocr_backend',
+                         help='OCR engine. tesserocr keeps tesseract models loaded between pages.')
+    options.add_argument('--filter-pages', action='store_true', default=default(False), dest='filter_pages',
+                         help="don't OCR blank pages and near duplicates of other pages")
+    options.add_argument('--preprocess', action='store', default=default(None), dest='preprocess',
+                         help=f"comma separated preprocessing steps applied to pages before OCR "
+                              f"({', '.join(PREPROCESSING_STEPS)}), eg. 'binarize,deskew,crop'")
+    options.add_argument('--journal-dir', action='store', default=default(DEFAULT_JOURNAL_DIR), dest='journal_dir',
+                         help='directory conversion journals are kept in, so interrupted conversions can resume '
+                              '(an empty value disables journaling)')
+    options.add_argument('--search-index', action='store', default=default(DEFAULT_SEARCH_INDEX), dest='search_index',
+                         help='SQLite file converted and translated pages are indexed in for the search command and '
+                              'the GUI search (an empty value disables indexing)')
+    options.add_argument('--phrase-table-dir', action='store', default=default(DEFAULT_PHRASE_TABLE_DIR),
+                         dest='phrase_table_dir',
+                         help='directory of the <source>-<destination>.tsv phrase tables of the offline phrase_table '
+                              'translation method')
+    options.add_argument('--metrics-file', action='store', default=default(None), dest='metrics_file',
+                         help='write stage timings, bytes, queue depths and retries to this file in the Prometheus '
+                              'text format (eg. for the node exporter textfile collector). Rewritten every 10s and on '
+                              'exit.')
+    options.add_argument('--metrics-port', action='store', type=int, default=default(None), dest='metrics_port',
+                         help='serve the same metrics on http://127.0.0.1:PORT/metrics')
+    return options
 
-from polybiblioglot import Polybiblioglot
 
 # Parse the arguments
 parser = argparse.ArgumentParser(
     prog='Polybiblioglot',
     usage='%(prog)s [OPTION}',
-    description='A tool used to convert scanned documents to text and translate them.'
+    description='A tool used to convert scanned documents to text and translate them.',
+    parents=[shared_options()]
 )
 
-parser.add_argument('-l', '--log-level', action='store', default='INFO', dest='log_level')
+subparsers = parser.add_subparsers(dest='command')
+batch_parser = subparsers.add_parser('batch', parents=[shared_options(command=True)],
+                                     help='convert (and translate) files without launching the GUI')
+batch_parser.add_argument('inputs', nargs='+', help='files, directories or glob patterns to convert')
+batch_parser.add_argument('-o', '--output-dir', action='store', default=None, dest='output_dir',
+                          help='write the outputs in a mirrored tree under this directory instead of next to the inputs')
+batch_parser.add_argument('-j', '--jobs', action='store', type=int, default=1, dest='jobs',
+                          help='number of files processed in parallel')
+batch_parser.add_argument('-s', '--source', action='store', default=None, dest='source',
+                          help="source language name or code. 'auto' detects the language of every file from a sample "
+                               "page and picks the tesseract language pack accordingly.")
+batch_parser.add_argument('-d', '--destination', action='store', default=None, dest='destination',
+                          help='destination language name or code. Files are only converted when omitted.')
+batch_parser.add_argument('-t', '--translation-method', action='store', default=TRANSLATOR_TYPES.translator,
+                          choices=list(TRANSLATION_BACKENDS), dest='translation_method',
+                          help='translation API or engine. phrase_table translates offline with the phrase tables '
+                               'in --phrase-table-dir.')
+batch_parser.add_argument('--api-token', action='store', default=os.environ.get('POLYBIBLIOGLOT_API_TOKEN', ''),
+                          dest='api_token', help='translation API token (defaults to $POLYBIBLIOGLOT_API_TOKEN)')
+batch_parser.add_argument('-f', '--force', action='store_true', dest='force',
+                          help='process files even if their outputs are up to date')
+batch_parser.add_argument('--min-confidence', action='store', type=float, default=None, dest='min_confidence',
+                          help='leave out words recognized with a lower confidence (0 to 100), eg. to avoid '
+                               'translating OCR garbage')
+batch_parser.add_argument('--json', action='store_true', dest='json', help='print the summary as JSON')
+search_parser = subparsers.add_parser('search', help='search the text and translations of the converted documents')
+search_parser.add_argument('query', nargs='+', help='words to look for (all must appear on the page). Use "quotes" for '
+                                                     'exact phrases and a trailing * for prefixes.')
+search_parser.add_argument('-n', '--limit', action='store', type=int, default=20, dest='limit',
+                           help='maximum number of results')
+search_parser.add_argument('--kind', action='store', default=None, choices=['source', 'translation'], dest='kind',
+                           help='only search the OCR text (source) or the translations')
+search_parser.add_argument('--language', action='store', default=None, dest='language',
+                           help='only search text in this language (name or code)')
+search_parser.add_argument('--json', action='store_true', dest='json', help='print the results as JSON')
+coordinator_parser = subparsers.add_parser('coordinator', parents=[shared_options(command=True)],
+                                           help='split files into page tasks for workers on other machines and '
+                                                'write the outputs as they finish')
+coordinator_parser.add_argument('inputs', nargs='+', help='files, directories or glob patterns to convert')
+coordinator_parser.add_argument('--queue', action='store', default=DEFAULT_WORK_QUEUE, dest='queue',
+                                help='SQLite file holding the work queue')
+coordinator_parser.add_argument('--host', action='store', default='127.0.0.1', dest='host',
+                                help='address the queue is served on (with --port). Serving it on another address '
+                                     'than the loopback one requires --queue-token')
+coordinator_parser.add_argument('--port', action='store', type=int, default=None, dest='port',
+                                help='serve the queue over HTTP on this port, for workers without access to the queue '
+                                     'file')
+coordinator_parser.add_argument('--lease', action='store', type=float, default=300, dest='lease',
+                                help='seconds a worker has to finish a task before it is given to another worker')
+coordinator_parser.add_argument('-s', '--source', action='store', default=None, dest='source',
+                                help='source language name or code')
+coordinator_parser.add_argument('-d', '--destination', action='store', default=None, dest='destination',
+                                help='destination language name or code. Files are only converted when omitted.')
+coordinator_parser.add_argument('-t', '--translation-method', action='store', default=TRANSLATOR_TYPES.translator,
+                                choices=list(TRANSLATION_BACKENDS), dest='translation_method',
+                                help='translation API or engine used by the workers')
+coordinator_parser.add_argument('-o', '--output-dir', action='store', default=None, dest='output_dir',
+                                help='write the outputs in a mirrored tree under this directory instead of next to the '
+                                     'inputs')
+coordinator_parser.add_argument('--no-wait', action='store_true', dest='no_wait',
+                                help="queue the files and exit without waiting for the workers or writing outputs")
+coordinator_parser.add_argument('--json', action='store_true', dest='json', help='print the summary as JSON')
+worker_parser = subparsers.add_parser('worker', parents=[shared_options(command=True)],
+                                      help='process page tasks queued by a coordinator')
+worker_parser.add_argument('--queue', action='store', default=DEFAULT_WORK_QUEUE, dest='queue',
+                           help='SQLite file holding the work queue (eg. on a shared filesystem)')
+worker_parser.add_argument('--coordinator', action='store', default=None, dest='coordinator',
+                           help='URL of a coordinator serving the queue over HTTP (eg. http://host:8765), used '
+                                'instead of --queue')
+worker_parser.add_argument('--id', action='store', default=None, dest='worker_id',
+                           help='worker id shown in the queue (defaults to <hostname>-<pid>)')
+worker_parser.add_argument('-j', '--jobs', action='store', type=int, default=1, dest='jobs',
+                           help='number of tasks processed at once')
+worker_parser.add_argument('--api-token', action='store', default=os.environ.get('POLYBIBLIOGLOT_API_TOKEN', ''),
+                           dest='api_token', help='translation API token (defaults to $POLYBIBLIOGLOT_API_TOKEN)')
+worker_parser.add_argument('--exit-when-empty', action='store_true', dest='exit_when_empty',
+                           help='exit once there is no task left instead of waiting for more')
+for queue_parser in (coordinator_parser, worker_parser):
+    queue_parser.add_argument('--queue-token', action='store',
+                              default=os.environ.get('POLYBIBLIOGLOT_QUEUE_TOKEN', ''), dest='queue_token',
+                              help='token required by the HTTP queue (defaults to $POLYBIBLIOGLOT_QUEUE_TOKEN)')
 args = parser.parse_args()
 
 # Initialize the logger
@@ -24,6 +174,177 @@ formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 ch.setFormatter(formatter)
 logger.addHandler(ch)
 
-# Create and start PolyBiblioGlot
-pbg = Polybiblioglot(logger=logger)
-pbg.start()
\ No newline at end of file
+if args.command == 'search':
+    if not args.search_index:
+        parser.error('search requires a --search-index')
+    index = SearchIndex(args.search_index, logger=logger)
+    try:
+        language = resolve_language(args.language) if args.language else None
+    except ValueError as e:
+        parser.error(str(e))
+    results = index.search(' '.join(args.query), limit=args.limit, kind=args.kind, language=language)
+    index.close()
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(f"{result['path']}:{result['page']}\t{result['kind']}\t{result['language']}\t{result['snippet']}")
+    sys.exit(0 if results else 1)
+
+try:
+    preprocessor = Preprocessor.from_steps(args.preprocess, logger=logger) if args.preprocess else None
+except ValueError as e:
+    parser.error(str(e))
+ocr_cache = OcrCache(args.ocr_cache, logger=logger) if args.ocr_cache else None
+translation_memory = TranslationMemory(args.translation_memory, logger=logger) if args.translation_memory else None
+search_index = SearchIndex(args.search_index, logger=logger) if args.search_index else None
+metrics = None
+if args.metrics_file or args.metrics_port:
+    # structured metric logs (JSON lines) are written at the DEBUG level
+    metrics = Metrics(logger=logger.getChild('metrics'))
+    if args.metrics_file:
+        metrics.start_writer(args.metrics_file)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+workers = args.workers or None
+autoscaler = None
+if args.autoscale:
+    if workers == 1:
+        workers = None
+    autoscaler = OcrAutoscaler(max_workers=workers, metrics=metrics, logger=logger)
+
+if args.command == 'coordinator':
+    if args.destination and not args.source:
+        parser.error('--source is required when translating')
+    try:
+        source = resolve_language(args.source) if args.source else ''
+        destination = resolve_language(args.destination) if args.destination else ''
+    except ValueError as e:
+        parser.error(str(e))
+    if source == AUTO_DETECT:
+        parser.error('the coordinator needs an explicit --source')
+    if args.filter_pages:
+        # pages are spread over the workers one by one, none of them sees a whole document to compare its pages
+        parser.error('--filter-pages is not supported by the coordinator')
+    if args.port and not args.queue_token and not is_loopback(args.host):
+        parser.error(f'--queue-token is required to serve the queue on {args.host}')
+    queue = WorkQueue(args.queue, lease_seconds=args.lease, logger=logger)
+    converter = Converter(logger=logger, workers=1, profile=args.profile, ocr_backend=args.ocr_backend,
+                          preprocessor=preprocessor)
+    coordinator = Coordinator(queue, converter, source=source, destination=destination,
+                              translation_method=args.translation_method, output_dir=args.output_dir,
+                              index=search_index, logger=logger)
+    documents = coordinator.submit(collect_inputs(args.inputs))
+    converter.close()
+    if not documents:
+        logger.error('No file matched the inputs')
+        sys.exit(2)
+    if args.no_wait:
+        sys.exit(0)
+    server = None
+    if args.port:
+        server = QueueServer(queue, host=args.host, port=args.port, token=args.queue_token)
+        server.start()
+        logger.info(f'Serving the work queue on http://{args.host}:{args.port}')
+    summary = coordinator.wait(documents)
+    if server is not None:
+        server.stop()
+    queue.close()
+    if search_index is not None:
+        search_index.close()
+    if metrics is not None:
+        metrics.close()
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for record in summary['files']:
+            print(f"{record['status']}\t{record['path']}")
+        print(f"converted={summary['converted']} failed={summary['failed']} pages={summary['pages']} "
+              f"seconds={summary['seconds']:.1f}")
+    sys.exit(summary['exit_code'])
+
+if args.command == 'worker':
+    if args.coordinator:
+        queue = RemoteQueue(args.coordinator, token=args.queue_token)
+    else:
+        queue = WorkQueue(args.queue, logger=logger)
+    worker = QueueWorker(
+        queue,
+        Converter(logger=logger, workers=workers, cache=ocr_cache, profile=args.profile,
+                  ocr_backend=args.ocr_backend, preprocessor=preprocessor, metrics=metrics, autoscaler=autoscaler),
+        translator=MultiTranslator(TRANSLATOR_TYPES.translator, logger=logger, memory=translation_memory,
+                                   metrics=metrics, phrase_table_dir=args.phrase_table_dir),
+        worker_id=args.worker_id,
+        authentication={'token': args.api_token},
+        jobs=args.jobs,
+        logger=logger
+    )
+    try:
+        counts = worker.run(exit_when_empty=args.exit_when_empty)
+    except KeyboardInterrupt:
+        worker.stop()
+        counts = worker.counts()
+    worker.converter.close()
+    queue.close()
+    if metrics is not None:
+        metrics.close()
+    logger.info(f"Processed {counts['processed']} tasks ({counts['failed']} failed)")
+    sys.exit(counts['exit_code'])
+
+if args.command == 'batch':
+    translator = None
+    if args.destination:
+        if not args.source:
+            parser.error('--source is required when translating')
+        translator = MultiTranslator(args.translation_method, logger=logger, memory=translation_memory,
+                                     metrics=metrics, phrase_table_dir=args.phrase_table_dir)
+    try:
+        source = resolve_language(args.source) if args.source else ''
+        destination = resolve_language(args.destination) if args.destination else ''
+    except ValueError as e:
+        parser.error(str(e))
+    runner = BatchRunner(
+        Converter(logger=logger, workers=workers, cache=ocr_cache, profile=args.profile,
+                  ocr_backend=args.ocr_backend, layout=args.min_confidence is not None,
+                  filter_pages=args.filter_pages, preprocessor=preprocessor, metrics=metrics, autoscaler=autoscaler),
+        translator=translator,
+        source=source,
+        destination=destination,
+        authentication={'token': args.api_token},
+        output_dir=args.output_dir,
+        jobs=args.jobs,
+        force=args.force,
+        journal_dir=args.journal_dir or None,
+        min_confidence=args.min_confidence or 0,
+        index=search_index,
+        translate_jobs=args.translate_jobs,
+        logger=logger
+    )
+    summary = runner.run(collect_inputs(args.inputs))
+    runner.converter.close()
+    if search_index is not None:
+        search_index.close()
+    if metrics is not None:
+        metrics.close()
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for record in summary['files']:
+            print(f"{record['status']}\t{record['path']}")
+        print(f"converted={summary['converted']} skipped={summary['skipped']} failed={summary['failed']} "
+              f"pages={summary['pages']} seconds={summary['seconds']:.1f}")
+    sys.exit(summary['exit_code'])
+
+# Create and start PolyBiblioGlot (imported here so the headless commands don't need dearpygui)
+from polybiblioglot import Polybiblioglot  # noqa: E402
+
+pbg = Polybiblioglot(logger=logger, workers=workers, ocr_cache=ocr_cache,
+                     translation_memory=translation_memory, journal_dir=args.journal_dir or None,
+                     profile=args.profile, ocr_backend=args.ocr_backend, max_jobs=args.max_jobs,
+                     filter_pages=args.filter_pages, preprocessor=preprocessor, metrics=metrics,
+                     phrase_table_dir=args.phrase_table_dir, search_index=search_index,
+                     translate_workers=args.translate_jobs, autoscaler=autoscaler)
+pbg.start()
+if metrics is not None:
+    metrics.close()
@@ -0,0 +1,315 @@
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from polybiblioglot.components import Converter, MultiTranslator, JobJournal, PageLayout, PageFilter, SearchIndex, \
+    Pipeline, SUPPORTED_EXTENSIONS
+from polybiblioglot.lang import lang, AUTO_DETECT
+
+# Pages are separated by a form feed in the text files written by the batch runner
+PAGE_BREAK = '\f'
+
+# Exit codes of the batch command
+EXIT_CODES = {
+    'ok': 0,  # every file was converted (or was already up to date)
+    'failed': 1,  # at least one file could not be converted
+    'no_input': 2,  # no file matched the given inputs
+}
+
+
+def resolve_language(language: str) -> str:
+    """
+    Returns the language code of a language given either its name (eg. 'German') or its code (eg. 'de').
+    AUTO_DETECT is returned as is.
+
+    :param language: language name or code
+    :return: language code
+    """
+    if language == AUTO_DETECT:
+        return language
+    if language in lang:
+        return lang[language]
+    if language in lang.values():
+        return language
+    raise ValueError(f'Unknown language: {language}')
+
+
+def collect_inputs(inputs: [str]) -> [(str, str)]:
+    """
+    Expands the inputs of the batch command into the list of files to convert.
+    An input can be a file, a directory (searched recursively) or a glob pattern. Only supported files are kept.
+
+    :param inputs: list of paths and glob patterns
+    :return: sorted list of (file path, root) tuples. The root is the directory the file was found under, it's used to
+    mirror the directory structure in the output directory.
+    """
+    files = {}
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            for directory, _, file_names in os.walk(pattern):
+                for file_name in file_names:
+                    files.setdefault(os.path.join(directory, file_name), pattern)
+        else:
+            for path in glob.glob(pattern, recursive=True):
+                if os.path.isfile(path):
+                    files.setdefault(path, os.path.dirname(path))
+    return sorted((path, root) for path, root in files.items() if path.lower().endswith(SUPPORTED_EXTENSIONS))
+
+
+def output_paths(path: str, root: str, output_dir: str = None, destination: str = None) -> [str]:
+    """
+    Returns the paths of the files written for an input: `<name>.txt` for the text and `<name>.<destination>.txt` for
+    the translation, either next to the input or in a mirrored tree under output_dir.
+
+    :param path: input file path
+    :param root: directory the input was found under (see collect_inputs)
+    :param output_dir: (optional) directory the outputs are written to
+    :param destination: (optional) destination language code, when translating
+    :return: list containing the text path, followed by the translation path when translating
+    """
+    if output_dir is None:
+        base = os.path.splitext(path)[0]
+    else:
+        base = os.path.join(output_dir, os.path.splitext(os.path.relpath(path, root))[0])
+    paths = [f'{base}.txt']
+    if destination:
+        paths += [f'{base}.{destination}.txt']
+    return paths
+
+
+def write_output(path: str, text: str):
+    """
+    Writes an output file. The text is written to a temporary file first, so an interrupted run never leaves an output
+    that looks up to date.
+
+    :param path: output path
+    :param text: text to write
+    :return: None
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.part'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class BatchRunner:
+    def __init__(self, converter: Converter, translator: MultiTranslator = None, source: str = '',
+                 destination: str = '', authentication=None, output_dir: str = None, jobs: int = 1,
+                 force: bool = False, journal_dir: str = None, min_confidence: float = 0, index: SearchIndex = None,
+                 translate_jobs: int = 2, logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Converts (and optionally translates) many files without any UI.
+        For every input file, the text is written to `<name>.txt` and the translation to `<name>.<destination>.txt`,
+        either next to the input or in a mirrored tree under output_dir.
+
+        :param converter: converter used for OCR
+        :param translator: (optional) translator. Files are only converted when it is None.
+        :param source: source language code (eg. 'de'). With AUTO_DETECT, the language of every file is detected from a
+        sample page and used both for OCR and as the translation source.
+        :param destination: destination language code (eg. 'fr')
+        :param authentication: authentication passed to MultiTranslator.translate
+        :param output_dir: (optional) directory the outputs are written to. They are written next to the inputs when
+        None.
+        :param jobs: number of files processed in parallel
+        :param force: process files even if their outputs are up to date
+        :param journal_dir: (optional) directory job journals are kept in. When set, the progress of every file is
+        journaled and an interrupted run resumes from the last finished page.
+        :param min_confidence: words recognized with a lower confidence (0 to 100) are left out of the text. Only used
+        when the converter is in layout mode.
+        :param index: (optional) search index the text and translation of every page are added to as soon as they are
+        ready. Files skipped because they are up to date are indexed from their outputs if they aren't indexed yet.
+        :param translate_jobs: number of pages of a file translated at once. Pages are translated while the next ones
+        are converted (see Pipeline).
+        :param logger: logger
+        """
+        self.converter = converter
+        self.translator = translator
+        self.source = source
+        self.destination = destination
+        self.authentication = authentication
+        self.output_dir = output_dir
+        self.jobs = max(jobs, 1)
+        self.force = force
+        self.journal_dir = journal_dir
+        self.min_confidence = min_confidence
+        self.index = index
+        self.translate_jobs = translate_jobs
+        self.logger = logger
+
+    def output_paths(self, path: str, root: str) -> [str]:
+        """
+        Returns the paths of the files written for an input.
+
+        :param path: input file path
+        :param root: directory the input was found under (see collect_inputs)
+        :return: list containing the text path, followed by the translation path when translating
+        """
+        return output_paths(path, root, self.output_dir, self.destination if self.translator is not None else None)
+
+    def is_up_to_date(self, path: str, outputs: [str]) -> bool:
+        """
+        Checks whether every output of an input exists and is newer than the input.
+
+        :param path: input file path
+        :param outputs: output paths (see output_paths)
+        :return: True if the input doesn't need to be processed again
+        """
+        input_mtime = os.path.getmtime(path)
+        return all(os.path.exists(output) and os.path.getmtime(output) >= input_mtime for output in outputs)
+
+    def process(self, path: str, root: str) -> dict:
+        """
+        Converts (and translates) a single file.
+
+        :param path: input file path
+        :param root: directory the input was found under (see collect_inputs)
+        :return: record describing the outcome ({'path', 'status', 'outputs', 'pages', 'seconds', 'error', 'profile',
+        'source', 'skipped_pages'}). skipped_pages maps the pages that weren't OCR'd to the reason they were skipped
+        (only when the converter filters pages).
+        """
+        outputs = self.output_paths(path, root)
+        record = {'path': path, 'status': 'skipped', 'outputs': outputs, 'pages': 0, 'seconds': 0.0, 'error': None,
+                  'profile': self.converter.profile.to_dict(), 'source': self.source, 'skipped_pages': {}}
+        if not self.force and self.is_up_to_date(path, outputs):
+            self.logger.info(f'{path} is up to date')
+            if self.index is not None and not self.index.has_document(path):
+                self._index_outputs(path, outputs)
+            return record
+
+        start = time.monotonic()
+        journal = JobJournal.for_document(path, self.journal_dir, logger=self.logger) if self.journal_dir else None
+        try:
+            converter, source = self.converter, self.source
+            if source == AUTO_DETECT:
+                source = converter.detect_language(path)
+                if source is None:
+                    raise ValueError('could not detect the language of the document')
+                record['source'] = source
+                converter = converter.with_language(source)
+            page_filter = PageFilter(logger=self.logger) if converter.filter_pages else None
+            if self.index is not None:
+                self.index.remove_document(path)
+            texts = (self._page_text(page).rstrip(PAGE_BREAK)
+                     for page in converter.iter_file(path, journal=journal, page_filter=page_filter))
+            if self.translator is None:
+                pages = []
+                for text in texts:
+                    pages += [text]
+                    self._index_page(path, len(pages), text, 'source', source)
+            else:
+                pages, translations = self._pipeline(source, journal).run(
+                    texts,
+                    on_page=lambda number, text: self._index_page(path, number, text, 'source', source),
+                    on_translation=lambda number, text: self._index_page(path, number, text, 'translation',
+                                                                         self.destination)
+                )
+            if page_filter is not None:
+                record['skipped_pages'] = page_filter.skipped
+            write_output(outputs[0], PAGE_BREAK.join(pages))
+            if self.translator is not None:
+                write_output(outputs[1], PAGE_BREAK.join(translations))
+        except Exception as e:
+            self.logger.error(f'Failed to process {path}: {e}')
+            record.update(status='failed', error=str(e))
+        else:
+            record.update(status='converted', pages=len(pages))
+            self.logger.info(f'Converted {path} ({len(pages)} pages)')
+        finally:
+            if journal is not None:
+                journal.close()
+        record['seconds'] = time.monotonic() - start
+        return record
+
+    def _page_text(self, page) -> str:
+        """
+        Returns the text of a converted page, leaving out low confidence words when the page has a layout.
+
+        :param page: string or PageLayout (see Converter.iter_file)
+        :return: text of the page
+        """
+        if isinstance(page, PageLayout):
+            return page.text(self.min_confidence)
+        return page
+
+    def _index_outputs(self, path: str, outputs: [str]):
+        """
+        Adds the pages of the outputs of a file processed by a previous run to the search index.
+
+        :param path: input file path
+        :param outputs: output paths (see output_paths)
+        :return: None
+        """
+        kinds = [('source', '' if self.source == AUTO_DETECT else self.source), ('translation', self.destination)]
+        for output, (kind, language) in zip(outputs, kinds):
+            with open(output, encoding='utf-8') as f:
+                self.index.add_document(path, f.read().split(PAGE_BREAK), kind=kind, language=language)
+        self.logger.info(f'Indexed {path} from its outputs')
+
+    def _index_page(self, path: str, page_number: int, text: str, kind: str, language: str):
+        """
+        Adds a page to the search index, if there is one.
+
+        :param path: input file path
+        :param page_number: page number (1-indexed)
+        :param text: text of the page
+        :param kind: 'source' or 'translation'
+        :param language: language code of the text
+        :return: None
+        """
+        if self.index is not None:
+            self.index.add_page(path, page_number, text, kind=kind, language=language)
+
+    def _pipeline(self, source: str, journal: JobJournal = None) -> Pipeline:
+        """
+        Returns the pipeline translating the pages of a file while the next ones are converted. Pages whose current
+        text was already translated according to the journal are not translated again, the others are recorded in it
+        as soon as they are translated.
+
+        :param source: source language code
+        :param journal: (optional) job journal
+        :return: Pipeline
+        """
+        backend = self.translator.translator_type
+
+        def translate(page_number: int, page: str) -> str:
+            if journal is not None:
+                translation = journal.translation(page_number, page, source, self.destination, backend)
+                if translation is not None:
+                    return translation
+            translation = self.translator.translate(page, source, self.destination, authentication=self.authentication)
+            if journal is not None:
+                journal.record_translation(page_number, page, translation, source, self.destination, backend)
+            return translation
+
+        return Pipeline(translate, workers=self.translate_jobs, metrics=self.converter.metrics, logger=self.logger)
+
+    def run(self, inputs: [(str, str)]) -> dict:
+        """
+        Processes every input.
+
+        :param inputs: list of (file path, root) tuples (see collect_inputs)
+        :return: summary of the run ({'exit_code', 'converted', 'skipped', 'failed', 'pages', 'seconds', 'files'} and
+        'preprocessing' timings when the converter preprocesses pages)
+        """
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            records = list(executor.map(lambda item: self.process(*item), inputs))
+
+        summary = {status: sum(record['status'] == status for record in records)
+                   for status in ('converted', 'skipped', 'failed')}
+        if not records:
+            exit_code = EXIT_CODES['no_input']
+        elif summary['failed']:
+            exit_code = EXIT_CODES['failed']
+        else:
+            exit_code = EXIT_CODES['ok']
+        summary.update(exit_code=exit_code, pages=sum(record['pages'] for record in records),
+                       seconds=time.monotonic() - start, files=records)
+        if self.converter.preprocessor is not None:
+            summary['preprocessing'] = self.converter.preprocessor.stats()
+        return summary
@@ -1,5 +1,32 @@
+from polybiblioglot.components.translation_backends import *
 from polybiblioglot.components.translator import *
 from polybiblioglot.components.converter import *
-errors = ["InvalidTranslationMethod", "AuthenticationError", "ApiError"]
-translator_constants = ["TRANSLATOR_TYPES"]
-__all__ = ["translator", "converter", "MultiTranslator", "Converter"] + errors + translator_constants
+from polybiblioglot.components.cache import *
+from polybiblioglot.components.translation_memory import *
+from polybiblioglot.components.journal import *
+from polybiblioglot.components.profiles import *
+from polybiblioglot.components.scheduler import *
+from polybiblioglot.components.layout import *
+from polybiblioglot.components.page_filter import *
+from polybiblioglot.components.preprocess import *
+from polybiblioglot.components.metrics import *
+from polybiblioglot.components.search_index import *
+from polybiblioglot.components.work_queue import *
+from polybiblioglot.components.document import *
+from polybiblioglot.components.pipeline import *
+from polybiblioglot.components.autoscale import *
+from polybiblioglot.components.ocr import OcrBackend, OCR_BACKENDS, DEFAULT_OCR_BACKEND
+errors = ["InvalidTranslationMethod", "AuthenticationError", "ApiError", "UnsupportedLanguagePair", "JobCancelled",
+          "InvalidDocument"]
+translator_constants = ["TRANSLATOR_TYPES", "TRANSLATOR_LIMITS", "TRANSLATION_BACKENDS", "DEFAULT_PHRASE_TABLE_DIR"]
+converter_constants = ["IMAGE_EXTENSIONS", "SUPPORTED_EXTENSIONS", "OCR_PROFILES", "DEFAULT_OCR_PROFILE",
+                       "OCR_BACKENDS", "DEFAULT_OCR_BACKEND", "PREPROCESSING_STEPS", "DOCUMENT_EXTENSION"]
+cache_constants = ["DEFAULT_CACHE_DIR", "DEFAULT_JOURNAL_DIR", "DEFAULT_SEARCH_INDEX", "DEFAULT_WORK_QUEUE"]
+classes = ["MultiTranslator", "Converter", "OcrCache", "TranslationMemory", "JobJournal", "OcrProfile", "OcrBackend",
+           "Job", "JobScheduler", "PageLayout", "Word",
+           "PageFilter", "Preprocessor", "Metrics", "TranslationBackend", "PhraseTableBackend",
+           "SearchIndex", "WorkQueue", "QueueServer", "RemoteQueue", "DocumentWriter", "DocumentReader",
+           "Pipeline", "OcrAutoscaler"]
+functions = ["get_profile", "register_translation_backend", "save_document", "is_loopback"]
+__all__ = ["translator", "converter"] + classes + functions + errors + translator_constants + converter_constants + \
+          cache_constants
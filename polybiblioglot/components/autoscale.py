@@ -0,0 +1,233 @@
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from polybiblioglot.components import ocr
+from polybiblioglot.components.metrics import Metrics
+
+# tesseract's OpenMP threads speed a page up far less than OCR'ing more pages at once, more threads rarely help
+MAX_OCR_THREADS = 4
+# fraction of the physical memory kept free: rasterization waits and OCR scales down when less is available
+DEFAULT_MEMORY_RESERVE = 0.1
+
+
+def total_memory() -> int:
+    """
+    Returns the physical memory of the machine.
+
+    :return: size in bytes, None when unknown
+    """
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def available_memory() -> int:
+    """
+    Returns the memory available to new processes without swapping (MemAvailable on Linux, free memory elsewhere).
+
+    :return: size in bytes, None when unknown
+    """
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def peak_rss() -> int:
+    """
+    Returns the peak resident set size of the current process or of its largest finished child process (such as
+    tesseract), whichever is larger.
+
+    :return: size in bytes, None when unavailable
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    unit = 1 if sys.platform == 'darwin' else 1024
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * unit
+
+
+def run_measured(fn, *args, threads: int = None, **kwargs) -> tuple:
+    """
+    Runs a function with a limited number of tesseract (OpenMP) threads and measures it. Meant to run in an OCR worker
+    process, which runs one page at a time.
+
+    :param fn: function to run
+    :param args: arguments of fn
+    :param threads: (optional) OMP_THREAD_LIMIT of the tesseract processes started by fn
+    :param kwargs: keyword arguments of fn
+    :return: result of fn, wall time and CPU time (including child processes) in seconds, and peak RSS (see peak_rss)
+    """
+    if threads is not None and multiprocessing.parent_process() is not None:
+        # engines loaded in a worker process (tesserocr) only read the limit from its environment, when created. The
+        # environment of the main process (single worker converters) is left alone.
+        os.environ['OMP_THREAD_LIMIT'] = str(threads)
+    times = os.times()
+    start = time.perf_counter()
+    with ocr.thread_limit(threads):
+        result = fn(*args, **kwargs)
+    wall = time.perf_counter() - start
+    end_times = os.times()
+    # the first four fields are the user and system times of the process and of its finished children
+    cpu = sum(end_times[:4]) - sum(times[:4])
+    return result, wall, cpu, peak_rss()
+
+
+class OcrAutoscaler:
+    def __init__(self, max_workers: int = None, max_threads: int = MAX_OCR_THREADS,
+                 memory_reserve: float = DEFAULT_MEMORY_RESERVE, window: int = 8, metrics: Metrics = None,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Tunes OCR concurrency while documents are converted, so throughput stays high on any machine without tuning
+        the number of workers by hand (see Converter).
+        The CPU time, wall time and peak memory of every OCR'd page are measured in the workers. Every `window` pages:
+        - the number of pages OCR'd at once grows by one, up to max_workers, the number of CPUs and what the available
+        memory allows given the peak memory of a worker
+        - it shrinks when pages get less than half a CPU each (the machine is oversubscribed)
+        - every page gets the CPUs the workers leave idle as tesseract threads (OMP_THREAD_LIMIT), but no more threads
+        than it was seen using
+        Rasterization waits while the available memory is below the reserve and pages are still being OCR'd, and the
+        number of workers drops right away.
+
+        :param max_workers: maximum number of pages OCR'd at once (the converter's number of workers), defaults to the
+        number of CPUs
+        :param max_threads: maximum number of tesseract threads per page
+        :param memory_reserve: fraction of the physical memory kept free
+        :param window: number of pages measured between two adjustments
+        :param metrics: (optional) metrics registry recording the settings, per page CPU time and memory
+        :param logger: logger
+        """
+        self.cores = os.cpu_count() or 1
+        self.max_workers = max(max_workers or self.cores, 1)
+        self.max_threads = max(max_threads, 1)
+        total = total_memory()
+        self.reserve = int(total * memory_reserve) if total else 0
+        self.window = max(window, 1)
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self.logger = logger
+        # start at half speed, until the memory used by a page is known
+        self.workers = max(min(self.max_workers, self.cores) // 2, 1)
+        self.threads = self._threads_for(self.workers)
+        self.rss = None  # peak memory of a worker, in bytes
+        self._in_flight = 0
+        self._samples = []  # (wall, cpu, rss) of the pages OCR'd since the last adjustment
+        self._condition = threading.Condition()
+        self._publish()
+
+    def _threads_for(self, workers: int) -> int:
+        return min(max(self.cores // workers, 1), self.max_threads)
+
+    def _publish(self):
+        self.metrics.set('ocr_workers', self.workers)
+        self.metrics.set('ocr_threads', self.threads)
+
+    def acquire(self) -> int:
+        """
+        Waits until a page can be OCR'd. Must be followed by release once the page is done.
+
+        :return: number of tesseract threads the page may use
+        """
+        with self._condition:
+            while self._in_flight >= self.workers:
+                self._condition.wait()
+            self._in_flight += 1
+            return self.threads
+
+    def release(self, wall: float = None, cpu: float = None, rss: int = None):
+        """
+        Records a finished page (see run_measured) and adjusts the settings once enough pages were measured.
+
+        :param wall: wall time of the page in seconds, None when OCR failed
+        :param cpu: CPU time of the page in seconds
+        :param rss: peak memory of the worker in bytes
+        :return: None
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if wall is not None:
+                self._samples += [(wall, cpu, rss)]
+                if len(self._samples) >= self.window:
+                    self._adjust()
+            self._condition.notify_all()
+
+    def _adjust(self):
+        pages = len(self._samples)
+        wall = sum(sample[0] for sample in self._samples)
+        cpu = sum(sample[1] for sample in self._samples)
+        peaks = [sample[2] for sample in self._samples if sample[2]]
+        self._samples = []
+        if peaks:
+            self.rss = max(peaks)
+            self.metrics.set('worker_rss_bytes', self.rss)
+        parallelism = cpu / wall if wall else 1.0  # CPUs used by a page on average
+
+        target = min(self.max_workers, self.cores)
+        available = available_memory()
+        if available is not None and self.rss:
+            # every additional worker needs about the peak memory seen so far
+            target = min(target, max(self.workers + int((available - self.reserve) // self.rss), 1))
+        workers, threads = self.workers, self.threads
+        if workers > target:
+            workers = target
+            threads = self._threads_for(workers)
+        elif threads == 1 and parallelism < 0.5 and workers > 1:
+            # pages wait for a CPU more than they use one
+            workers -= 1
+        elif threads > 1 and parallelism < threads / 2:
+            # tesseract doesn't use the threads it is given, run more pages at once instead
+            threads = max(math.ceil(parallelism), 1)
+            workers = min(workers + 1, target)
+        elif workers < target:
+            workers += 1
+            threads = min(threads, self._threads_for(workers))
+        if (workers, threads) != (self.workers, self.threads):
+            memory = f', {self.rss / 2 ** 20:.0f} MiB per worker' if self.rss else ''
+            self.logger.info(f'OCR autoscaling: {workers} pages at once with {threads} threads each (was '
+                             f'{self.workers}x{self.threads}; {cpu / pages:.1f}s CPU and {parallelism:.1f} CPUs used '
+                             f'per page{memory})')
+            self.workers, self.threads = workers, threads
+            self._publish()
+
+    def wait_for_memory(self):
+        """
+        Called before rasterizing a page. Waits while the available memory is below the reserve and pages are still
+        being OCR'd (their memory is freed when they are done), and lowers the number of pages OCR'd at once.
+
+        :return: None
+        """
+        start = None
+        with self._condition:
+            while self._in_flight > 0:
+                available = available_memory()
+                if available is None or available >= self.reserve:
+                    break
+                if start is None:
+                    start = time.perf_counter()
+                    if self.workers > 1:
+                        self.workers -= 1
+                        self.threads = self._threads_for(self.workers)
+                        self._publish()
+                    self.logger.info(f'Low memory ({available / 2 ** 20:.0f} MiB available), waiting for OCR to free '
+                                     f'some, {self.workers} pages at once from now on')
+                self._condition.wait(timeout=0.5)
+        if start is not None:
+            self.metrics.observe('backpressure_seconds', time.perf_counter() - start, stage='rasterize')
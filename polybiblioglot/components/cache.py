@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+from polybiblioglot.components.ocr import DEFAULT_OCR_BACKEND
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'polybiblioglot')
+# Fraction of max_size the cache is shrunk to when it overflows. Evicting below max_size means the directory is only
+# scanned once every few thousand pages instead of on every new entry once the cache is full.
+EVICTION_LOW_WATER = 0.9
+
+
+class OcrCache:
+    def __init__(self, directory: str = os.path.join(DEFAULT_CACHE_DIR, 'ocr'), max_size: int = 256 * 1024 * 1024,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Persistent on-disk cache of OCR results.
+        Entries are keyed by a hash of the page image and the tesseract settings used to read it, so the same scan is
+        only OCR'd once no matter how many times (or by whom) it is converted.
+        Every entry is a small text file. Reading an entry refreshes its modification time, and when the cache grows
+        past max_size the least recently used entries are deleted until it is back under EVICTION_LOW_WATER * max_size.
+
+        :param directory: directory the cache is stored in. It is created if it doesn't exist.
+        :param max_size: maximum size of the cache in bytes
+        :param logger: logger
+        """
+        self.logger = logger
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._size = sum(os.path.getsize(path) for path, _ in self._entries())
+
+    @staticmethod
+    def key(image, lang: str = None, config: str = '', backend: str = DEFAULT_OCR_BACKEND) -> str:
+        """
+        Computes the cache key of an image for the given tesseract settings.
+
+        :param image: PIL image
+        :param lang: tesseract language(s)
+        :param config: extra tesseract configuration
+        :param backend: name of the OCR engine reading the image (see OCR_BACKENDS). Entries of the default engine keep
+        the keys they had before the engine was part of the key.
+        :return: hex digest identifying the image and settings
+        """
+        engine = f':{backend}' if backend != DEFAULT_OCR_BACKEND else ''
+        digest = hashlib.sha256()
+        digest.update(f'{image.mode}:{image.size}:{lang}:{config}{engine}\n'.encode())
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.txt')
+
+    def _entries(self):
+        """
+        Lists every entry in the cache.
+
+        :return: generator of (path, modification time) tuples
+        """
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                if file.endswith('.txt'):
+                    path = os.path.join(root, file)
+                    yield path, os.path.getmtime(path)
+
+    def get(self, key: str):
+        """
+        Looks up an entry.
+
+        :param key: cache key (see OcrCache.key)
+        :return: the cached text, or None when the key is not in the cache
+        """
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                os.utime(path)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return text
+
+    def put(self, key: str, text: str):
+        """
+        Stores an entry, evicting the least recently used entries if the cache is full.
+
+        :param key: cache key (see OcrCache.key)
+        :param text: text to store
+        :return: None
+        """
+        path = self._path(key)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            # write to a temporary file first so concurrent readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            self._size += os.path.getsize(path) - previous_size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """
+        Deletes the least recently used entries until the cache fits in EVICTION_LOW_WATER * max_size.
+        Must be called with the lock held.
+
+        :return: None
+        """
+        target = int(self.max_size * EVICTION_LOW_WATER)
+        for path, _ in sorted(self._entries(), key=lambda entry: entry[1]):
+            if self._size <= target:
+                break
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self._size -= size
+            self.logger.debug(f'Evicted {path} from the OCR cache')
+
+    def stats(self) -> dict:
+        """
+        Returns usage statistics, useful to size the cache.
+
+        :return: dictionary with the hits, misses, hit rate, size (bytes) and max size of the cache
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': self._size,
+            'max_size': self.max_size,
+        }
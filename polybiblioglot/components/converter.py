@@ -1,19 +1,264 @@
-from pdf2image import convert_from_path
-import pytesseract
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pdf2image import convert_from_path, pdfinfo_from_path
+import copy
+import itertools
 import logging
+import os
+import threading
 from PIL import Image
 
+from polybiblioglot.components import ocr
+from polybiblioglot.components.autoscale import OcrAutoscaler, run_measured
+from polybiblioglot.components.cache import OcrCache
+from polybiblioglot.components.journal import JobJournal
+from polybiblioglot.components.layout import PageLayout
+from polybiblioglot.components.metrics import Metrics
+from polybiblioglot.components.page_filter import PageFilter, PAGE_KEPT, PAGE_BLANK, PAGE_DUPLICATE
+from polybiblioglot.components.preprocess import Preprocessor
+from polybiblioglot.components.profiles import get_profile, DEFAULT_OCR_PROFILE
+from polybiblioglot.lang.detect import detect_language, tesseract_language
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+SUPPORTED_EXTENSIONS = ('.pdf',) + IMAGE_EXTENSIONS
+# Number of characters of OCR'd text sampled to detect the language of a document
+LANGUAGE_SAMPLE_SIZE = 1000
+
+
+def _bounded_map(submit, iterable, max_pending: int):
+    """
+    Lazily submits every element of iterable and yields the results in the same order as the inputs.
+    At most max_pending elements are submitted at any time, so the iterable is only consumed as fast as the workers can
+    process it (this keeps large documents from being held in memory all at once).
+
+    :param submit: function taking an element and returning a concurrent.futures.Future of its result
+    :param iterable: elements to process
+    :param max_pending: maximum number of submitted but not yet returned elements
+    :return: generator of results
+    """
+    pending = deque()
+    for item in iterable:
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+        pending.append(submit(item))
+    while pending:
+        yield pending.popleft().result()
+
+
+class _InlineExecutor:
+    """
+    Minimal executor running every submitted call immediately in the calling thread.
+    It lets the single worker and process pool code paths share the same logic.
+    """
+
+    @staticmethod
+    def submit(fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class _WorkerPool:
+    """
+    Lazily started process pool shared by a converter and the copies returned by with_profile and with_language.
+    Starting and shutting the pool down is guarded by a lock so converters used from several threads never start more
+    than one pool.
+    """
+
+    def __init__(self, workers: int, logger):
+        self.workers = workers
+        self.logger = logger
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def get(self) -> ProcessPoolExecutor:
+        """
+        Returns the process pool, starting it on the first call.
+
+        :return: ProcessPoolExecutor
+        """
+        with self._lock:
+            if self._pool is None:
+                self.logger.debug(f'Starting {self.workers} OCR workers')
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def shutdown(self):
+        """
+        Shuts the worker processes down. They are started again by the next call to get.
+
+        :return: None
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
 
 class Converter:
-    def __init__(self, logger=logging.getLogger(__name__)):
+    def __init__(self, logger=logging.getLogger(__name__), workers: int = 1, max_pending: int = 0,
+                 lang: str = None, config: str = '', cache: OcrCache = None, profile=DEFAULT_OCR_PROFILE,
+                 ocr_backend: str = ocr.DEFAULT_OCR_BACKEND, layout: bool = False, filter_pages: bool = False,
+                 preprocessor: Preprocessor = None, metrics: Metrics = None, autoscaler: OcrAutoscaler = None):
         """
         Converter objects are used to convert images or pdf to text.
+
+        :param logger: logger
+        :param workers: number of worker processes used for OCR. 1 runs everything in the calling process and None
+        uses one worker per CPU.
+        :param max_pending: maximum number of pages queued for OCR at once. Defaults to twice the number of workers.
+        :param lang: tesseract language(s) (eg. 'eng' or 'deu+fra'), tesseract's default is used when None
+        :param config: extra tesseract configuration
+        :param cache: (optional) OCR cache checked before running tesseract
+        :param profile: OCR profile (name or OcrProfile, see OCR_PROFILES) controlling resolution and engine settings
+        :param ocr_backend: name of the OCR engine (see OCR_BACKENDS). 'tesserocr' keeps warm tesseract engines in every
+        worker instead of starting a tesseract process per page.
+        :param layout: when True, pages are returned as PageLayout objects (words with their confidence and bounding
+        box) instead of strings
+        :param filter_pages: when True, blank pages and near duplicates of other pages of a document are not OCR'd
+        (see PageFilter). Blank pages are returned as empty text and duplicates as the text of the page they duplicate.
+        :param preprocessor: (optional) preprocessing (binarization, deskewing, cropping...) applied to pages before OCR
+        :param metrics: (optional) metrics registry recording the duration, bytes and queue depth of every stage
+        :param autoscaler: (optional) autoscaler tuning how many of the workers OCR pages at once and how many tesseract
+        threads each page uses, and pausing rasterization when memory runs low. workers is the upper bound when set.
         """
         self.logger = logger
-        pass
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.max_pending = max_pending if max_pending > 0 else 2 * self.workers
+        self.lang = lang
+        self.config = config
+        self.cache = cache
+        self.profile = get_profile(profile)
+        if ocr_backend not in ocr.OCR_BACKENDS:
+            raise ValueError(f'Unknown OCR backend: {ocr_backend}')
+        self.ocr_backend = ocr_backend
+        self.layout = layout
+        self.filter_pages = filter_pages
+        self.preprocessor = preprocessor
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self.autoscaler = autoscaler
+        self._pool = _WorkerPool(self.workers, logger)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+        return False
+
+    def with_profile(self, profile):
+        """
+        Returns a converter identical to this one but using another OCR profile.
+        Both converters share the same worker processes and cache.
+
+        :param profile: OCR profile (name or OcrProfile, see OCR_PROFILES)
+        :return: Converter
+        """
+        converter = copy.copy(self)
+        converter.profile = get_profile(profile)
+        return converter
+
+    def with_ocr_backend(self, ocr_backend: str):
+        """
+        Returns a converter identical to this one but reading pages with another OCR engine.
+        Both converters share the same worker processes and cache.
+
+        :param ocr_backend: name of the OCR engine (see OCR_BACKENDS)
+        :return: Converter
+        """
+        if ocr_backend not in ocr.OCR_BACKENDS:
+            raise ValueError(f'Unknown OCR backend: {ocr_backend}')
+        converter = copy.copy(self)
+        converter.ocr_backend = ocr_backend
+        return converter
+
+    def with_preprocessor(self, preprocessor):
+        """
+        Returns a converter identical to this one but preprocessing pages differently.
+        Both converters share the same worker processes and cache.
+
+        :param preprocessor: (optional) Preprocessor applied to every page before OCR, pages are not preprocessed when
+        None
+        :return: Converter
+        """
+        converter = copy.copy(self)
+        converter.preprocessor = preprocessor
+        return converter
+
+    def with_language(self, language: str):
+        """
+        Returns a converter identical to this one but reading another language. The tesseract language pack of the
+        language is used if it's installed, otherwise this converter is returned as is.
+        Both converters share the same worker processes and cache.
+
+        :param language: language code (eg. 'de')
+        :return: Converter
+        """
+        pack = tesseract_language(language)
+        installed = ocr.installed_languages()
+        if pack is None or (installed is not None and pack not in installed):
+            self.logger.warning(f'No tesseract language pack installed for {language}, using {self.ocr_lang}')
+            return self
+        converter = copy.copy(self)
+        converter.lang = pack
+        return converter
+
+    def detect_language(self, path, max_pages: int = 3) -> str:
+        """
+        Detects the language of a document from a sample of its text.
+        Pages are OCR'd from the start of the document until LANGUAGE_SAMPLE_SIZE characters are found (or max_pages
+        pages are read), so a document is sampled from one page in most cases.
+
+        :param path: path to the file
+        :param max_pages: maximum number of pages sampled
+        :return: language code (eg. 'de'), None when the language couldn't be identified
+        """
+        if path.lower().endswith('.pdf'):
+            pages = self.iter_pdf(path, last_page=max_pages)
+        else:
+            pages = self.iter_file(path)
+        sample = ''
+        for page in pages:
+            sample += f'{page.text() if isinstance(page, PageLayout) else page}\n'
+            if len(sample) >= LANGUAGE_SAMPLE_SIZE:
+                break
+        pages.close()
+        language = detect_language(sample)
+        self.logger.info(f'Detected language of {path}: {language}')
+        return language
+
+    def close(self):
+        """
+        Shuts the worker processes down. They are started again if the converter is used afterwards.
+
+        :return: None
+        """
+        self._pool.shutdown()
+
+    @property
+    def ocr_lang(self) -> str:
+        """
+        Returns the tesseract language(s) used for OCR. The converter's language takes precedence over the profile's.
+
+        :return: tesseract language(s), None for tesseract's default
+        """
+        return self.lang or self.profile.lang
+
+    @property
+    def ocr_config(self) -> str:
+        """
+        Returns the tesseract configuration used for OCR: the profile's options followed by the converter's config.
+
+        :return: tesseract configuration string
+        """
+        return ' '.join(option for option in (self.profile.config, self.config) if option)
 
     @staticmethod
-    def convert_image(image_path="", image_data=None):
+    def convert_image(image_path="", image_data=None, lang: str = None, config: str = '',
+                      backend: str = ocr.DEFAULT_OCR_BACKEND, layout: bool = False, preprocessor: Preprocessor = None):
         """
         Converts an image to text and returns the text gathered from an image.
         the function can either be provided a path to the image or the image data/object itself.
@@ -22,67 +267,416 @@ class Converter:
 
         :param image_path: image path
         :param image_data: image data object
-        :return: string containing text extracted from the image
+        :param lang: tesseract language(s), tesseract's default is used when None
+        :param config: extra tesseract configuration
+        :param backend: name of the OCR engine (see OCR_BACKENDS)
+        :param layout: return a PageLayout instead of a string
+        :param preprocessor: (optional) preprocessing applied to the image before OCR
+        :return: string containing text extracted from the image (PageLayout in layout mode)
+        """
+        if image_data is None and image_path != "" and image_path is not None:
+            image_data = Image.open(image_path)
+        if image_data is None:
+            return PageLayout() if layout else ""
+        if preprocessor is not None:
+            image_data = preprocessor(image_data)
+        output = Converter._ocr(image_data, lang=lang, config=config, backend=backend, layout=layout)
+        return PageLayout.from_tsv(output) if layout else output
+
+    @staticmethod
+    def _ocr(image_data, lang: str = None, config: str = '', backend: str = ocr.DEFAULT_OCR_BACKEND,
+             layout: bool = False) -> str:
+        """
+        Runs OCR on an image and returns the raw output of the engine. This is what worker processes run, and what the
+        cache and journal store.
+
+        :param image_data: image data object
+        :param lang: tesseract language(s), tesseract's default is used when None
+        :param config: extra tesseract configuration
+        :param backend: name of the OCR engine (see OCR_BACKENDS)
+        :param layout: return the TSV layout of the image instead of its text
+        :return: text or TSV output of the OCR engine
+        """
+        if layout:
+            return ocr.get_backend(backend).image_to_data(image_data, lang=lang, config=config)
+        return ocr.get_backend(backend).image_to_string(image_data, lang=lang, config=config)
+
+    @staticmethod
+    def _timed_ocr(image_data, threads: int = None, **kwargs) -> (str, float, float, int):
+        """
+        Runs _ocr and measures it in the worker, excluding the time spent waiting for a free worker.
+
+        :param image_data: image data object
+        :param threads: (optional) maximum number of tesseract threads
+        :param kwargs: arguments of _ocr
+        :return: raw output of the OCR engine, wall time and CPU time in seconds and peak RSS of the worker in bytes
+        (see run_measured)
+        """
+        return run_measured(Converter._ocr, image_data, threads=threads, **kwargs)
+
+    @staticmethod
+    def _image_bytes(image) -> int:
+        """
+        Returns the size of the uncompressed pixel data of an image.
+
+        :param image: image object
+        :return: size in bytes
+        """
+        if image.mode == '1':
+            return (image.width + 7) // 8 * image.height
+        return image.width * image.height * len(image.getbands())
+
+    def _open_image(self, path):
         """
-        if image_data is not None:
-            return pytesseract.image_to_string(image_data)
-        elif image_path != "" and image_path is not None:
-            return pytesseract.image_to_string(Image.open(image_path))
+        Opens and decodes an image file.
+
+        :param path: path to the image
+        :return: image object
+        """
+        with self.metrics.time('stage_seconds', stage='decode'):
+            image = Image.open(path)
+            image.load()
+        self.metrics.inc('stage_bytes_total', os.path.getsize(path), stage='decode')
+        return image
+
+    def _to_page(self, output: str):
+        """
+        Converts the raw output of the OCR engine (see _ocr) to what the converter returns for a page.
+
+        :param output: text or TSV output of the OCR engine
+        :return: PageLayout in layout mode, the text otherwise
+        """
+        return PageLayout.from_tsv(output) if self.layout else output
+
+    def _executor(self):
+        """
+        Returns the executor OCR jobs are submitted to.
+        The process pool is kept alive between conversions so its workers (and the OCR engines they hold) stay warm
+        until close is called.
+
+        :return: a process pool when the converter has more than one worker, an inline executor otherwise
+        """
+        if self.workers <= 1:
+            return _InlineExecutor()
+        return self._pool.get()
+
+    def _submit(self, executor, image) -> Future:
+        """
+        Submits an image for OCR. When a cache is configured, it is checked first and tesseract only runs on a miss.
+
+        :param executor: executor returned by _executor
+        :param image: image object
+        :return: future of the raw OCR output of the image (see _ocr)
+        """
+        with self.metrics.time('stage_seconds', stage='prepare'):
+            image = self.profile.prepare(image)
+            if self.preprocessor is not None:
+                image = self.preprocessor(image)
+        lang, config = self.ocr_lang, self.ocr_config
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(image, lang=lang, config=f'{config} tsv' if self.layout else config,
+                                 backend=self.ocr_backend)
+            text = self.cache.get(key)
+            self.metrics.inc('cache_lookups_total', cache='ocr', result='hit' if text is not None else 'miss')
+            if text is not None:
+                future = Future()
+                future.set_result(text)
+                return future
+
+        # the worker returns its output with the time it took, the future returned only holds the output
+        future = Future()
+
+        def done(timed: Future):
+            self.metrics.add('queue_depth', -1, queue='ocr')
+            if timed.exception() is not None:
+                if self.autoscaler is not None:
+                    self.autoscaler.release()
+                future.set_exception(timed.exception())
+                return
+            output, seconds, cpu_seconds, rss = timed.result()
+            if self.autoscaler is not None:
+                self.autoscaler.release(seconds, cpu_seconds, rss)
+            self.metrics.observe('stage_seconds', seconds, stage='ocr')
+            self.metrics.observe('stage_cpu_seconds', cpu_seconds, stage='ocr')
+            if key is not None:
+                self.cache.put(key, output)
+            future.set_result(output)
+
+        # with an autoscaler, this waits for one of the pages being OCR'd, which also holds rasterization back
+        threads = self.autoscaler.acquire() if self.autoscaler is not None else None
+        self.metrics.add('queue_depth', 1, queue='ocr')
+        self.metrics.inc('stage_bytes_total', self._image_bytes(image), stage='ocr')
+        executor.submit(self._timed_ocr, image, threads=threads, lang=lang, config=config, backend=self.ocr_backend,
+                        layout=self.layout).add_done_callback(done)
+        return future
+
+    def iter_images(self, images, page_filter: PageFilter = None):
+        """
+        Converts image objects to text using OCR and yields the text of each image as soon as it is ready, in the same
+        order as the images were passed in.
+        When the converter has more than one worker, the images are spread across a process pool. Images are only
+        pulled from the iterable as workers free up, so a generator of images is never fully loaded in memory.
+
+        :param images: iterable of image objects
+        :param page_filter: (optional) filter skipping blank and duplicate pages, its skipped attribute reports the
+        pages that weren't OCR'd. A new filter is used when None and the converter filters pages.
+        :return: generator of strings (PageLayout in layout mode)
+        """
+        for output in self._iter_ocr(images, page_filter=page_filter):
+            yield self._to_page(output)
+
+    def _iter_ocr(self, images, page_numbers: [int] = None, page_filter: PageFilter = None):
+        """
+        Runs OCR on image objects and yields the raw output of each image (see _ocr) in order.
+
+        :param images: iterable of image objects
+        :param page_numbers: (optional) page number of every image, used to report skipped pages. Images are numbered
+        from 1 when None.
+        :param page_filter: (optional) filter skipping blank and duplicate pages
+        :return: generator of strings
+        """
+        executor = self._executor()
+        if page_filter is None and self.filter_pages:
+            page_filter = PageFilter(logger=self.logger)
+        if page_filter is None:
+            yield from _bounded_map(lambda image: self._submit(executor, image), images, self.max_pending)
         else:
-            return ""
+            futures = {}  # page number -> future of every OCR'd page, duplicates reuse the future of their original
 
-    def convert_images(self, image_list) -> [str]:
+            def submit(item) -> Future:
+                page_number, image = item
+                outcome, original = page_filter.check(image, page_number)
+                if outcome != PAGE_KEPT:
+                    self.metrics.inc('pages_total', stage='filter', outcome=outcome)
+                if outcome == PAGE_DUPLICATE:
+                    return futures[original]
+                if outcome == PAGE_BLANK:
+                    future = Future()
+                    future.set_result('')
+                    return future
+                futures[page_number] = self._submit(executor, image)
+                return futures[page_number]
+
+            yield from _bounded_map(submit, zip(page_numbers or itertools.count(1), images), self.max_pending)
+            if page_filter.skipped:
+                self.logger.info(f'Skipped {len(page_filter.skipped)} blank or duplicate pages')
+        if self.cache is not None:
+            self.logger.debug(f'OCR cache stats: {self.cache.stats()}')
+        if self.preprocessor is not None:
+            self.logger.debug(f'Preprocessing stats: {self.preprocessor.stats()}')
+
+    def convert_images(self, image_list, page_filter: PageFilter = None) -> [str]:
         """
         Converts a list of image objects to text using OCR.
         Returns a list of strings containing the text from the images in the same orders
         as the images were passed in
 
-        :param image_list: list of image objects
+        :param image_list: list (or any iterable) of image objects
+        :param page_filter: (optional) filter skipping blank and duplicate pages (see iter_images)
         :return: list of strings
         """
-        text_list = []
-        for image in image_list:
-            text = self.convert_image(image_data=image)
-            text_list += [text]
-        return text_list
+        return list(self.iter_images(image_list, page_filter=page_filter))
 
-    def convert_pdf(self, pdf_path) -> [str]:
+    @property
+    def settings(self) -> str:
+        """
+        Describes the OCR settings of the converter. Results obtained with different settings are never mixed (see
+        JobJournal).
+
+        :return: string identifying the OCR settings
+        """
+        return (f'profile={self.profile.name};dpi={self.profile.dpi};grayscale={self.profile.grayscale};'
+                f'max_width={self.profile.max_width};lang={self.ocr_lang};config={self.ocr_config};layout={self.layout};'
+                f'preprocess={self.preprocessor.settings if self.preprocessor is not None else None}')
+
+    @staticmethod
+    def pdf_page_range(pdf_path, first_page: int = None, last_page: int = None) -> range:
+        """
+        Returns the page numbers of a pdf between first_page and last_page.
+
+        :param pdf_path: path to the pdf
+        :param first_page: first page (1-indexed, defaults to the first page of the document)
+        :param last_page: last page (inclusive, defaults to the last page of the document)
+        :return: range of page numbers
+        """
+        page_count = pdfinfo_from_path(pdf_path)['Pages']
+        return range(max(first_page or 1, 1), min(last_page or page_count, page_count) + 1)
+
+    @staticmethod
+    def iter_pdf_images(pdf_path, first_page: int = None, last_page: int = None, pages: [int] = None,
+                        dpi: int = 200, grayscale: bool = False, metrics: Metrics = None,
+                        autoscaler: OcrAutoscaler = None):
+        """
+        Rasterizes a pdf one page at a time and yields the image of each page.
+        Only one page is rendered per call to poppler, so memory usage does not grow with the length of the document.
+        Pages are transferred from poppler as uncompressed PPM/PGM, which avoids a lossy JPEG encode/decode per page.
+
+        :param pdf_path: path to the pdf
+        :param first_page: first page to rasterize (1-indexed, defaults to the first page of the document)
+        :param last_page: last page to rasterize (inclusive, defaults to the last page of the document)
+        :param pages: (optional) page numbers to rasterize, overrides first_page and last_page
+        :param dpi: resolution of the images
+        :param grayscale: rasterize pages in grayscale
+        :param metrics: (optional) metrics registry recording the time spent rasterizing every page
+        :param autoscaler: (optional) autoscaler, pages are only rasterized when enough memory is available
+        :return: generator of image objects
+        """
+        if pages is None:
+            pages = Converter.pdf_page_range(pdf_path, first_page, last_page)
+        if metrics is None:
+            metrics = Metrics(enabled=False)
+        for page_number in pages:
+            if autoscaler is not None:
+                autoscaler.wait_for_memory()
+            with metrics.time('stage_seconds', stage='rasterize'):
+                images = convert_from_path(pdf_path, dpi=dpi, fmt='ppm', grayscale=grayscale, first_page=page_number,
+                                           last_page=page_number)
+            yield from images
+
+    def _iter_journaled(self, page_numbers: [int], load_images, journal: JobJournal = None,
+                        page_filter: PageFilter = None):
+        """
+        Yields the text of the given pages in order. Pages already recorded in the journal are read from it, the
+        others are OCR'd and recorded as soon as they are ready.
+
+        :param page_numbers: page numbers to yield
+        :param load_images: function taking a list of page numbers and returning an iterable of their images
+        :param journal: (optional) job journal
+        :param page_filter: (optional) filter skipping blank and duplicate pages
+        :return: generator of text
+        """
+        done = journal.pages(self.settings) if journal is not None else {}
+        todo = [page_number for page_number in page_numbers if page_number not in done]
+        if len(todo) < len(page_numbers):
+            self.logger.info(f'Resuming conversion, {len(page_numbers) - len(todo)} pages already done')
+
+        outputs = self._iter_ocr(load_images(todo), page_numbers=todo, page_filter=page_filter)
+        for page_number in page_numbers:
+            if page_number in done:
+                self.metrics.inc('pages_total', stage='convert', source='journal')
+                yield self._to_page(done[page_number])
+                continue
+            output = next(outputs)
+            self.metrics.inc('pages_total', stage='convert', source='ocr')
+            if journal is not None:
+                journal.record_page(page_number, output, self.settings)
+            yield self._to_page(output)
+
+    def iter_pdf(self, pdf_path, first_page: int = None, last_page: int = None, journal: JobJournal = None,
+                 page_filter: PageFilter = None):
+        """
+        Converts a pdf to text page by page. The text of each page is yielded as soon as it is ready.
+
+        :param pdf_path: path to the pdf
+        :param first_page: first page to convert (1-indexed, defaults to the first page of the document)
+        :param last_page: last page to convert (inclusive, defaults to the last page of the document)
+        :param journal: (optional) job journal. Pages found in the journal are not converted again.
+        :param page_filter: (optional) filter skipping blank and duplicate pages (see iter_images)
+        :return: generator of text (1 page in pdf = 1 element)
+        """
+        yield from self._iter_journaled(list(self.pdf_page_range(pdf_path, first_page, last_page)),
+                                        lambda pages: self.iter_pdf_images(pdf_path, pages=pages, dpi=self.profile.dpi,
+                                                                           grayscale=self.profile.grayscale,
+                                                                           metrics=self.metrics,
+                                                                           autoscaler=self.autoscaler),
+                                        journal, page_filter)
+
+    def convert_pdf(self, pdf_path, first_page: int = None, last_page: int = None,
+                    journal: JobJournal = None, page_filter: PageFilter = None) -> [str]:
         """
         Converts a pdf to text. The output is an array of text with each page of the pdf being an element of the
         array
 
         :param pdf_path: path to the pdf
+        :param first_page: first page to convert (1-indexed, defaults to the first page of the document)
+        :param last_page: last page to convert (inclusive, defaults to the last page of the document)
+        :param journal: (optional) job journal. Pages found in the journal are not converted again.
+        :param page_filter: (optional) filter skipping blank and duplicate pages (see iter_images)
         :return: array of text (1 page in pdf = 1 element)
         """
+        return list(self.iter_pdf(pdf_path, first_page=first_page, last_page=last_page, journal=journal,
+                                  page_filter=page_filter))
+
+    def page_count(self, path) -> int:
+        """
+        Returns the number of pages convert_file will return for a file.
+
+        :param path: path to the file
+        :return: number of pages (0 if the file type is unsupported)
+        """
+        if path is None:
+            return 0
+        if path.lower().endswith('.pdf'):
+            return len(self.pdf_page_range(path))
+        if path.lower().endswith(IMAGE_EXTENSIONS):
+            return 1
+        return 0
+
+    def iter_file(self, path, journal: JobJournal = None, page_filter: PageFilter = None):
+        """
+        Converts a file to text and yields the text of each page as soon as it is ready.
+        If the file is an image, a single element is yielded.
+        If the file is a pdf, one element is yielded per page.
 
-        # convert the pdf to and array of images
-        images = convert_from_path(pdf_path, fmt='jpeg')
-        pdf_pages_txt = self.convert_images(images)
-        return pdf_pages_txt
+        :param path: path to the file to convert
+        :param journal: (optional) job journal. Pages found in the journal are not converted again.
+        :param page_filter: (optional) filter skipping blank and duplicate pages (see iter_images)
+        :return: generator of text extracted from image or pdf
+        """
+        if path is None:
+            self.logger.error('Conversion aborted. No path provided.')
+            return
+        if path.lower().endswith('.pdf'):
+            yield from self.iter_pdf(pdf_path=path, journal=journal, page_filter=page_filter)
+        elif path.lower().endswith(IMAGE_EXTENSIONS):
+            yield from self._iter_journaled([1], lambda pages: [self._open_image(path)] if pages else [], journal,
+                                            page_filter)
+        else:
+            self.logger.error('Conversion aborted. File type unsupported.')
 
-    def convert_file(self, path) -> [str]:
+    def convert_file(self, path, journal: JobJournal = None, page_filter: PageFilter = None) -> [str]:
         """
         Converts a file to text and returns the text in an array.
         If the file is an image, the array will be of length 1.
         If the file is a pdf, the array will be the same length as the number of pages (1 element per page)
 
         :param path: path to the file to convert
+        :param journal: (optional) job journal. Pages found in the journal are not converted again.
+        :param page_filter: (optional) filter skipping blank and duplicate pages (see iter_images)
         :return: array containing text extracted from image or pdf
         """
-        if path is None:
-            self.logger.error('Conversion aborted. No path provided.')
-            return []
+        return list(self.iter_file(path, journal=journal, page_filter=page_filter))
+
+    def convert_page(self, path, page_number: int = 1):
+        """
+        Converts a single page of a file to text.
+
+        :param path: path to the file to convert
+        :param page_number: page number (1-indexed, images only have page 1)
+        :return: text of the page (PageLayout in layout mode)
+        """
         if path.lower().endswith('.pdf'):
-            return self.convert_pdf(pdf_path=path)
-        elif path.lower().endswith(('.png', '.jpg', '.jpeg')):
-            return [self.convert_image(image_path=path)]
+            pages = self.convert_pdf(path, first_page=page_number, last_page=page_number)
+        elif page_number == 1:
+            pages = self.convert_file(path)
         else:
-            self.logger.error('Conversion aborted. File type unsupported.')
+            pages = []
+        if not pages:
+            raise ValueError(f'{path} has no page {page_number}')
+        return pages[0]
 
-    def get_text_from_dir(self, path):
+    def get_text_from_dir(self, path) -> dict:
         """
-        Converts all images in a folder to text.
-        :param path:
-        :return:
+        Converts all images and pdfs in a folder to text.
+        Sub folders are not converted.
+
+        :param path: path to the folder
+        :return: dictionary mapping the path of every converted file to its pages (see convert_file)
         """
-        pass
+        converted = {}
+        for file_name in sorted(os.listdir(path)):
+            file_path = os.path.join(path, file_name)
+            if os.path.isfile(file_path) and file_name.lower().endswith(SUPPORTED_EXTENSIONS):
+                converted[file_path] = self.convert_file(file_path)
+        return converted
@@ -0,0 +1,259 @@
+import json
+import math
+import mmap
+import os
+import struct
+import time
+import zlib
+
+# extension of the documents written by DocumentWriter
+DOCUMENT_EXTENSION = '.pbg'
+# kinds of text stored for every page
+DOCUMENT_TEXT_KINDS = ('source', 'translation')
+
+# magic, format version, codec, page count, translated page count, index offset, metadata offset, metadata length
+_HEADER = struct.Struct('<8sHHIIQQI')
+# per page: source offset, source length, translation offset, translation length, confidence (nan when unknown)
+_INDEX_ENTRY = struct.Struct('<QIQIf')
+_MAGIC = b'PBGDOC\r\n'
+_VERSION = 1
+_CODEC_ZLIB = 1
+
+
+class InvalidDocument(Exception):
+    pass
+
+
+class DocumentWriter:
+    def __init__(self, path: str, metadata: dict = None, compression_level: int = 6):
+        """
+        Writes a document: the OCR text of every page, its translation and its confidence, in a single compact file.
+
+        Layout of the file:
+        - a fixed size header holding the page counts and the offsets of the index and of the metadata
+        - one zlib compressed chunk per page and kind of text, written as pages are added
+        - the index: one fixed size entry per page with the offset and length of its chunks, so a page is found with a
+        single seek (see DocumentReader)
+        - the metadata (JSON, compressed)
+
+        Pages are streamed to a temporary file, which replaces the document when the writer is closed. An interrupted
+        save never leaves a truncated document behind.
+
+        :param path: path to the document (see DOCUMENT_EXTENSION)
+        :param metadata: (optional) JSON serializable information about the document, eg. its source path and languages
+        :param compression_level: zlib compression level (1 to 9)
+        """
+        self.path = path
+        self.metadata = dict(metadata or {})
+        self.compression_level = compression_level
+        self._entries = []
+        self._translation_count = 0
+        self._tmp_path = f'{path}.part'
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self._tmp_path, 'wb')
+        # the header is written last, once the offsets are known
+        self._file.write(b'\0' * _HEADER.size)
+
+    def _write_chunk(self, text: str) -> (int, int):
+        chunk = zlib.compress(text.encode('utf-8'), self.compression_level)
+        offset = self._file.tell()
+        self._file.write(chunk)
+        return offset, len(chunk)
+
+    def add_page(self, text: str, translation: str = None, confidence: float = None):
+        """
+        Appends a page to the document.
+
+        :param text: OCR text of the page
+        :param translation: (optional) translation of the page. Translations are aligned with the pages: once a page
+        is added without one, the following pages can't have one either.
+        :param confidence: (optional) mean OCR confidence of the page (0 to 100), see PageLayout.mean_confidence
+        :return: None
+        """
+        if translation is not None:
+            if self._translation_count < len(self._entries):
+                raise ValueError(f'page {len(self._entries) + 1} is translated but a previous page is not')
+            self._translation_count += 1
+        source_offset, source_length = self._write_chunk(text)
+        translation_offset, translation_length = self._write_chunk(translation) if translation is not None else (0, 0)
+        self._entries += [(source_offset, source_length, translation_offset, translation_length,
+                           math.nan if confidence is None else confidence)]
+
+    def close(self):
+        """
+        Writes the index, the metadata and the header, and moves the document in place.
+
+        :return: None
+        """
+        index_offset = self._file.tell()
+        for entry in self._entries:
+            self._file.write(_INDEX_ENTRY.pack(*entry))
+        metadata_offset = self._file.tell()
+        metadata = zlib.compress(json.dumps({'created': time.time(), **self.metadata}).encode('utf-8'))
+        self._file.write(metadata)
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION, _CODEC_ZLIB, len(self._entries), self._translation_count,
+                                      index_offset, metadata_offset, len(metadata)))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """
+        Discards the document being written.
+
+        :return: None
+        """
+        self._file.close()
+        os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class DocumentPages:
+    def __init__(self, document, kind: str):
+        """
+        Read-only sequence of the pages of a document, decompressed on access.
+        Used like a list of pages (len, indexing, iteration) without reading the whole document.
+
+        :param document: DocumentReader
+        :param kind: 'source' or 'translation' (see DOCUMENT_TEXT_KINDS)
+        """
+        self.document = document
+        self.kind = kind
+
+    def __len__(self):
+        return self.document.page_count if self.kind == 'source' else self.document.translation_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('page index out of range')
+        return self.document.page(index + 1, self.kind)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class DocumentReader:
+    def __init__(self, path: str):
+        """
+        Reads a document written by DocumentWriter.
+        The file is memory-mapped and only the header is read when it is opened, reading a page decompresses that page
+        only. Opening and browsing a book takes the same time whatever its size.
+
+        :param path: path to the document
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                raise InvalidDocument(f'{path} is not a polybiblioglot document')
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise InvalidDocument(f'{path} is not a polybiblioglot document')
+        magic, version, codec, self.page_count, self.translation_count, self._index_offset, metadata_offset, \
+            metadata_length = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC:
+            self.close()
+            raise InvalidDocument(f'{path} is not a polybiblioglot document')
+        if version > _VERSION or codec != _CODEC_ZLIB:
+            self.close()
+            raise InvalidDocument(f'{path} was written by a newer version of polybiblioglot')
+        if metadata_offset + metadata_length > len(self._map) or \
+                self._index_offset + self.page_count * _INDEX_ENTRY.size > metadata_offset:
+            self.close()
+            raise InvalidDocument(f'{path} is truncated')
+        self.metadata = json.loads(zlib.decompress(self._map[metadata_offset:metadata_offset + metadata_length]))
+
+    def _entry(self, page_number: int) -> tuple:
+        if not 1 <= page_number <= self.page_count:
+            raise IndexError(f'{self.path} has no page {page_number}')
+        return _INDEX_ENTRY.unpack_from(self._map, self._index_offset + (page_number - 1) * _INDEX_ENTRY.size)
+
+    def page(self, page_number: int, kind: str = 'source') -> str:
+        """
+        Reads a page.
+
+        :param page_number: page number (1-indexed)
+        :param kind: 'source' for the OCR text, 'translation' for the translation (see DOCUMENT_TEXT_KINDS)
+        :return: text of the page
+        """
+        if kind not in DOCUMENT_TEXT_KINDS:
+            raise ValueError(f'Unknown text kind: {kind}')
+        source_offset, source_length, translation_offset, translation_length, _ = self._entry(page_number)
+        if kind == 'translation':
+            if page_number > self.translation_count:
+                raise IndexError(f'page {page_number} of {self.path} is not translated')
+            source_offset, source_length = translation_offset, translation_length
+        return zlib.decompress(self._map[source_offset:source_offset + source_length]).decode('utf-8')
+
+    def confidence(self, page_number: int) -> float:
+        """
+        Returns the mean OCR confidence of a page.
+
+        :param page_number: page number (1-indexed)
+        :return: confidence (0 to 100), None when it wasn't recorded
+        """
+        confidence = self._entry(page_number)[4]
+        return None if math.isnan(confidence) else confidence
+
+    def pages(self, kind: str = 'source') -> DocumentPages:
+        """
+        Returns the pages of the document as a lazy sequence.
+
+        :param kind: 'source' or 'translation' (see DOCUMENT_TEXT_KINDS)
+        :return: DocumentPages
+        """
+        if kind not in DOCUMENT_TEXT_KINDS:
+            raise ValueError(f'Unknown text kind: {kind}')
+        return DocumentPages(self, kind)
+
+    def close(self):
+        """
+        Unmaps the document.
+
+        :return: None
+        """
+        self._map.close()
+
+    def __len__(self):
+        return self.page_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def save_document(path: str, pages: [str], translations: [str] = (), confidences: [float] = (), metadata: dict = None,
+                  compression_level: int = 6):
+    """
+    Writes a document at once (see DocumentWriter).
+
+    :param path: path to the document
+    :param pages: OCR text of every page
+    :param translations: translations of the first pages (all of them or a prefix)
+    :param confidences: mean OCR confidence of the first pages
+    :param metadata: (optional) JSON serializable information about the document
+    :param compression_level: zlib compression level (1 to 9)
+    :return: None
+    """
+    with DocumentWriter(path, metadata=metadata, compression_level=compression_level) as writer:
+        for number, text in enumerate(pages):
+            writer.add_page(text, translation=translations[number] if number < len(translations) else None,
+                            confidence=confidences[number] if number < len(confidences) else None)
@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+
+from polybiblioglot.components.cache import DEFAULT_CACHE_DIR
+
+DEFAULT_JOURNAL_DIR = os.path.join(DEFAULT_CACHE_DIR, 'journals')
+
+
+class JobJournal:
+    def __init__(self, path: str, logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Per document job journal.
+        The OCR text and translations of every page are written to a small SQLite database as soon as they are ready,
+        so an interrupted conversion can resume from the last finished page instead of starting over.
+        Each page is recorded along with the OCR settings it was read with, pages read with other settings are ignored.
+        Translations are recorded along with a hash of the text they translate, so they are ignored once the page reads
+        differently (other OCR settings, minimum confidence, or a page OCR'd again).
+
+        :param path: path to the journal database
+        :param logger: logger
+        """
+        self.logger = logger
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # pages are recorded from worker threads, access is serialized with self._lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            'page INTEGER PRIMARY KEY, '
+            'settings TEXT NOT NULL, '
+            'text TEXT NOT NULL'
+            ');'
+            'CREATE TABLE IF NOT EXISTS translations ('
+            'page INTEGER NOT NULL, '
+            'source TEXT NOT NULL, '
+            'destination TEXT NOT NULL, '
+            'backend TEXT NOT NULL, '
+            'translation TEXT NOT NULL, '
+            "text_hash BLOB NOT NULL DEFAULT x'', "
+            'PRIMARY KEY (page, source, destination, backend)'
+            ');'
+        )
+        columns = [row[1] for row in self._connection.execute('PRAGMA table_info(translations)')]
+        if 'text_hash' not in columns:
+            # journals written before translations were tied to their text, their translations never match
+            self._connection.execute("ALTER TABLE translations ADD COLUMN text_hash BLOB NOT NULL DEFAULT x''")
+        self._connection.commit()
+
+    @classmethod
+    def for_document(cls, document_path: str, directory: str = DEFAULT_JOURNAL_DIR,
+                     logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Opens the journal of a document.
+        Journals are named after the absolute path, size and modification time of the document, so a modified document
+        gets a new, empty journal.
+
+        :param document_path: path to the document (pdf or image)
+        :param directory: directory journals are stored in
+        :param logger: logger
+        :return: JobJournal
+        """
+        stat = os.stat(document_path)
+        fingerprint = f'{os.path.abspath(document_path)}:{stat.st_size}:{stat.st_mtime_ns}'
+        name = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+        return cls(os.path.join(directory, f'{name}.sqlite3'), logger=logger)
+
+    def pages(self, settings: str = '') -> dict:
+        """
+        Returns the pages already converted with the given OCR settings.
+
+        :param settings: OCR settings (see Converter.settings)
+        :return: dictionary mapping page numbers (1-indexed) to their text
+        """
+        with self._lock:
+            rows = self._connection.execute('SELECT page, text FROM pages WHERE settings = ?', (settings,)).fetchall()
+        return dict(rows)
+
+    def record_page(self, page: int, text: str, settings: str = ''):
+        """
+        Records the text of a page.
+
+        :param page: page number (1-indexed)
+        :param text: text extracted from the page
+        :param settings: OCR settings (see Converter.settings)
+        :return: None
+        """
+        with self._lock:
+            self._connection.execute('INSERT OR REPLACE INTO pages (page, settings, text) VALUES (?, ?, ?)',
+                                     (page, settings, text))
+            # every page is committed right away, that's the whole point of the journal
+            self._connection.commit()
+
+    @staticmethod
+    def _text_key(text: str) -> bytes:
+        return hashlib.sha1(text.encode('utf-8')).digest()
+
+    def translation(self, page: int, text: str, source: str, destination: str, backend: str):
+        """
+        Looks up the translation of a page. It is only returned if it was made from the same text.
+
+        :param page: page number (1-indexed)
+        :param text: current text of the page
+        :param source: source language code (eg. 'en')
+        :param destination: destination language code (eg. 'de')
+        :param backend: translation backend
+        :return: the translation, None when the page wasn't translated from this text
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT translation FROM translations '
+                'WHERE page = ? AND source = ? AND destination = ? AND backend = ? AND text_hash = ?',
+                (page, source, destination, backend, self._text_key(text))
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def record_translation(self, page: int, text: str, translation: str, source: str, destination: str,
+                           backend: str):
+        """
+        Records the translation of a page.
+
+        :param page: page number (1-indexed)
+        :param text: text of the page that was translated
+        :param translation: translated text of the page
+        :param source: source language code (eg. 'en')
+        :param destination: destination language code (eg. 'de')
+        :param backend: translation backend
+        :return: None
+        """
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO translations (page, source, destination, backend, translation, text_hash) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (page, source, destination, backend, translation, self._text_key(text))
+            )
+            self._connection.commit()
+
+    def close(self):
+        """
+        Closes the underlying database.
+
+        :return: None
+        """
+        with self._lock:
+            self._connection.close()
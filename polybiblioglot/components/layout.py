@@ -0,0 +1,149 @@
+from array import array
+
+# Columns of tesseract's TSV output
+TSV_COLUMNS = ('level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num', 'left', 'top', 'width', 'height',
+               'conf', 'text')
+# Level of the TSV rows describing words
+WORD_LEVEL = '5'
+
+
+class Word:
+    __slots__ = ('text', 'confidence', 'left', 'top', 'width', 'height', 'block', 'paragraph', 'line')
+
+    def __init__(self, text: str, confidence: float, left: int, top: int, width: int, height: int, block: int,
+                 paragraph: int, line: int):
+        """
+        A word found by OCR.
+
+        :param text: text of the word
+        :param confidence: tesseract's confidence in the word (0 to 100)
+        :param left: left edge of the bounding box, in pixels
+        :param top: top edge of the bounding box, in pixels
+        :param width: width of the bounding box, in pixels
+        :param height: height of the bounding box, in pixels
+        :param block: number of the block the word belongs to
+        :param paragraph: number of the paragraph the word belongs to (within its block)
+        :param line: number of the line the word belongs to (within its paragraph)
+        """
+        self.text = text
+        self.confidence = confidence
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+        self.block = block
+        self.paragraph = paragraph
+        self.line = line
+
+    @property
+    def bbox(self) -> (int, int, int, int):
+        """
+        :return: bounding box of the word as a (left, top, right, bottom) tuple
+        """
+        return self.left, self.top, self.left + self.width, self.top + self.height
+
+    def __repr__(self):
+        return f'Word({self.text!r}, confidence={self.confidence}, bbox={self.bbox})'
+
+
+class PageLayout:
+    __slots__ = ('_text', '_offsets', '_structure', '_boxes', '_confidences')
+
+    def __init__(self):
+        """
+        Layout of an OCR'd page: its words with their confidence and bounding box, grouped in blocks, paragraphs and
+        lines.
+        Words are stored column wise in typed arrays (and all the word texts in a single string) rather than as one
+        object per word, which keeps 1000 page books small in memory. Word objects are only created when iterating.
+        """
+        self._text = ''  # the text of every word, separated by spaces
+        self._offsets = array('I', [0])  # start of every word in _text, followed by the end of _text + 1
+        self._structure = array('I')  # (block, paragraph, line) of every word
+        self._boxes = array('i')  # (left, top, width, height) of every word
+        self._confidences = array('f')  # confidence of every word
+
+    @classmethod
+    def from_tsv(cls, tsv: str):
+        """
+        Parses the TSV output of tesseract (see OcrBackend.image_to_data).
+
+        :param tsv: tesseract TSV output, with or without its header row
+        :return: PageLayout
+        """
+        layout = cls()
+        words = []
+        for row in tsv.splitlines():
+            columns = row.split('\t')
+            if len(columns) != len(TSV_COLUMNS) or columns[0] != WORD_LEVEL or not columns[11].strip():
+                continue
+            words += [columns[11].strip()]
+            layout._offsets.append(layout._offsets[-1] + len(words[-1]) + 1)
+            layout._structure.extend((int(columns[2]), int(columns[3]), int(columns[4])))
+            layout._boxes.extend((int(columns[6]), int(columns[7]), int(columns[8]), int(columns[9])))
+            layout._confidences.append(float(columns[10]))
+        layout._text = ' '.join(words)
+        return layout
+
+    def __len__(self):
+        return len(self._confidences)
+
+    def word(self, index: int) -> Word:
+        """
+        Returns a word of the page.
+
+        :param index: index of the word
+        :return: Word
+        """
+        return Word(self._text[self._offsets[index]:self._offsets[index + 1] - 1], self._confidences[index],
+                    *self._boxes[4 * index:4 * index + 4], *self._structure[3 * index:3 * index + 3])
+
+    def words(self, min_confidence: float = 0):
+        """
+        Iterates over the words of the page in reading order.
+
+        :param min_confidence: words with a lower confidence are skipped
+        :return: generator of Word
+        """
+        for index in range(len(self)):
+            if self._confidences[index] >= min_confidence:
+                yield self.word(index)
+
+    @property
+    def mean_confidence(self) -> float:
+        """
+        :return: mean confidence of the words of the page (0 for an empty page)
+        """
+        return sum(self._confidences) / len(self) if len(self) else 0.0
+
+    def paragraphs(self, min_confidence: float = 0) -> [[[Word]]]:
+        """
+        Groups the words of the page in paragraphs and lines.
+
+        :param min_confidence: words with a lower confidence are skipped
+        :return: list of paragraphs, each paragraph being a list of lines, each line being a list of words
+        """
+        paragraphs = []
+        paragraph_key = line_key = None
+        for word in self.words(min_confidence):
+            if (word.block, word.paragraph) != paragraph_key:
+                paragraph_key, line_key = (word.block, word.paragraph), None
+                paragraphs += [[]]
+            if word.line != line_key:
+                line_key = word.line
+                paragraphs[-1] += [[]]
+            paragraphs[-1][-1] += [word]
+        return paragraphs
+
+    def text(self, min_confidence: float = 0) -> str:
+        """
+        Rebuilds the text of the page. Lines are separated by new lines and paragraphs by blank lines, so paragraphs
+        are kept together when the text is translated.
+
+        :param min_confidence: words with a lower confidence are left out (eg. to avoid translating OCR garbage)
+        :return: text of the page
+        """
+        return '\n\n'.join('\n'.join(' '.join(word.text for word in line) for line in paragraph)
+                           for paragraph in self.paragraphs(min_confidence))
+
+    def __repr__(self):
+        return f'PageLayout({len(self)} words, mean_confidence={self.mean_confidence:.1f})'
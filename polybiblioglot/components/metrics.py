@@ -0,0 +1,265 @@
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (in seconds) of the histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Type and description of the metrics recorded by polybiblioglot (names without the prefix)
+METRIC_TYPES = {
+    'stage_seconds': ('histogram', 'Time spent per page (or per request) in every stage of the pipeline'),
+    'stage_bytes_total': ('counter', 'Bytes processed by every stage of the pipeline'),
+    'pages_total': ('counter', 'Pages processed by every stage of the pipeline'),
+    'cache_lookups_total': ('counter', 'OCR cache and translation memory lookups'),
+    'queue_depth': ('gauge', 'Work waiting or in progress in every queue'),
+    'requests_total': ('counter', 'Translation API requests by status code'),
+    'retries_total': ('counter', 'Translation API requests retried'),
+    'job_seconds': ('histogram', 'Duration of background jobs'),
+    'callback_seconds': ('histogram', 'Duration of the UI callbacks'),
+    'stage_cpu_seconds': ('histogram', 'CPU time per page in every stage, including the tesseract processes'),
+    'worker_rss_bytes': ('gauge', 'Peak resident memory of an OCR worker'),
+    'ocr_workers': ('gauge', 'Pages OCR\'d at once, as tuned by the autoscaler'),
+    'ocr_threads': ('gauge', 'Tesseract threads per page (OMP_THREAD_LIMIT), as tuned by the autoscaler'),
+    'backpressure_seconds': ('histogram', 'Time a stage waited for memory to be freed'),
+}
+
+
+class Metrics:
+    def __init__(self, prefix: str = 'polybiblioglot', buckets: (float,) = DEFAULT_BUCKETS, enabled: bool = True,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        In-process metrics registry: counters, gauges and histograms with labels.
+        Counter increments and histogram observations are also logged as JSON lines at the DEBUG level (structured
+        logs). The registry can be exported in the Prometheus text format to a file (see write and start_writer, eg.
+        for the node exporter's textfile collector) or served on a local endpoint (see serve). No external service is
+        needed.
+
+        :param prefix: prefix of the exported metric names
+        :param buckets: histogram bucket upper bounds, in seconds
+        :param enabled: a disabled registry ignores everything it's given (used when metrics aren't wanted)
+        :param logger: logger the structured logs are written to
+        """
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self.enabled = enabled
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._types = {}  # metric name -> type
+        self._values = {}  # (metric name, sorted labels) -> value, [bucket counts..., sum, count] for histograms
+        self._writer = None
+        self._stop = threading.Event()
+        self._servers = []
+
+    def _record(self, kind: str, name: str, labels: dict, update):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._types.setdefault(name, kind)
+            self._values[key] = update(self._values.get(key))
+
+    def _log(self, name: str, value: float, labels: dict):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(json.dumps({'metric': name, 'value': value, **labels}))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        Increments a counter.
+
+        :param name: metric name (without the prefix)
+        :param value: increment
+        :param labels: metric labels
+        :return: None
+        """
+        if not self.enabled:
+            return
+        self._record('counter', name, labels, lambda current: (current or 0) + value)
+        self._log(name, value, labels)
+
+    def set(self, name: str, value: float, **labels):
+        """
+        Sets a gauge.
+
+        :param name: metric name (without the prefix)
+        :param value: value
+        :param labels: metric labels
+        :return: None
+        """
+        if self.enabled:
+            self._record('gauge', name, labels, lambda _: value)
+
+    def add(self, name: str, value: float, **labels):
+        """
+        Adds to a gauge (eg. +1 when work is queued, -1 when it's done).
+
+        :param name: metric name (without the prefix)
+        :param value: value added
+        :param labels: metric labels
+        :return: None
+        """
+        if self.enabled:
+            self._record('gauge', name, labels, lambda current: (current or 0) + value)
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        Records an observation (eg. a duration in seconds) in a histogram.
+
+        :param name: metric name (without the prefix)
+        :param value: observed value
+        :param labels: metric labels
+        :return: None
+        """
+        if not self.enabled:
+            return
+
+        def update(current):
+            current = current or [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    current[index] += 1
+            current[-2] += value
+            current[-1] += 1
+            return current
+
+        self._record('histogram', name, labels, update)
+        self._log(name, value, labels)
+
+    @contextlib.contextmanager
+    def time(self, name: str, **labels):
+        """
+        Context manager observing the time spent in its block, in seconds. Nothing is recorded if the block raises.
+
+        :param name: histogram name (without the prefix)
+        :param labels: metric labels
+        """
+        start = time.perf_counter()
+        yield
+        self.observe(name, time.perf_counter() - start, **labels)
+
+    def get(self, name: str, **labels) -> float:
+        """
+        Returns the value of a counter or gauge, or the number of observations of a histogram.
+
+        :param name: metric name (without the prefix)
+        :param labels: metric labels
+        :return: value, 0 when nothing was recorded
+        """
+        with self._lock:
+            value = self._values.get((name, tuple(sorted(labels.items()))))
+        if isinstance(value, list):
+            return value[-1]
+        return value or 0
+
+    @staticmethod
+    def _format_labels(labels) -> str:
+        if not labels:
+            return ''
+        escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                   .replace('\n', '\\n') for key, value in labels)
+        return '{' + ','.join(escaped) + '}'
+
+    def to_prometheus(self) -> str:
+        """
+        Exports every metric in the Prometheus text exposition format.
+
+        :return: metrics as text
+        """
+        with self._lock:
+            types = dict(self._types)
+            values = {key: list(value) if isinstance(value, list) else value for key, value in self._values.items()}
+        lines = []
+        for name in sorted(types):
+            full_name = f'{self.prefix}_{name}'
+            description = METRIC_TYPES.get(name, ('', ''))[1]
+            if description:
+                lines += [f'# HELP {full_name} {description}']
+            lines += [f'# TYPE {full_name} {types[name]}']
+            for (metric, labels), value in sorted(values.items(), key=lambda item: str(item[0])):
+                if metric != name:
+                    continue
+                if types[name] != 'histogram':
+                    lines += [f'{full_name}{self._format_labels(labels)} {value:g}']
+                    continue
+                for bound, count in zip(self.buckets, value):
+                    lines += [f'{full_name}_bucket{self._format_labels(labels + (("le", f"{bound:g}"),))} {count}']
+                lines += [f'{full_name}_bucket{self._format_labels(labels + (("le", "+Inf"),))} {value[-1]}',
+                          f'{full_name}_sum{self._format_labels(labels)} {value[-2]:g}',
+                          f'{full_name}_count{self._format_labels(labels)} {value[-1]}']
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """
+        Writes the metrics to a file in the Prometheus text format. The file is replaced atomically, so a collector
+        never reads a partial file.
+
+        :param path: file path (eg. a .prom file in the node exporter's textfile directory)
+        :return: None
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{path}.part'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def start_writer(self, path: str, interval: float = 10):
+        """
+        Writes the metrics to a file every interval seconds from a background thread, until close is called.
+
+        :param path: file path (see write)
+        :param interval: seconds between writes
+        :return: None
+        """
+        def run():
+            while not self._stop.wait(interval):
+                self.write(path)
+            self.write(path)
+
+        self._writer = threading.Thread(target=run, daemon=True)
+        self._writer.start()
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """
+        Serves the metrics over HTTP (on any path, eg. /metrics) from a background thread, until close is called.
+
+        :param port: port to listen on
+        :param host: interface to listen on, only the local machine by default
+        :return: the HTTP server
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._servers += [server]
+        return server
+
+    def close(self):
+        """
+        Stops the background writer (after a last write) and the HTTP endpoints.
+
+        :return: None
+        """
+        self._stop.set()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
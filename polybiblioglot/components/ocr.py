@@ -0,0 +1,264 @@
+import contextlib
+import io
+import os
+import shlex
+import subprocess
+import threading
+
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Image modes tesseract can read from an uncompressed PNM buffer (bitmap, grayscale and color)
+PNM_MODES = ('1', 'L', 'RGB')
+
+# settings of the tesseract processes started by the current thread (see thread_limit)
+_thread_settings = threading.local()
+
+
+@contextlib.contextmanager
+def thread_limit(threads: int = None):
+    """
+    Limits the number of OpenMP threads (OMP_THREAD_LIMIT) of the tesseract processes started by the current thread,
+    without changing the environment of the process.
+
+    :param threads: maximum number of threads per tesseract process, no limit when None
+    :return: context manager
+    """
+    previous = getattr(_thread_settings, 'threads', None)
+    _thread_settings.threads = threads
+    try:
+        yield
+    finally:
+        _thread_settings.threads = previous
+
+
+def to_pnm(image) -> bytes:
+    """
+    Encodes an image as an uncompressed PNM (PBM, PGM or PPM depending on the image mode).
+    Unlike PNG or JPEG, writing a PNM is a plain copy of the pixel buffer, no codec is involved.
+
+    :param image: PIL image
+    :return: PNM encoded image
+    """
+    if image.mode not in PNM_MODES:
+        image = image.convert('L' if image.mode in ('LA', 'I', 'I;16', 'F') else 'RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PPM')
+    return buffer.getvalue()
+
+
+def _run_tesseract(image, lang: str = None, config: str = '', output_configs: [str] = (),
+                   timeout: float = None) -> str:
+    """
+    Runs tesseract on an image and returns its standard output.
+    The image is piped to tesseract as an uncompressed PNM and the output is read back from its standard output, so no
+    temporary file is written and the image is never re-encoded with a lossy codec.
+
+    :param image: PIL image
+    :param lang: tesseract language(s), tesseract's default is used when None
+    :param config: extra tesseract configuration
+    :param output_configs: tesseract config files selecting the output format (eg. 'tsv'), plain text when empty
+    :param timeout: (optional) timeout in seconds
+    :return: tesseract's output
+    """
+    command = [pytesseract.pytesseract.tesseract_cmd, 'stdin', 'stdout']
+    if lang:
+        command += ['-l', lang]
+    command += shlex.split(config) + list(output_configs)
+    threads = getattr(_thread_settings, 'threads', None)
+    env = dict(os.environ, OMP_THREAD_LIMIT=str(threads)) if threads is not None else None
+    try:
+        process = subprocess.run(command, input=to_pnm(image), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                 timeout=timeout, env=env)
+    except FileNotFoundError:
+        raise pytesseract.TesseractNotFoundError()
+    if process.returncode != 0:
+        raise pytesseract.TesseractError(process.returncode, process.stderr.decode('utf-8', errors='replace'))
+    return process.stdout.decode('utf-8')
+
+
+def image_to_string(image, lang: str = None, config: str = '', timeout: float = None) -> str:
+    """
+    Runs tesseract on an image and returns the text it contains (see _run_tesseract).
+
+    :param image: PIL image
+    :param lang: tesseract language(s), tesseract's default is used when None
+    :param config: extra tesseract configuration
+    :param timeout: (optional) timeout in seconds
+    :return: text extracted from the image
+    """
+    return _run_tesseract(image, lang=lang, config=config, timeout=timeout)
+
+
+def image_to_data(image, lang: str = None, config: str = '', timeout: float = None) -> str:
+    """
+    Runs tesseract on an image and returns the layout of its words as TSV (see PageLayout.from_tsv).
+
+    :param image: PIL image
+    :param lang: tesseract language(s), tesseract's default is used when None
+    :param config: extra tesseract configuration
+    :param timeout: (optional) timeout in seconds
+    :return: tesseract TSV output
+    """
+    return _run_tesseract(image, lang=lang, config=config, output_configs=['tsv'], timeout=timeout)
+
+
+_installed_languages = None
+
+
+def installed_languages() -> set:
+    """
+    Returns the tesseract language packs installed on the system. The list is only read from tesseract once.
+
+    :return: set of tesseract languages (eg. {'eng', 'deu'}), None when tesseract couldn't be queried
+    """
+    global _installed_languages
+    if _installed_languages is None:
+        try:
+            _installed_languages = set(pytesseract.get_languages(config=''))
+        except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError, OSError):
+            return None
+    return _installed_languages
+
+
+def parse_config(config: str) -> dict:
+    """
+    Parses a tesseract command line configuration string.
+
+    :param config: tesseract configuration (eg. '--oem 1 --psm 6 -c preserve_interword_spaces=1')
+    :return: dictionary with the 'oem', 'psm' and 'tessdata_dir' options (None when not set) and the 'variables' set
+    with -c
+    """
+    options = {'oem': None, 'psm': None, 'tessdata_dir': None, 'variables': {}}
+    tokens = shlex.split(config)
+    for option, value in zip(tokens, tokens[1:]):
+        if option == '--oem':
+            options['oem'] = int(value)
+        elif option == '--psm':
+            options['psm'] = int(value)
+        elif option == '--tessdata-dir':
+            options['tessdata_dir'] = value
+        elif option == '-c' and '=' in value:
+            name, variable = value.split('=', 1)
+            options['variables'][name] = variable
+    return options
+
+
+class OcrBackend:
+    """
+    Base class of the OCR engines a Converter can use.
+    """
+    name = ''
+
+    def image_to_string(self, image, lang: str = None, config: str = '') -> str:
+        """
+        Extracts the text of an image.
+
+        :param image: PIL image
+        :param lang: tesseract language(s), tesseract's default is used when None
+        :param config: extra tesseract configuration
+        :return: text extracted from the image
+        """
+        raise NotImplementedError()
+
+    def image_to_data(self, image, lang: str = None, config: str = '') -> str:
+        """
+        Extracts the layout of the words of an image.
+
+        :param image: PIL image
+        :param lang: tesseract language(s), tesseract's default is used when None
+        :param config: extra tesseract configuration
+        :return: tesseract TSV output (see PageLayout.from_tsv)
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """
+        Releases the resources held by the backend.
+
+        :return: None
+        """
+        pass
+
+
+class SubprocessBackend(OcrBackend):
+    """
+    Runs a new tesseract process for every image (see image_to_string).
+    It only needs the tesseract executable, but the language models are reloaded for every page.
+    """
+    name = 'subprocess'
+
+    def image_to_string(self, image, lang: str = None, config: str = '') -> str:
+        return image_to_string(image, lang=lang, config=config)
+
+    def image_to_data(self, image, lang: str = None, config: str = '') -> str:
+        return image_to_data(image, lang=lang, config=config)
+
+
+class TesserocrBackend(OcrBackend):
+    """
+    Keeps tesseract engines loaded in memory using the tesserocr bindings of the tesseract C API.
+    One engine is kept per thread and per (language, configuration), so the language models are only loaded once
+    instead of once per page. Requires the optional tesserocr package.
+    """
+    name = 'tesserocr'
+
+    def __init__(self):
+        if tesserocr is None:
+            raise ImportError('The tesserocr OCR backend requires the tesserocr package (pip install tesserocr)')
+        self._local = threading.local()
+
+    def _engine(self, lang: str, config: str):
+        engines = self._local.__dict__.setdefault('engines', {})
+        if (lang, config) not in engines:
+            options = parse_config(config)
+            kwargs = {'lang': lang or 'eng', 'variables': options['variables']}
+            if options['oem'] is not None:
+                kwargs['oem'] = options['oem']
+            if options['psm'] is not None:
+                kwargs['psm'] = options['psm']
+            if options['tessdata_dir'] is not None:
+                kwargs['path'] = options['tessdata_dir']
+            engines[(lang, config)] = tesserocr.PyTessBaseAPI(**kwargs)
+        return engines[(lang, config)]
+
+    def image_to_string(self, image, lang: str = None, config: str = '') -> str:
+        engine = self._engine(lang, config)
+        engine.SetImage(image)
+        return engine.GetUTF8Text()
+
+    def image_to_data(self, image, lang: str = None, config: str = '') -> str:
+        engine = self._engine(lang, config)
+        engine.SetImage(image)
+        return engine.GetTSVText(0)
+
+    def close(self):
+        for engine in self._local.__dict__.pop('engines', {}).values():
+            engine.End()
+
+
+OCR_BACKENDS = {backend.name: backend for backend in (SubprocessBackend, TesserocrBackend)}
+DEFAULT_OCR_BACKEND = SubprocessBackend.name
+
+# backends are instantiated once per process, so worker processes keep their engines between pages
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str = DEFAULT_OCR_BACKEND) -> OcrBackend:
+    """
+    Returns the instance of an OCR backend for the current process, creating it the first time.
+
+    :param name: backend name (see OCR_BACKENDS)
+    :return: OcrBackend
+    """
+    if name not in OCR_BACKENDS:
+        raise ValueError(f'Unknown OCR backend: {name}')
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = OCR_BACKENDS[name]()
+        return _backends[name]
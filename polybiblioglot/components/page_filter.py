@@ -0,0 +1,147 @@
+import logging
+import zlib
+
+import numpy as np
+from PIL import Image
+
+# Outcomes of PageFilter.check
+PAGE_KEPT = 'kept'
+PAGE_BLANK = 'blank'
+PAGE_DUPLICATE = 'duplicate'
+
+
+class PageFilter:
+    def __init__(self, blank_coverage: float = 0.0005, max_distance: float = 0.1, hash_size: int = 16,
+                 cells: int = 100, compare_width: int = 200, max_pixel_difference: float = 32,
+                 max_candidates: int = 16, logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Finds the pages that don't need to be OCR'd: blank pages (eg. the blank versos of a scanned book) and near
+        duplicates of pages already seen (eg. repeated plates or pages scanned twice).
+        Pages are compared on a downscaled copy (about cells pixels wide) using vectorized NumPy operations, so checking
+        a page costs a few milliseconds compared to the seconds tesseract spends on it.
+        Perceptual hashes only select the candidate originals of a page. A page is a duplicate when it also matches a
+        candidate pixel for pixel on a compare_width pixels wide copy, so sparse pages that only differ by a few words
+        (eg. chapter title pages) are never mistaken for each other.
+        A filter keeps the pages it has seen, so a new filter should be used for every document.
+
+        :param blank_coverage: pages with a lower ink coverage (share of the page with ink) are blank. The default
+        keeps a page holding a single heading but skips a page with a few specks of dust.
+        :param max_distance: pages whose perceptual hashes differ by at most this share of bits are candidate duplicates
+        :param hash_size: width and height of the perceptual hash (hash_size * hash_size bits)
+        :param cells: width of the downscaled copy of the page the metrics are computed on
+        :param compare_width: width of the copy of the page candidate duplicates are compared on
+        :param max_pixel_difference: a candidate is a duplicate when no pixel of the compared copies differs by more
+        than this many gray levels (once the brightness of the paper is evened out). A word that differs between two
+        pages differs by more than a hundred levels, scanner noise by a few.
+        :param max_candidates: maximum number of candidates (the ones with the closest hashes) compared to a page
+        :param logger: logger
+        """
+        self.blank_coverage = blank_coverage
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+        self.cells = cells
+        self.compare_width = compare_width
+        self.max_pixel_difference = max_pixel_difference
+        self.max_candidates = max_candidates
+        self.logger = logger
+        self.skipped = {}  # page number -> reason ('blank' or 'duplicate of page N')
+        self._page_numbers = []  # page number of every kept page
+        self._hashes = np.empty((0, (hash_size * hash_size + 7) // 8), dtype=np.uint8)  # packed hash of every kept page
+        self._copies = []  # (shape, compressed pixels) of the compared copy of every kept page
+
+    def _thumbnail(self, image) -> np.ndarray:
+        image = image.convert('L')
+        factor = max(image.width // self.cells, 1)
+        if factor > 1:
+            image = image.reduce(factor)  # box filter: every cell is the mean of a block of the page
+        return np.asarray(image, dtype=np.float32)
+
+    def _compared_copy(self, image) -> np.ndarray:
+        """
+        Returns the copy of a page candidate duplicates are compared on: the page downscaled to compare_width pixels
+        wide, with the paper (the median pixel) moved to white so rescans with a different exposure still match.
+
+        :param image: PIL image of the page
+        :return: uint8 array
+        """
+        image = image.convert('L')
+        if image.width > self.compare_width:
+            height = max(round(image.height * self.compare_width / image.width), 1)
+            image = image.resize((self.compare_width, height), Image.BOX)
+        pixels = np.asarray(image, dtype=np.int16)
+        return np.clip(pixels + (255 - int(np.median(pixels))), 0, 255).astype(np.uint8)
+
+    @staticmethod
+    def ink_coverage(thumbnail: np.ndarray) -> float:
+        """
+        Returns the share of the page covered by ink.
+        A cell has ink when it's noticeably darker than the paper (the median cell). Isolated specks of dust are
+        averaged away by the downscaling, text and pictures aren't.
+
+        :param thumbnail: downscaled grayscale page
+        :return: ink coverage between 0 and 1
+        """
+        return float(np.mean(thumbnail < 0.9 * np.median(thumbnail)))
+
+    def difference_hash(self, thumbnail: np.ndarray) -> np.ndarray:
+        """
+        Computes the difference hash (dHash) of a page: whether every pixel of a hash_size x (hash_size + 1) copy of
+        the page is noticeably brighter than its left neighbour.
+        Rescans of the same page (noise, slight shifts) have nearly identical hashes. Flat areas (the empty paper)
+        hash to 0 bits rather than to the sign of the scanner noise.
+
+        :param thumbnail: downscaled grayscale page
+        :return: bits of the hash, packed in a uint8 array
+        """
+        small = Image.fromarray(thumbnail).resize((self.hash_size + 1, self.hash_size), Image.BILINEAR)
+        pixels = np.asarray(small)
+        return np.packbits(pixels[:, 1:] > pixels[:, :-1] + 2)
+
+    def _same_page(self, copy: np.ndarray, index: int) -> bool:
+        """
+        Compares the copy of a page to the copy of the kept page at index.
+
+        :param copy: compared copy of the page (see _compared_copy)
+        :param index: index of the kept page
+        :return: True when no pixel differs by more than max_pixel_difference
+        """
+        shape, pixels = self._copies[index]
+        if shape != copy.shape:
+            return False
+        original = np.frombuffer(zlib.decompress(pixels), dtype=np.uint8).reshape(shape)
+        difference = np.abs(original.astype(np.int16) - copy.astype(np.int16))
+        return int(difference.max()) <= self.max_pixel_difference
+
+    def check(self, image, page_number: int) -> (str, int):
+        """
+        Checks whether a page has to be OCR'd. Kept pages are remembered, so later duplicates of them are found.
+
+        :param image: PIL image of the page
+        :param page_number: page number, used to report skipped pages
+        :return: tuple of the outcome (PAGE_KEPT, PAGE_BLANK or PAGE_DUPLICATE) and, for duplicates, the page number
+        of the page it duplicates
+        """
+        thumbnail = self._thumbnail(image)
+        if self.ink_coverage(thumbnail) < self.blank_coverage:
+            self.skipped[page_number] = PAGE_BLANK
+            self.logger.debug(f'Page {page_number} is blank')
+            return PAGE_BLANK, None
+
+        page_hash = self.difference_hash(thumbnail)
+        copy = self._compared_copy(image)
+        if len(self._page_numbers):
+            # hamming distance to every kept page at once
+            distances = np.unpackbits(np.bitwise_xor(self._hashes, page_hash), axis=1).sum(axis=1)
+            candidates = np.flatnonzero(distances <= self.max_distance * self.hash_size * self.hash_size)
+            candidates = candidates[np.argsort(distances[candidates], kind='stable')][:self.max_candidates]
+            for candidate in candidates:
+                if self._same_page(copy, int(candidate)):
+                    original = self._page_numbers[candidate]
+                    self.skipped[page_number] = f'{PAGE_DUPLICATE} of page {original}'
+                    self.logger.debug(f'Page {page_number} is a duplicate of page {original}')
+                    return PAGE_DUPLICATE, original
+
+        self._page_numbers += [page_number]
+        self._hashes = np.vstack((self._hashes, page_hash))
+        self._copies += [(copy.shape, zlib.compress(copy.tobytes(), 1))]
+        return PAGE_KEPT, None
@@ -0,0 +1,107 @@
+import logging
+import queue
+import threading
+
+from polybiblioglot.components.metrics import Metrics
+
+
+class Pipeline:
+    def __init__(self, translate, workers: int = 2, queue_size: int = 0, metrics: Metrics = None,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Translates the pages of a document while the next pages are still being converted.
+        Pages flow through bounded stages, each with its own concurrency:
+        - rasterization, in the thread iterating the pages (see Converter.iter_file)
+        - OCR, on the converter's worker processes (at most Converter.max_pending pages at once)
+        - translation, on `workers` threads fed by a queue of at most `queue_size` pages
+        OCR pauses when the translation queue is full, which in turn pauses rasterization, so a slow stage never makes
+        the others hold the whole book in memory. The time to process a book approaches the time of its slowest stage
+        instead of the sum of the stages.
+
+        :param translate: function translating a page, called from the worker threads with the page number (1-indexed)
+        and the text of the page
+        :param workers: number of pages translated at once
+        :param queue_size: maximum number of converted pages waiting for translation. Defaults to twice the number of
+        workers.
+        :param metrics: (optional) metrics registry, records the depth of the translation queue
+        :param logger: logger
+        """
+        self.translate = translate
+        self.workers = max(workers, 1)
+        self.queue_size = queue_size if queue_size > 0 else 2 * self.workers
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self.logger = logger
+
+    def run(self, pages, on_page=None, on_translation=None) -> ([str], [str]):
+        """
+        Runs the pipeline until every page is converted and translated.
+        If a translation fails, conversion stops and the error is raised once the pages being translated are done.
+
+        :param pages: iterable of the text of every page, usually a generator converting them (see Converter.iter_file)
+        :param on_page: (optional) function called with the page number and the text of every page as soon as it is
+        converted, from the calling thread
+        :param on_translation: (optional) function called with the page number and the translation of every page, in
+        page order, as soon as the page and the ones before it are translated
+        :return: the text of every page and their translations
+        """
+        pending = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        lock = threading.Lock()
+        errors = []
+        finished = {}  # page number -> translation, for the pages translated before a previous page
+        translations = []
+
+        def emit(page_number: int, translation: str):
+            # pages can finish out of order, they are handed over in order
+            with lock:
+                finished[page_number] = translation
+                while len(translations) + 1 in finished:
+                    translations.append(finished.pop(len(translations) + 1))
+                    if on_translation is not None:
+                        on_translation(len(translations), translations[-1])
+
+        def work():
+            while True:
+                item = pending.get()
+                if item is None:
+                    return
+                if stop.is_set():
+                    continue  # drain the queue
+                page_number, text = item
+                try:
+                    emit(page_number, self.translate(page_number, text))
+                except BaseException as e:
+                    errors.append(e)
+                    stop.set()
+                self.metrics.set('queue_depth', pending.qsize(), queue='pipeline')
+
+        threads = [threading.Thread(target=work, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        converted = []
+        try:
+            for text in pages:
+                if stop.is_set():
+                    break
+                converted.append(text)
+                if on_page is not None:
+                    on_page(len(converted), text)
+                while not stop.is_set():
+                    try:
+                        pending.put((len(converted), text), timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                self.metrics.set('queue_depth', pending.qsize(), queue='pipeline')
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            for _ in threads:
+                pending.put(None)
+            for thread in threads:
+                thread.join()
+            self.metrics.set('queue_depth', 0, queue='pipeline')
+        if errors:
+            raise errors[0]
+        return converted, translations
@@ -0,0 +1,261 @@
+import logging
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+# Preprocessing steps, in the order they are applied
+PREPROCESSING_STEPS = ('grayscale', 'binarize', 'deskew', 'crop')
+# ITU-R 601 luma weights, the ones PIL uses for RGB to L conversions
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def to_grayscale(pixels: np.ndarray) -> np.ndarray:
+    """
+    Converts the pixels of an image to grayscale.
+
+    :param pixels: array of shape (height, width) or (height, width, channels)
+    :return: float32 array of shape (height, width), 0 is black and 255 white
+    """
+    if pixels.ndim == 2:
+        return pixels.astype(np.float32)
+    return pixels[..., :3].astype(np.float32) @ LUMA_WEIGHTS
+
+
+def grayscale_pixels(image) -> np.ndarray:
+    """
+    Returns the luminance of every pixel of an image, whatever its mode. Palette, black and white and images with an
+    alpha channel are converted by PIL, 16 bit images are scaled down to the 0-255 range instead of being clipped.
+
+    :param image: PIL image
+    :return: float32 array of shape (height, width), 0 is black and 255 white
+    """
+    if image.mode.startswith('I;16') or image.mode == 'I':
+        pixels = np.asarray(image, dtype=np.float32)
+        if image.mode != 'I' or pixels.max(initial=0) > 255:
+            pixels /= 257
+        return pixels
+    if image.mode not in ('L', 'RGB'):
+        image = image.convert('L')
+    return to_grayscale(np.asarray(image))
+
+
+def _window_sums(values: np.ndarray, window: int, axis: int) -> (np.ndarray, np.ndarray):
+    """
+    Sums values over a sliding window along one axis using a cumulative sum. Windows are clipped at the edges.
+
+    :param values: 2D array
+    :param window: size of the window
+    :param axis: axis the window slides along
+    :return: tuple of the window sums (same shape as values) and the size of every (clipped) window
+    """
+    length = values.shape[axis]
+    cumulative = np.concatenate((np.zeros_like(values.take([0], axis=axis)), values.cumsum(axis=axis)), axis=axis)
+    positions = np.arange(length)
+    starts = np.clip(positions - window // 2, 0, length)
+    ends = np.clip(positions + window // 2 + 1, 0, length)
+    return cumulative.take(ends, axis=axis) - cumulative.take(starts, axis=axis), ends - starts
+
+
+def adaptive_threshold(gray: np.ndarray, window: int = 31, sensitivity: float = 0.15) -> np.ndarray:
+    """
+    Finds the ink of a page with Bradley's adaptive thresholding: a pixel is ink when it is darker than the mean of the
+    window around it by more than sensitivity. Unlike a global threshold, it copes with uneven lighting and yellowed
+    paper. Window means are computed with cumulative sums (the window is separable), so the cost doesn't depend on the
+    window size.
+
+    :param gray: grayscale pixels (see to_grayscale)
+    :param window: size of the window around every pixel, in pixels
+    :param sensitivity: how much darker than its surroundings a pixel must be to be ink (0 to 1)
+    :return: boolean array, True for ink
+    """
+    sums, heights = _window_sums(gray.astype(np.float64), window, axis=0)
+    sums, widths = _window_sums(sums, window, axis=1)
+    means = sums / (heights[:, None] * widths[None, :])
+    return gray < means * (1 - sensitivity)
+
+
+def estimate_skew(ink: np.ndarray, max_angle: float = 5, step: float = 0.1, max_pixels: int = 100000) -> float:
+    """
+    Estimates the skew of a page with the projection profile method: the ink is projected on the vertical axis along
+    every candidate angle, and text lines line up (giving the sharpest profile) along the skew angle.
+    Only the coordinates of the ink pixels are sheared, the page is never rotated while searching.
+
+    :param ink: boolean array, True for ink (see adaptive_threshold)
+    :param max_angle: largest skew searched, in degrees
+    :param step: precision of the search, in degrees
+    :param max_pixels: the ink is subsampled down to about this many pixels
+    :return: skew in degrees. Positive when lines go down from left to right.
+    """
+    ys, xs = np.nonzero(ink)
+    if len(ys) < 100:
+        return 0.0
+    stride = max(len(ys) // max_pixels, 1)
+    ys, xs = ys[::stride].astype(np.float64), xs[::stride].astype(np.float64)
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-max_angle, max_angle + step / 2, step):
+        rows = np.round(ys - xs * np.tan(np.radians(angle))).astype(np.int64)
+        profile = np.bincount(rows - rows.min()).astype(np.float64)
+        score = float(np.dot(profile, profile))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def ink_bounds(ink: np.ndarray, min_ink: float = 0.002) -> (int, int, int, int):
+    """
+    Returns the bounding box of the ink of a page. Rows and columns with less than min_ink of their pixels inked (dust,
+    noise) are ignored.
+
+    :param ink: boolean array, True for ink (see adaptive_threshold)
+    :param min_ink: share of pixels a row or column must have inked to count
+    :return: (left, top, right, bottom) tuple, None when the page has no ink
+    """
+    rows = np.nonzero(ink.mean(axis=1) > min_ink)[0]
+    columns = np.nonzero(ink.mean(axis=0) > min_ink)[0]
+    if not len(rows) or not len(columns):
+        return None
+    return int(columns[0]), int(rows[0]), int(columns[-1]) + 1, int(rows[-1]) + 1
+
+
+class Preprocessor:
+    def __init__(self, grayscale: bool = True, binarize: bool = False, deskew: bool = False, crop: bool = False,
+                 window: int = 31, sensitivity: float = 0.15, max_angle: float = 5, margin: int = 20,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Cleans rasterized pages up before OCR: tesseract is faster on smaller, straight, black and white images and
+        gives better text (which is then cheaper to translate).
+        Every step is optional and is implemented with NumPy array operations. The time spent in every step is
+        measured (see stats).
+
+        :param grayscale: convert pages to grayscale
+        :param binarize: convert pages to black and white with adaptive thresholding (see adaptive_threshold). Black
+        and white pages are piped to tesseract as 1 bit images.
+        :param deskew: straighten skewed pages (see estimate_skew)
+        :param crop: crop the blank margins of pages. Bounding boxes found in layout mode are then relative to the
+        cropped page.
+        :param window: adaptive thresholding window, in pixels
+        :param sensitivity: adaptive thresholding sensitivity (0 to 1)
+        :param max_angle: largest skew corrected, in degrees
+        :param margin: blank margin kept around the ink when cropping, in pixels
+        :param logger: logger
+        """
+        self.grayscale = grayscale
+        self.binarize = binarize
+        self.deskew = deskew
+        self.crop = crop
+        self.window = window
+        self.sensitivity = sensitivity
+        self.max_angle = max_angle
+        self.margin = margin
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._page_count = 0
+        self._seconds = dict.fromkeys(PREPROCESSING_STEPS, 0.0)
+
+    @classmethod
+    def from_steps(cls, steps: str, logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Creates a preprocessor applying the given steps.
+
+        :param steps: comma separated steps (see PREPROCESSING_STEPS), eg. 'binarize,deskew,crop'
+        :param logger: logger
+        :return: Preprocessor
+        """
+        steps = [step.strip() for step in steps.split(',') if step.strip()]
+        for step in steps:
+            if step not in PREPROCESSING_STEPS:
+                raise ValueError(f'Unknown preprocessing step: {step}')
+        return cls(logger=logger, **{step: step in steps for step in PREPROCESSING_STEPS})
+
+    def to_dict(self) -> dict:
+        """
+        Returns the preprocessing settings as a dictionary, Preprocessor(**to_dict()) preprocesses pages the same way.
+
+        :return: dictionary of the constructor arguments (except the logger)
+        """
+        return {'grayscale': self.grayscale, 'binarize': self.binarize, 'deskew': self.deskew, 'crop': self.crop,
+                'window': self.window, 'sensitivity': self.sensitivity, 'max_angle': self.max_angle,
+                'margin': self.margin}
+
+    @property
+    def steps(self) -> [str]:
+        """
+        :return: names of the enabled steps, in the order they are applied
+        """
+        return [step for step in PREPROCESSING_STEPS if getattr(self, step)]
+
+    @property
+    def settings(self) -> str:
+        """
+        Describes the preprocessing. Results of pages preprocessed differently are never mixed (see Converter.settings).
+
+        :return: string identifying the preprocessing settings
+        """
+        return (f'{"+".join(self.steps)}:window={self.window}:sensitivity={self.sensitivity}:'
+                f'max_angle={self.max_angle}:margin={self.margin}')
+
+    def _timed(self, step: str, start: float):
+        with self._lock:
+            self._seconds[step] += time.perf_counter() - start
+
+    def process(self, image):
+        """
+        Applies the enabled steps to a page.
+
+        :param image: PIL image
+        :return: preprocessed PIL image (mode '1' when binarized)
+        """
+        steps = self.steps
+        if not steps:
+            return image
+        start = time.perf_counter()
+        gray = grayscale_pixels(image)
+        if self.grayscale:
+            image = Image.fromarray(gray.astype(np.uint8))
+            self._timed('grayscale', start)
+
+        ink = None
+        if self.binarize or self.deskew or self.crop:
+            start = time.perf_counter()
+            ink = adaptive_threshold(gray, window=self.window, sensitivity=self.sensitivity)
+            if self.binarize:
+                image = Image.fromarray(~ink)
+                self._timed('binarize', start)
+
+        if self.deskew:
+            start = time.perf_counter()
+            angle = estimate_skew(ink, max_angle=self.max_angle)
+            if angle:
+                white = 1 if image.mode == '1' else 255 if image.mode == 'L' else (255,) * len(image.getbands())
+                image = image.rotate(angle, resample=Image.NEAREST if image.mode == '1' else Image.BILINEAR,
+                                     fillcolor=white)
+                ink = np.asarray(Image.fromarray(ink).rotate(angle, fillcolor=0))
+                self.logger.debug(f'Deskewed page by {angle:.1f} degrees')
+            self._timed('deskew', start)
+
+        if self.crop:
+            start = time.perf_counter()
+            bounds = ink_bounds(ink)
+            if bounds is not None:
+                left, top, right, bottom = bounds
+                image = image.crop((max(left - self.margin, 0), max(top - self.margin, 0),
+                                    min(right + self.margin, image.width), min(bottom + self.margin, image.height)))
+            self._timed('crop', start)
+
+        with self._lock:
+            self._page_count += 1
+        return image
+
+    def __call__(self, image):
+        return self.process(image)
+
+    def stats(self) -> dict:
+        """
+        Returns the time spent preprocessing.
+
+        :return: dictionary with the number of 'pages' preprocessed and the total 'seconds' spent in every step
+        """
+        with self._lock:
+            return {'pages': self._page_count, 'seconds': {step: self._seconds[step] for step in self.steps}}
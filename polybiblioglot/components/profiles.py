@@ -0,0 +1,93 @@
+from PIL import Image
+
+
+class OcrProfile:
+    def __init__(self, name: str, dpi: int = 200, grayscale: bool = False, oem: int = None, psm: int = None,
+                 lang: str = None, tessdata_dir: str = None, max_width: int = None):
+        """
+        A named set of OCR settings trading accuracy for speed.
+
+        :param name: name of the profile
+        :param dpi: resolution pdf pages are rasterized at
+        :param grayscale: rasterize and OCR pages in grayscale (tesseract binarizes the page anyway)
+        :param oem: tesseract OCR engine mode (0 legacy, 1 LSTM, 2 both, 3 default), tesseract's default when None
+        :param psm: tesseract page segmentation mode, tesseract's default when None
+        :param lang: tesseract language pack(s) (eg. 'eng' or 'deu+fra'). The converter's language is used when None.
+        :param tessdata_dir: (optional) directory containing the language packs (eg. tessdata_fast or tessdata_best)
+        :param max_width: (optional) images wider than this are downscaled before OCR
+        """
+        self.name = name
+        self.dpi = dpi
+        self.grayscale = grayscale
+        self.oem = oem
+        self.psm = psm
+        self.lang = lang
+        self.tessdata_dir = tessdata_dir
+        self.max_width = max_width
+
+    @property
+    def config(self) -> str:
+        """
+        Returns the tesseract command line options of the profile.
+
+        :return: tesseract configuration string
+        """
+        options = []
+        if self.oem is not None:
+            options += [f'--oem {self.oem}']
+        if self.psm is not None:
+            options += [f'--psm {self.psm}']
+        if self.tessdata_dir is not None:
+            options += [f'--tessdata-dir "{self.tessdata_dir}"']
+        return ' '.join(options)
+
+    def prepare(self, image):
+        """
+        Applies the image settings of the profile (grayscale conversion and downscaling) to an image.
+
+        :param image: PIL image
+        :return: PIL image ready for OCR
+        """
+        if self.grayscale and image.mode != 'L':
+            image = image.convert('L')
+        if self.max_width is not None and image.width > self.max_width:
+            height = round(image.height * self.max_width / image.width)
+            image = image.resize((self.max_width, height), Image.LANCZOS)
+        return image
+
+    def to_dict(self) -> dict:
+        """
+        Returns the profile as a dictionary, to be stored alongside results.
+
+        :return: dictionary of the profile settings
+        """
+        return dict(self.__dict__)
+
+    def __repr__(self):
+        return f'OcrProfile({", ".join(f"{key}={value!r}" for key, value in self.__dict__.items())})'
+
+
+OCR_PROFILES = {
+    # tesseract's own defaults on color pages rasterized at 200 dpi, what every version before profiles did
+    'default': OcrProfile('default', dpi=200),
+    # quick drafts and triage: low resolution, single block page segmentation and the LSTM engine only
+    'fast': OcrProfile('fast', dpi=150, grayscale=True, oem=1, psm=6, max_width=1800),
+    'balanced': OcrProfile('balanced', dpi=200, grayscale=True, oem=1),
+    # archival quality: high resolution color pages with tesseract's default engine
+    'accurate': OcrProfile('accurate', dpi=300),
+}
+DEFAULT_OCR_PROFILE = 'default'
+
+
+def get_profile(profile) -> OcrProfile:
+    """
+    Returns an OCR profile given its name. Profiles are returned as is.
+
+    :param profile: profile name (see OCR_PROFILES) or OcrProfile
+    :return: OcrProfile
+    """
+    if isinstance(profile, OcrProfile):
+        return profile
+    if profile not in OCR_PROFILES:
+        raise ValueError(f'Unknown OCR profile: {profile}')
+    return OCR_PROFILES[profile]
@@ -0,0 +1,195 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from polybiblioglot.components.metrics import Metrics
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, queue: str, fn, args: tuple, on_done=None):
+        """
+        A unit of background work managed by a JobScheduler.
+        The job function is called as fn(job, *args). Long running functions should call job.report regularly, it
+        updates the progress of the job and raises JobCancelled once the job has been cancelled.
+
+        :param queue: name of the queue the job belongs to
+        :param fn: function to run
+        :param args: arguments passed to fn after the job itself
+        :param on_done: (optional) function called with the job once it is finished (see JobScheduler.poll)
+        """
+        self.queue = queue
+        self.fn = fn
+        self.args = args
+        self.on_done = on_done
+        self.done_count = 0
+        self.total = 0
+        self.result = None
+        self.error: Exception = None
+        self.finished = False
+        self._cancel_event = threading.Event()
+
+    @property
+    def progress(self) -> float:
+        """
+        Returns the progress of the job between 0 and 1.
+
+        :return: progress
+        """
+        if self.finished:
+            return 1.0
+        return self.done_count / self.total if self.total else 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """
+        Requests the job to stop. Jobs that haven't started yet never run, running jobs stop the next time they call
+        report or check.
+
+        :return: None
+        """
+        self._cancel_event.set()
+
+    def check(self):
+        """
+        Raises JobCancelled if the job has been cancelled.
+
+        :return: None
+        """
+        if self.cancelled:
+            raise JobCancelled()
+
+    def report(self, done_count: int, total: int = None):
+        """
+        Updates the progress of the job, then raises JobCancelled if the job has been cancelled.
+
+        :param done_count: number of units of work done (eg. pages converted)
+        :param total: (optional) total number of units of work
+        :return: None
+        """
+        self.done_count = done_count
+        if total is not None:
+            self.total = total
+        self.check()
+
+    def run(self):
+        try:
+            self.check()
+            self.result = self.fn(self, *self.args)
+        except JobCancelled:
+            pass
+        except Exception as e:
+            self.error = e
+        self.finished = True
+
+
+class JobScheduler:
+    def __init__(self, max_workers: int = 2, logger: logging.Logger = logging.getLogger(__name__),
+                 metrics: Metrics = None):
+        """
+        Runs background jobs on a bounded thread pool.
+        Jobs are submitted to named queues. Jobs in the same queue run one after the other in submission order, jobs in
+        different queues run concurrently (up to max_workers at once).
+        Completion callbacks are not called from the worker threads: they are called by poll, which is meant to be
+        called regularly from the UI thread.
+
+        :param max_workers: maximum number of jobs running at once
+        :param logger: logger
+        :param metrics: (optional) metrics registry recording queue depths, job durations and callback durations
+        """
+        self.logger = logger
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._queues = {}  # queue name -> deque of jobs, the first job of a queue is the one running
+        self._finished = deque()
+
+    def submit(self, queue: str, fn, *args, on_done=None) -> Job:
+        """
+        Submits a job.
+
+        :param queue: name of the queue to add the job to
+        :param fn: function to run, called as fn(job, *args)
+        :param args: arguments passed to fn
+        :param on_done: (optional) function called with the job from poll once the job is finished
+        :return: Job
+        """
+        job = Job(queue, fn, args, on_done=on_done)
+        self.metrics.add('queue_depth', 1, queue=queue)
+        with self._lock:
+            jobs = self._queues.setdefault(queue, deque())
+            jobs.append(job)
+            if len(jobs) == 1:
+                self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: Job):
+        with self.metrics.time('job_seconds', job=job.fn.__name__):
+            job.run()
+        self.metrics.add('queue_depth', -1, queue=job.queue)
+        if job.error is not None:
+            self.logger.error(f'Job failed: {job.error}')
+        with self._lock:
+            self._finished.append(job)
+            jobs = self._queues[job.queue]
+            jobs.popleft()
+            if jobs:
+                self._executor.submit(self._run, jobs[0])
+            else:
+                del self._queues[job.queue]
+
+    def jobs(self, queue: str) -> [Job]:
+        """
+        Returns the jobs of a queue that are not finished yet, the running job first.
+
+        :param queue: queue name
+        :return: list of jobs
+        """
+        with self._lock:
+            return list(self._queues.get(queue, ()))
+
+    def cancel(self, queue: str):
+        """
+        Cancels every job of a queue.
+
+        :param queue: queue name
+        :return: None
+        """
+        for job in self.jobs(queue):
+            job.cancel()
+
+    def poll(self) -> [Job]:
+        """
+        Calls the completion callbacks of the jobs that finished since the last call.
+        Must be called from the thread the callbacks should run in (the UI thread).
+
+        :return: list of the jobs that finished
+        """
+        with self._lock:
+            finished = list(self._finished)
+            self._finished.clear()
+        for job in finished:
+            if job.on_done is not None:
+                with self.metrics.time('callback_seconds', callback=job.on_done.__name__):
+                    job.on_done(job)
+        return finished
+
+    def shutdown(self):
+        """
+        Cancels every job and waits for the running ones to stop.
+
+        :return: None
+        """
+        with self._lock:
+            queues = list(self._queues)
+        for queue in queues:
+            self.cancel(queue)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,211 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+from polybiblioglot.components.cache import DEFAULT_CACHE_DIR
+
+DEFAULT_SEARCH_INDEX = os.path.join(DEFAULT_CACHE_DIR, 'search_index.sqlite3')
+# kinds of text indexed for every page
+TEXT_KINDS = ('source', 'translation')
+
+
+class SearchIndex:
+    def __init__(self, path: str = DEFAULT_SEARCH_INDEX, logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Local full-text index of the converted and translated pages of the library.
+        Pages are stored in SQLite and indexed with FTS5 (words are case and accent insensitive), so a phrase is found
+        across every processed book without reading any file. Pages are added one at a time as they are converted or
+        translated, adding a page again replaces it.
+
+        :param path: path to the SQLite database. ':memory:' keeps the index for the lifetime of the object only.
+        :param logger: logger
+        """
+        self.logger = logger
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # pages are added from worker threads, access is serialized with self._lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        # the GUI and batch runs can use the same index at once, WAL lets them read while the other one writes
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            'id INTEGER PRIMARY KEY, '
+            'path TEXT NOT NULL UNIQUE'
+            ');'
+            'CREATE TABLE IF NOT EXISTS pages ('
+            'id INTEGER PRIMARY KEY, '
+            'document INTEGER NOT NULL REFERENCES documents (id), '
+            'page INTEGER NOT NULL, '
+            'kind TEXT NOT NULL, '
+            'language TEXT NOT NULL, '
+            'text TEXT NOT NULL, '
+            'UNIQUE (document, page, kind, language)'
+            ');'
+            # the FTS table only holds the index, the text itself stays in pages (external content table). Prefixes of
+            # 2 and 3 characters are indexed too, short prefix searches (eg. tr*) would scan most of the index otherwise
+            "CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5("
+            "text, content='pages', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+            ");"
+            'CREATE TRIGGER IF NOT EXISTS pages_insert AFTER INSERT ON pages BEGIN '
+            'INSERT INTO pages_fts (rowid, text) VALUES (new.id, new.text); '
+            'END;'
+            'CREATE TRIGGER IF NOT EXISTS pages_delete AFTER DELETE ON pages BEGIN '
+            "INSERT INTO pages_fts (pages_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+            'END;'
+            'CREATE TRIGGER IF NOT EXISTS pages_update AFTER UPDATE OF text ON pages BEGIN '
+            "INSERT INTO pages_fts (pages_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+            'INSERT INTO pages_fts (rowid, text) VALUES (new.id, new.text); '
+            'END;'
+        )
+        self._connection.commit()
+
+    def _document_id(self, path: str, create: bool = True) -> int:
+        path = os.path.abspath(path)
+        row = self._connection.execute('SELECT id FROM documents WHERE path = ?', (path,)).fetchone()
+        if row is not None:
+            return row[0]
+        if not create:
+            return None
+        return self._connection.execute('INSERT INTO documents (path) VALUES (?)', (path,)).lastrowid
+
+    def add_page(self, document_path: str, page: int, text: str, kind: str = 'source', language: str = ''):
+        """
+        Indexes a page, replacing the previous version of the page if it was already indexed.
+
+        :param document_path: path to the document (pdf or image) the page belongs to
+        :param page: page number (1-indexed)
+        :param text: text of the page
+        :param kind: 'source' for the text extracted with OCR, 'translation' for a translation (see TEXT_KINDS)
+        :param language: language code of the text (eg. 'de')
+        :return: None
+        """
+        if kind not in TEXT_KINDS:
+            raise ValueError(f'Unknown text kind: {kind}')
+        with self._lock:
+            document = self._document_id(document_path)
+            updated = self._connection.execute(
+                'UPDATE pages SET text = ? WHERE document = ? AND page = ? AND kind = ? AND language = ?',
+                (text, document, page, kind, language)
+            ).rowcount
+            if not updated:
+                self._connection.execute(
+                    'INSERT INTO pages (document, page, kind, language, text) VALUES (?, ?, ?, ?, ?)',
+                    (document, page, kind, language, text)
+                )
+            # pages are committed one at a time so they are searchable while the rest of the book is processed
+            self._connection.commit()
+
+    def add_document(self, document_path: str, pages: [str], kind: str = 'source', language: str = ''):
+        """
+        Indexes every page of a document at once (see add_page).
+
+        :param document_path: path to the document
+        :param pages: text of every page, in order
+        :param kind: 'source' or 'translation' (see TEXT_KINDS)
+        :param language: language code of the text
+        :return: None
+        """
+        for page, text in enumerate(pages, start=1):
+            self.add_page(document_path, page, text, kind=kind, language=language)
+
+    def has_document(self, document_path: str, kind: str = None) -> bool:
+        """
+        Checks whether pages of a document are indexed.
+
+        :param document_path: path to the document
+        :param kind: (optional) only look for pages of this kind
+        :return: True if at least one page is indexed
+        """
+        with self._lock:
+            document = self._document_id(document_path, create=False)
+            if document is None:
+                return False
+            query, parameters = 'SELECT 1 FROM pages WHERE document = ?', [document]
+            if kind is not None:
+                query, parameters = query + ' AND kind = ?', parameters + [kind]
+            return self._connection.execute(query + ' LIMIT 1', parameters).fetchone() is not None
+
+    def remove_document(self, document_path: str):
+        """
+        Removes every page of a document from the index.
+
+        :param document_path: path to the document
+        :return: None
+        """
+        with self._lock:
+            document = self._document_id(document_path, create=False)
+            if document is not None:
+                self._connection.execute('DELETE FROM pages WHERE document = ?', (document,))
+                self._connection.execute('DELETE FROM documents WHERE id = ?', (document,))
+                self._connection.commit()
+
+    @staticmethod
+    def to_match_query(query: str) -> str:
+        """
+        Converts a search as typed by a user into an FTS5 query. Every word must appear on the page, "quoted phrases"
+        must appear as is and a trailing * matches any word starting with the prefix (eg. transl*).
+
+        :param query: user query
+        :return: FTS5 MATCH expression
+        """
+        terms = []
+        for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+            prefix = word.endswith('*')
+            text = (phrase or word.rstrip('*')).replace('"', '""')
+            if text.strip():
+                terms += [f'"{text}"' + ('*' if prefix else '')]
+        return ' '.join(terms)
+
+    def search(self, query: str, limit: int = 20, kind: str = None, language: str = None) -> [dict]:
+        """
+        Searches the library. Results are ranked by relevance (BM25).
+
+        :param query: words and "quoted phrases" to look for (see to_match_query)
+        :param limit: maximum number of results
+        :param kind: (optional) only search pages of this kind ('source' or 'translation')
+        :param language: (optional) only search pages in this language (eg. 'de')
+        :return: list of results ({'path', 'page', 'kind', 'language', 'snippet'}), the snippet shows the matches in
+        [brackets]
+        """
+        match = self.to_match_query(query)
+        if not match:
+            return []
+        sql = ("SELECT documents.path, pages.page, pages.kind, pages.language, "
+               "snippet(pages_fts, 0, '[', ']', '...', 16) "
+               "FROM pages_fts JOIN pages ON pages.id = pages_fts.rowid "
+               "JOIN documents ON documents.id = pages.document "
+               "WHERE pages_fts MATCH ?")
+        parameters = [match]
+        if kind is not None:
+            sql, parameters = sql + ' AND pages.kind = ?', parameters + [kind]
+        if language is not None:
+            sql, parameters = sql + ' AND pages.language = ?', parameters + [language]
+        sql, parameters = sql + ' ORDER BY bm25(pages_fts) LIMIT ?', parameters + [limit]
+        with self._lock:
+            rows = self._connection.execute(sql, parameters).fetchall()
+        return [{'path': path, 'page': page, 'kind': kind, 'language': language, 'snippet': ' '.join(snippet.split())}
+                for path, page, kind, language, snippet in rows]
+
+    def stats(self) -> dict:
+        """
+        Returns the size of the index.
+
+        :return: dictionary with the number of indexed documents and pages
+        """
+        with self._lock:
+            documents = self._connection.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+            pages = self._connection.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+        return {'documents': documents, 'pages': pages}
+
+    def close(self):
+        """
+        Closes the underlying database.
+
+        :return: None
+        """
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,105 @@
+import re
+
+# This module splits text into segments small enough to be sent to a translation API, and packs those segments into
+# batches that respect the API's request size limits.
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?;:])\s+')
+
+
+def _split_long(text: str, max_chars: int) -> [str]:
+    """
+    Splits a piece of text that has no usable sentence boundary into chunks of at most max_chars characters, breaking
+    on whitespace whenever possible.
+
+    :param text: text to split
+    :param max_chars: maximum length of a chunk
+    :return: list of chunks
+    """
+    chunks = []
+    while len(text) > max_chars:
+        cut = text.rfind(' ', 0, max_chars + 1)
+        if cut <= 0:
+            cut = max_chars
+        chunks += [text[:cut].strip()]
+        text = text[cut:].strip()
+    if text:
+        chunks += [text]
+    return chunks
+
+
+def split_paragraph(paragraph: str, max_chars: int) -> [str]:
+    """
+    Splits a paragraph into segments of at most max_chars characters.
+    The paragraph is kept whole when it fits, otherwise it is split on sentence boundaries and consecutive sentences
+    are merged back together as long as they fit.
+
+    :param paragraph: paragraph to split
+    :param max_chars: maximum length of a segment
+    :return: list of segments
+    """
+    paragraph = ' '.join(paragraph.split())
+    if len(paragraph) <= max_chars:
+        return [paragraph] if paragraph else []
+
+    segments = []
+    current = ''
+    for sentence in _SENTENCE_BREAK.split(paragraph):
+        for piece in _split_long(sentence, max_chars):
+            if current and len(current) + 1 + len(piece) <= max_chars:
+                current = f'{current} {piece}'
+            else:
+                if current:
+                    segments += [current]
+                current = piece
+    if current:
+        segments += [current]
+    return segments
+
+
+def segment_text(text: str, max_chars: int) -> [[str]]:
+    """
+    Splits text into paragraphs, and each paragraph into segments of at most max_chars characters.
+    Empty paragraphs are dropped.
+
+    :param text: text to split
+    :param max_chars: maximum length of a segment
+    :return: list of paragraphs, each paragraph being a list of segments
+    """
+    paragraphs = [split_paragraph(paragraph, max_chars) for paragraph in _PARAGRAPH_BREAK.split(text)]
+    return [paragraph for paragraph in paragraphs if paragraph]
+
+
+def join_segments(paragraphs: [[str]]) -> str:
+    """
+    Reassembles text split by segment_text.
+
+    :param paragraphs: list of paragraphs, each paragraph being a list of segments
+    :return: text
+    """
+    return '\n\n'.join(' '.join(segments) for segments in paragraphs)
+
+
+def pack_segments(segments: [str], max_chars: int, max_segments: int) -> [[str]]:
+    """
+    Packs segments into batches, keeping their order.
+    A batch holds at most max_segments segments and max_chars characters in total.
+
+    :param segments: segments to pack (each segment must be at most max_chars long)
+    :param max_chars: maximum number of characters in a batch
+    :param max_segments: maximum number of segments in a batch
+    :return: list of batches
+    """
+    batches = []
+    batch = []
+    batch_chars = 0
+    for segment in segments:
+        if batch and (len(batch) >= max_segments or batch_chars + len(segment) > max_chars):
+            batches += [batch]
+            batch = []
+            batch_chars = 0
+        batch += [segment]
+        batch_chars += len(segment)
+    if batch:
+        batches += [batch]
+    return batches
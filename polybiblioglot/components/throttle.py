@@ -0,0 +1,45 @@
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Thread safe token bucket rate limiter.
+        Tokens are added at `rate` tokens per second up to `capacity`. Every call to acquire takes tokens from the
+        bucket, blocking until enough are available. This allows short bursts of up to `capacity` calls while keeping
+        the average rate under `rate` calls per second.
+
+        :param rate: number of tokens added per second
+        :param capacity: maximum number of tokens in the bucket (defaults to rate, ie. one second worth of burst)
+        """
+        if rate <= 0:
+            raise ValueError('The rate of a token bucket must be positive')
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens: float = 1):
+        """
+        Takes tokens from the bucket, blocking until they are available.
+
+        :param tokens: number of tokens to take
+        :return: time spent waiting, in seconds
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
@@ -0,0 +1,271 @@
+import asyncio
+import os
+import re
+import threading
+import types
+
+from translate import Translator
+
+TRANSLATOR_TYPES = types.SimpleNamespace()
+# name -> class of every registered translation backend (see register_translation_backend)
+TRANSLATION_BACKENDS = {}
+
+# default url of the IBM translation API (see MultiTranslator's ibm_url)
+IBM_TRANSLATE_URL = 'https://api.us-south.language-translator.watson.cloud.ibm.com/instances/c9cf4fc5-460c-40fa-8338-b524a9428899/v3/translate?version=2018-05-01'
+# directory the phrase tables of the offline backend are read from (see PhraseTableBackend)
+DEFAULT_PHRASE_TABLE_DIR = os.path.join(os.path.expanduser('~'), '.local', 'share', 'polybiblioglot', 'phrase_tables')
+
+
+class AuthenticationError(Exception):
+    pass
+
+
+class ApiError(Exception):
+    pass
+
+
+class UnsupportedLanguagePair(Exception):
+    pass
+
+
+def register_translation_backend(backend_class):
+    """
+    Registers a translation backend under its name, so MultiTranslator (and the translation method options of the CLI
+    and GUI) can use it. Can be used as a class decorator.
+
+    :param backend_class: subclass of TranslationBackend
+    :return: backend_class
+    """
+    if not backend_class.name:
+        raise ValueError('Translation backends must have a name')
+    TRANSLATION_BACKENDS[backend_class.name] = backend_class
+    setattr(TRANSLATOR_TYPES, backend_class.name, backend_class.name)
+    return backend_class
+
+
+class TranslationBackend:
+    """
+    Base class of the translation APIs and engines a MultiTranslator can use.
+    Subclasses declare their capabilities as class attributes and implement translate_batch.
+    """
+    name = ''
+    # maximum number of characters sent in one batch
+    max_chars = 499
+    # maximum number of segments sent in one batch
+    max_segments = 1
+    # True when the backend runs in-process without network access. Its batches are translated one after the other in
+    # the calling thread instead of being sent concurrently.
+    local = False
+
+    def __init__(self, translator):
+        """
+        :param translator: MultiTranslator using the backend (gives access to its session, rate limiter and settings)
+        """
+        self.translator = translator
+
+    @property
+    def pairs(self) -> {(str, str)}:
+        """
+        Returns the (source, destination) language code pairs the backend can translate.
+
+        :return: set of pairs, None when any pair is accepted (and left to the API to refuse)
+        """
+        return None
+
+    def supports(self, source: str, destination: str) -> bool:
+        """
+        Checks whether the backend can translate from source to destination.
+
+        :param source: source language code (eg. 'en')
+        :param destination: destination language code (eg. 'de')
+        :return: True if the pair is supported
+        """
+        pairs = self.pairs
+        return pairs is None or (source, destination) in pairs
+
+    def translate_batch(self, segments: [str], source: str, destination: str, authentication=None) -> [str]:
+        """
+        Translates a batch of segments (see max_chars and max_segments for the size of a batch).
+
+        :param segments: segments to translate
+        :param source: source language code (eg. 'en')
+        :param destination: destination language code (eg. 'de')
+        :param authentication: The authentication token/username+password/etc. for the translation API
+        :return: list of translated segments, in the same order as segments
+        """
+        raise NotImplementedError()
+
+    async def translate_batch_async(self, segments: [str], source: str, destination: str,
+                                    authentication=None) -> [str]:
+        """
+        Asynchronous version of translate_batch. Runs translate_batch in the event loop's default executor unless the
+        backend overrides it with a natively asynchronous implementation.
+
+        :param segments: segments to translate
+        :param source: source language code (eg. 'en')
+        :param destination: destination language code (eg. 'de')
+        :param authentication: The authentication token/username+password/etc. for the translation API
+        :return: list of translated segments, in the same order as segments
+        """
+        if self.local:
+            return self.translate_batch(segments, source, destination, authentication)
+        return await asyncio.get_event_loop().run_in_executor(None, self.translate_batch, segments, source,
+                                                              destination, authentication)
+
+
+@register_translation_backend
+class TranslateModuleBackend(TranslationBackend):
+    """
+    Free API of the translate module. It refuses queries of 500 characters or more and only takes one at a time.
+    """
+    name = 'translator'
+    max_chars = 499
+    max_segments = 1
+
+    def translate_batch(self, segments: [str], source: str, destination: str, authentication=None) -> [str]:
+        self.translator.logger.debug('Translating with the translator module')
+        translate = Translator(from_lang=source, to_lang=destination)
+        output = []
+        for segment in segments:
+            if self.translator.rate_limiter is not None:
+                self.translator.rate_limiter.acquire()
+            output += [translate.translate(segment)]
+        return output
+
+
+@register_translation_backend
+class IbmBackend(TranslationBackend):
+    """
+    IBM cloud translation API (free tier), at MultiTranslator's ibm_url. IBM refuses requests over 50KB so batches keep
+    a margin for multibyte characters and JSON overhead.
+    """
+    name = 'ibm'
+    max_chars = 10000
+    max_segments = 1000
+
+    def translate_batch(self, segments: [str], source: str, destination: str, authentication=None) -> [str]:
+        self.translator.logger.debug('Translating with IBM')
+        try:
+            api_token = authentication['token']
+        except:
+            raise AuthenticationError('The token was not found')
+        body = {
+            "text": segments,
+            "model_id": f'{source}-{destination}'
+        }
+        headers = {
+            'Content-Type': 'application/json'
+        }
+        response = self.translator._post(self.translator.ibm_url, json=body, auth=('apikey', api_token),
+                                         headers=headers)
+        if response.status_code != 200:
+            raise ApiError(response.text)
+
+        return [translation['translation'] for translation in response.json()['translations']]
+
+
+@register_translation_backend
+class PhraseTableBackend(TranslationBackend):
+    """
+    Offline translation with phrase tables, for machines without network access.
+    A phrase table is a UTF-8 text file named <source>-<destination>.tsv (eg. de-fr.tsv) in MultiTranslator's
+    phrase_table_dir, with one "phrase<TAB>translation" entry per line (lines starting with # are ignored).
+    Segments are translated by replacing the longest known phrases, case insensitively. Words that are not in the table
+    are kept as they are, punctuation and spacing are preserved, and translations starting a sentence are capitalized.
+    """
+    name = 'phrase_table'
+    max_chars = 100000
+    max_segments = 1000
+    local = True
+
+    # words, phrases never span punctuation
+    WORD_PATTERN = re.compile(r"\w+(?:['’]\w+)*")
+
+    def __init__(self, translator):
+        super().__init__(translator)
+        self._tables = {}  # (source, destination) -> (phrases, longest phrase in words)
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> str:
+        return self.translator.phrase_table_dir
+
+    @property
+    def pairs(self) -> {(str, str)}:
+        if not os.path.isdir(self.directory):
+            return set()
+        return {tuple(file_name[:-len('.tsv')].split('-', 1)) for file_name in os.listdir(self.directory)
+                if file_name.endswith('.tsv') and '-' in file_name}
+
+    def supports(self, source: str, destination: str) -> bool:
+        return os.path.isfile(os.path.join(self.directory, f'{source}-{destination}.tsv'))
+
+    @staticmethod
+    def normalize(phrase: str) -> str:
+        return ' '.join(PhraseTableBackend.WORD_PATTERN.findall(phrase.casefold()))
+
+    def table(self, source: str, destination: str) -> (dict, int):
+        """
+        Returns the phrase table of a language pair, read from disk the first time.
+
+        :param source: source language code
+        :param destination: destination language code
+        :return: dictionary mapping normalized phrases to their translation, and the length of the longest phrase
+        """
+        with self._lock:
+            if (source, destination) not in self._tables:
+                path = os.path.join(self.directory, f'{source}-{destination}.tsv')
+                if not os.path.isfile(path):
+                    raise UnsupportedLanguagePair(f'No phrase table for {source}-{destination} in {self.directory}')
+                phrases = {}
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        if line.startswith('#') or '\t' not in line:
+                            continue
+                        phrase, translation = line.rstrip('\r\n').split('\t', 1)
+                        key = self.normalize(phrase)
+                        if key:
+                            phrases[key] = translation.strip()
+                longest = max((key.count(' ') + 1 for key in phrases), default=0)
+                self.translator.logger.debug(f'Loaded {len(phrases)} phrases from {path}')
+                self._tables[(source, destination)] = phrases, longest
+            return self._tables[(source, destination)]
+
+    def translate_segment(self, segment: str, phrases: dict, longest: int) -> str:
+        """
+        Translates a segment by replacing the longest known phrases, left to right.
+
+        :param segment: segment to translate
+        :param phrases: phrase table (see table)
+        :param longest: number of words of the longest phrase
+        :return: translated segment
+        """
+        words = list(self.WORD_PATTERN.finditer(segment))
+        output = []
+        position = 0
+        index = 0
+        while index < len(words):
+            # a phrase covers consecutive words only separated by whitespace
+            end = index + 1
+            while end < len(words) and end - index < longest and \
+                    not segment[words[end - 1].end():words[end].start()].strip():
+                end += 1
+            for length in range(end - index, 0, -1):
+                translation = phrases.get(' '.join(word.group().casefold() for word in words[index:index + length]))
+                if translation is not None:
+                    break
+            else:
+                length, translation = 1, words[index].group()
+            first, last = words[index], words[index + length - 1]
+            # only sentence starts keep their capital (German capitalizes every noun for instance)
+            sentence_start = not segment[:first.start()].strip() or segment[:first.start()].rstrip()[-1] in '.!?:'
+            if sentence_start and first.group()[:1].isupper() and translation:
+                translation = translation[0].upper() + translation[1:]
+            output += [segment[position:first.start()], translation]
+            position = last.end()
+            index += length
+        return ''.join(output + [segment[position:]])
+
+    def translate_batch(self, segments: [str], source: str, destination: str, authentication=None) -> [str]:
+        phrases, longest = self.table(source, destination)
+        return [self.translate_segment(segment, phrases, longest) for segment in segments]
@@ -0,0 +1,122 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+
+from polybiblioglot.components.cache import DEFAULT_CACHE_DIR
+
+
+class TranslationMemory:
+    def __init__(self, path: str = os.path.join(DEFAULT_CACHE_DIR, 'translation_memory.sqlite3'),
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Local segment level translation memory.
+        Translations are stored in SQLite and keyed on (source, destination, backend, normalized segment), so text that
+        was already translated (running headers, boilerplate, repeated chapters...) never has to be sent to the
+        translation API again.
+        Segments are stored as a hash of their normalized text to keep the index compact.
+
+        :param path: path to the SQLite database. ':memory:' keeps the memory for the lifetime of the object only.
+        :param logger: logger
+        """
+        self.logger = logger
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # the translator is called from background threads, access is serialized with self._lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS segments ('
+            'source TEXT NOT NULL, '
+            'destination TEXT NOT NULL, '
+            'backend TEXT NOT NULL, '
+            'segment BLOB NOT NULL, '
+            'translation TEXT NOT NULL, '
+            'PRIMARY KEY (source, destination, backend, segment)'
+            ') WITHOUT ROWID'
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def normalize(segment: str) -> str:
+        """
+        Normalizes a segment so that insignificant whitespace differences (OCR line wrapping, indentation...) don't
+        cause misses.
+
+        :param segment: text segment
+        :return: normalized segment
+        """
+        return ' '.join(segment.split())
+
+    @staticmethod
+    def _segment_key(segment: str) -> bytes:
+        return hashlib.sha1(TranslationMemory.normalize(segment).encode('utf-8')).digest()
+
+    def get(self, segment: str, source: str, destination: str, backend: str):
+        """
+        Looks up the translation of a segment.
+
+        :param segment: text segment
+        :param source: source language code (eg. 'en')
+        :param destination: destination language code (eg. 'de')
+        :param backend: translation backend the translation was made with
+        :return: the translation, or None if the segment isn't in the memory
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT translation FROM segments WHERE source = ? AND destination = ? AND backend = ? AND segment = ?',
+                (source, destination, backend, self._segment_key(segment))
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, segment: str, translation: str, source: str, destination: str, backend: str):
+        """
+        Stores the translation of a segment.
+
+        :param segment: text segment
+        :param translation: translated segment
+        :param source: source language code (eg. 'en')
+        :param destination: destination language code (eg. 'de')
+        :param backend: translation backend the translation was made with
+        :return: None
+        """
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO segments (source, destination, backend, segment, translation) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (source, destination, backend, self._segment_key(segment), translation)
+            )
+            self._connection.commit()
+
+    def stats(self) -> dict:
+        """
+        Returns usage statistics.
+
+        :return: dictionary with the hits, misses, hit rate and number of stored segments
+        """
+        with self._lock:
+            entries = self._connection.execute('SELECT COUNT(*) FROM segments').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+        }
+
+    def close(self):
+        """
+        Closes the underlying database.
+
+        :return: None
+        """
+        with self._lock:
+            self._connection.close()
@@ -1,51 +1,144 @@
+import asyncio
 import logging
 import requests
-import types
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from translate import Translator
+from polybiblioglot.components.metrics import Metrics
+from polybiblioglot.components.throttle import TokenBucket
+from polybiblioglot.components.segmenter import segment_text, join_segments, pack_segments
+from polybiblioglot.components.translation_backends import TranslationBackend, TRANSLATION_BACKENDS, \
+    IBM_TRANSLATE_URL, DEFAULT_PHRASE_TABLE_DIR, ApiError, UnsupportedLanguagePair
+from polybiblioglot.components.translation_memory import TranslationMemory
 
-TRANSLATOR_TYPES = types.SimpleNamespace()
-TRANSLATOR_TYPES.translator = 'translator'
-TRANSLATOR_TYPES.ibm = 'ibm'
+# Responses with these status codes are retried (rate limited or temporary server errors)
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
 
-# TODO: allow the user to set this url
-IBM_TRANSLATE_URL = 'https://api.us-south.language-translator.watson.cloud.ibm.com/instances/c9cf4fc5-460c-40fa-8338-b524a9428899/v3/translate?version=2018-05-01'
+# Request size limits of the built-in translation backends (see TranslationBackend's max_chars and max_segments)
+TRANSLATOR_LIMITS = {name: {'max_chars': backend.max_chars, 'max_segments': backend.max_segments}
+                     for name, backend in TRANSLATION_BACKENDS.items()}
 
 
 # This module is used to translate text from one language to another.
-# You can speciify what API should be used
-
-# currently supported API are the free API ins the translate module
-# IBM cloud free tier
+# You can speciify what API should be used, see TRANSLATION_BACKENDS for the supported APIs and engines and
+# register_translation_backend to add one.
 
 class InvalidTranslationMethod(Exception):
     pass
 
 
-class AuthenticationError(Exception):
-    pass
-
-
-class ApiError(Exception):
-    pass
-
-
 class MultiTranslator:
-    def __init__(self, translator_type: str, logger: logging.Logger = logging.getLogger(__name__)):
+    def __init__(self, translator_type: str, logger: logging.Logger = logging.getLogger(__name__),
+                 memory: TranslationMemory = None, max_concurrency: int = 4, requests_per_second: float = None,
+                 max_retries: int = 3, backoff: float = 1.0, timeout: float = 60, ibm_url: str = IBM_TRANSLATE_URL,
+                 metrics: Metrics = None, phrase_table_dir: str = DEFAULT_PHRASE_TABLE_DIR):
+        """
+        Translates text using one of the registered translation backends (see TRANSLATION_BACKENDS).
+        Text is split into segments that are packed into batches (see the backend's max_chars and max_segments).
+        Batches are sent concurrently over pooled keep-alive connections, batches of local backends are translated
+        in the calling thread.
+
+        :param translator_type: default translation API
+        :param logger: logger
+        :param memory: (optional) translation memory. Segments found in the memory are not sent to the API.
+        :param max_concurrency: maximum number of requests in flight at once
+        :param requests_per_second: (optional) maximum average number of requests sent per second
+        :param max_retries: number of times a request is retried after a 429/5xx response or a connection error
+        :param backoff: delay before the first retry in seconds, doubled after every attempt
+        :param timeout: request timeout in seconds
+        :param ibm_url: url of the IBM translation API (eg. the url of another instance, or of a local stub)
+        :param metrics: (optional) metrics registry recording request durations, bytes sent, retries and memory hits
+        :param phrase_table_dir: directory of the phrase tables used by the offline phrase_table backend
+        """
         self.logger = logger
+        self.memory = memory
+        self.max_concurrency = max(max_concurrency, 1)
+        self.rate_limiter = TokenBucket(requests_per_second) if requests_per_second else None
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.ibm_url = ibm_url
+        self.phrase_table_dir = phrase_table_dir
+        self._backends = {}  # backend name -> TranslationBackend instance
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
-        if translator_type in TRANSLATOR_TYPES.__dict__.values():
+        if translator_type in TRANSLATION_BACKENDS:
             self.translator_type = translator_type
         else:
             self.logger.error('Translator API type is not valid.')
 
     def set_api(self, translator_type: str):
-        if translator_type in TRANSLATOR_TYPES.__dict__.values():
+        if translator_type in TRANSLATION_BACKENDS:
             self.translator_type = translator_type
         else:
             self.logger.error('Translator API type is not valid.')
 
-    def translate(self, text: str, source: str, destination: str, translation_method='', authentication=None) -> str:
+    def backend(self, translation_method: str = '') -> TranslationBackend:
+        """
+        Returns the instance of a translation backend used by this translator, creating it the first time.
+
+        :param translation_method: backend name (see TRANSLATION_BACKENDS), self.translator_type when empty
+        :return: TranslationBackend
+        """
+        if translation_method == '':
+            translation_method = self.translator_type
+
+        if translation_method not in TRANSLATION_BACKENDS:
+            self.logger.error('Translation method is invalid')
+            raise InvalidTranslationMethod("Translation method is invalid")
+        if translation_method not in self._backends:
+            self._backends[translation_method] = TRANSLATION_BACKENDS[translation_method](self)
+        return self._backends[translation_method]
+
+    def _plan(self, text: str, source: str, destination: str, backend: TranslationBackend):
+        """
+        Splits text into segments, looks them up in the translation memory and packs the missing ones into batches.
+
+        :param text: text to translate
+        :param source: source language code
+        :param destination: destination language code
+        :param backend: translation backend
+        :return: paragraphs (lists of segments), translations found in the memory (segment -> translation) and batches
+        """
+        if not backend.supports(source, destination):
+            raise UnsupportedLanguagePair(f'{backend.name} cannot translate from {source} to {destination}')
+        paragraphs = segment_text(text, backend.max_chars)
+        segments = [segment for paragraph in paragraphs for segment in paragraph]
+
+        # look segments up in the translation memory, only the misses are sent to the API
+        translations = {}
+        if self.memory is not None:
+            for segment in segments:
+                translation = self.memory.get(segment, source, destination, backend.name)
+                self.metrics.inc('cache_lookups_total', cache='memory',
+                                 result='hit' if translation is not None else 'miss')
+                if translation is not None:
+                    translations[segment] = translation
+        missing = list(dict.fromkeys(segment for segment in segments if segment not in translations))
+
+        batches = pack_segments(missing, backend.max_chars, backend.max_segments)
+        self.logger.debug(f'Translating {len(missing)} segments in {len(batches)} requests')
+        self.metrics.add('queue_depth', len(batches), queue='translate')
+        return paragraphs, translations, batches
+
+    def _store(self, batch: [str], batch_translations: [str], translations: dict, source: str, destination: str,
+               backend: TranslationBackend):
+        """
+        Records the translations of a batch (in translations and in the translation memory).
+
+        :return: None
+        """
+        for segment, translation in zip(batch, batch_translations):
+            translations[segment] = translation
+            if self.memory is not None:
+                self.memory.put(segment, translation, source, destination, backend.name)
+
+    def translate(self, text: str, source: str, destination: str, translation_method='', authentication=None,
+                  progress=None) -> str:
         """
         Translates text using the configured translation API
 
@@ -56,42 +149,124 @@ class MultiTranslator:
         :param text: text to translate
         :param source: source language code (eg. 'en')
         :param destination: destination language code (eg. 'de')
+        :param progress: (optional) function called as progress(done, total) every time a request completes
         :return: Translated text
         """
-        output = ''
-        if translation_method == '':
-            translation_method = self.translator_type
+        backend = self.backend(translation_method)
+        paragraphs, translations, batches = self._plan(text, source, destination, backend)
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency) if not backend.local else None
+        try:
+            if executor is not None:
+                results = [executor.submit(self._translate_batch, batch, source, destination, backend,
+                                           authentication) for batch in batches]
+            else:
+                results = (self._translate_batch(batch, source, destination, backend, authentication)
+                           for batch in batches)
+            done = 0
+            try:
+                for batch, result in zip(batches, results):
+                    batch_translations = result.result() if executor is not None else result
+                    done += 1
+                    self.metrics.add('queue_depth', -1, queue='translate')
+                    self._store(batch, batch_translations, translations, source, destination, backend)
+                    if progress is not None:
+                        progress(done, len(batches))
+            except BaseException:
+                # don't send the remaining batches once one has failed (eg. the credentials were rejected)
+                if executor is not None:
+                    for result in results:
+                        result.cancel()
+                self.metrics.add('queue_depth', done - len(batches), queue='translate')
+                raise
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
 
-        if translation_method not in TRANSLATOR_TYPES.__dict__.values():
-            self.logger.error('Translation method is invalid')
-            raise InvalidTranslationMethod("Translation method is invalid")
+        if self.memory is not None:
+            self.logger.debug(f'Translation memory stats: {self.memory.stats()}')
+        return join_segments([[translations[segment] for segment in paragraph] for paragraph in paragraphs])
 
-        if translation_method == TRANSLATOR_TYPES.translator:
-            self.logger.debug('Translating with the translator module')
-            translate = Translator(from_lang=source, to_lang=destination)
-            output = translate.translate(text[:499])
-        elif translation_method == TRANSLATOR_TYPES.ibm:
-            self.logger.debug('Translating with IBM')
+    async def translate_async(self, text: str, source: str, destination: str, translation_method='',
+                              authentication=None) -> str:
+        """
+        Asynchronous version of translate. Batches go through the backend's translate_batch_async, at most
+        max_concurrency at once.
+
+        :param text: text to translate
+        :param source: source language code (eg. 'en')
+        :param destination: destination language code (eg. 'de')
+        :param translation_method: (optional) backend name, self.translator_type when empty
+        :param authentication: The authentication token/username+password/etc. for the translation API
+        :return: Translated text
+        """
+        backend = self.backend(translation_method)
+        paragraphs, translations, batches = self._plan(text, source, destination, backend)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def translate_batch(batch: [str]) -> [str]:
+            async with semaphore:
+                self._count_batch(batch)
+                start = time.perf_counter()
+                try:
+                    output = await backend.translate_batch_async(batch, source, destination, authentication)
+                finally:
+                    self.metrics.add('queue_depth', -1, queue='translate')
+                self.metrics.observe('stage_seconds', time.perf_counter() - start, stage='translate')
+                return output
+
+        results = await asyncio.gather(*(translate_batch(batch) for batch in batches))
+        for batch, batch_translations in zip(batches, results):
+            self._store(batch, batch_translations, translations, source, destination, backend)
+        return join_segments([[translations[segment] for segment in paragraph] for paragraph in paragraphs])
+
+    def _count_batch(self, segments: [str]):
+        self.metrics.inc('stage_bytes_total', sum(len(segment.encode('utf-8')) for segment in segments),
+                         stage='translate')
+
+    def _translate_batch(self, segments: [str], source: str, destination: str, backend: TranslationBackend,
+                         authentication) -> [str]:
+        """
+        Translates a batch of segments with the given backend (in a single request for remote APIs).
+
+        :param segments: segments to translate (see the backend's max_chars and max_segments for the size of a batch)
+        :param source: source language code (eg. 'en')
+        :param destination: destination language code (eg. 'de')
+        :param backend: translation backend
+        :param authentication: The authentication token/username+password/etc. for the translation API
+        :return: list of translated segments, in the same order as segments
+        """
+        self._count_batch(segments)
+        with self.metrics.time('stage_seconds', stage='translate'):
+            return backend.translate_batch(segments, source, destination, authentication)
+
+    def _post(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a POST request through the pooled session.
+        Requests are rate limited, and retried with exponential backoff on connection errors and on the status codes in
+        RETRY_STATUS_CODES. A Retry-After header sent by the API takes precedence over the backoff delay.
+
+        :param url: url
+        :param kwargs: keyword arguments passed to requests
+        :return: the last response received
+        """
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            delay = self.backoff * 2 ** attempt
             try:
-                api_token = authentication['token']
-            except:
-                raise AuthenticationError('The token was not found')
-            body = {
-                "text": [
-                    text
-                ],
-                "model_id": f'{source}-{destination}'
-            }
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            response = requests.request('POST', IBM_TRANSLATE_URL, json=body, auth=('apikey', api_token),
-                                        headers=headers)
-            if response.status_code != 200:
-                raise ApiError(response.text)
-
-            for translation in response.json()['translations']:
-                output += translation['translation']
-                output += '\n'
-
-        return output
+                response = self.session.post(url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.metrics.inc('requests_total', status='error')
+                if attempt == self.max_retries:
+                    raise ApiError(f'Request failed after {attempt + 1} attempts: {e}')
+                self.logger.warning(f'Request failed ({e}), retrying in {delay}s')
+            else:
+                self.metrics.inc('requests_total', status=str(response.status_code))
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    return response
+                retry_after = response.headers.get('Retry-After', '')
+                if retry_after.isdigit():
+                    delay = int(retry_after)
+                self.logger.warning(f'API responded with {response.status_code}, retrying in {delay}s')
+            self.metrics.inc('retries_total')
+            time.sleep(delay)
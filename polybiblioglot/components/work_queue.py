@@ -0,0 +1,393 @@
+import ipaddress
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from polybiblioglot.components.cache import DEFAULT_CACHE_DIR
+from polybiblioglot.components.translation_backends import AuthenticationError
+
+DEFAULT_WORK_QUEUE = os.path.join(DEFAULT_CACHE_DIR, 'work_queue.sqlite3')
+# kinds of page level tasks. Translation tasks are queued once the OCR task of their page is done.
+TASK_OCR = 'ocr'
+TASK_TRANSLATE = 'translate'
+
+
+class WorkQueue:
+    def __init__(self, path: str = DEFAULT_WORK_QUEUE, lease_seconds: float = 300, max_attempts: int = 3,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Page level task queue shared by a coordinator and its workers, stored in SQLite.
+        Documents are split into one OCR task per page (and one translation task per page once its text is known).
+        Workers lease tasks for lease_seconds: a task whose worker crashed is handed to another worker once its lease
+        expires, and is given up after max_attempts leases.
+        Workers on other machines either open the same file (on a shared filesystem with working locks) or go through
+        a QueueServer with a RemoteQueue.
+
+        :param path: path to the SQLite database
+        :param lease_seconds: time a worker has to finish a task before it is handed to another worker
+        :param max_attempts: number of times a task is leased before it is marked as failed
+        :param logger: logger
+        """
+        self.logger = logger
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # transactions are explicit (BEGIN IMMEDIATE), so leasing is atomic across processes sharing the file
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=60, isolation_level=None)
+        self._connection.executescript(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            'id INTEGER PRIMARY KEY, '
+            'path TEXT NOT NULL UNIQUE, '
+            'pages INTEGER NOT NULL, '
+            'options TEXT NOT NULL'
+            ');'
+            'CREATE TABLE IF NOT EXISTS tasks ('
+            'id INTEGER PRIMARY KEY, '
+            'document INTEGER NOT NULL REFERENCES documents (id), '
+            'page INTEGER NOT NULL, '
+            'kind TEXT NOT NULL, '
+            "status TEXT NOT NULL DEFAULT 'pending', "
+            'worker TEXT, '
+            'lease_expires REAL, '
+            'attempts INTEGER NOT NULL DEFAULT 0, '
+            'result TEXT, '
+            'error TEXT, '
+            'UNIQUE (document, page, kind)'
+            ');'
+            'CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);'
+        )
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                result = fn()
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            self._connection.execute('COMMIT')
+            return result
+
+    def add_document(self, path: str, pages: int, options: dict = None) -> bool:
+        """
+        Queues an OCR task for every page of a document. A document that is already queued is left as it is, so a
+        restarted coordinator resumes where it stopped.
+
+        :param path: absolute path to the document, as seen by the workers
+        :param pages: number of pages
+        :param options: options the tasks are processed with (eg. {'profile': 'fast', 'source': 'de', 'destination':
+        'fr', 'method': 'ibm'}). Translation tasks are only queued when a destination is set.
+        :return: True if the document was added, False if it was already queued
+        """
+        def add():
+            if self._connection.execute('SELECT 1 FROM documents WHERE path = ?', (path,)).fetchone():
+                return False
+            document = self._connection.execute('INSERT INTO documents (path, pages, options) VALUES (?, ?, ?)',
+                                                 (path, pages, json.dumps(options or {}))).lastrowid
+            self._connection.executemany('INSERT INTO tasks (document, page, kind) VALUES (?, ?, ?)',
+                                         [(document, page, TASK_OCR) for page in range(1, pages + 1)])
+            return True
+
+        return self._transaction(add)
+
+    def lease(self, worker: str, limit: int = 1) -> [dict]:
+        """
+        Leases pending tasks (and tasks whose lease expired) to a worker. Translation tasks go first, so documents are
+        finished before new ones are started.
+
+        :param worker: worker id
+        :param limit: maximum number of tasks leased
+        :return: list of tasks ({'id', 'path', 'page', 'kind', 'options', 'text'}). text is the OCR text of the page for
+        translation tasks, None otherwise.
+        """
+        def lease():
+            now = time.time()
+            given_up = self._connection.execute(
+                "UPDATE tasks SET status = 'failed', error = 'lease expired ' || attempts || ' times' "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?", (now, self.max_attempts)
+            ).rowcount
+            if given_up:
+                self.logger.warning(f'Gave up on {given_up} tasks after {self.max_attempts} expired leases')
+            rows = self._connection.execute(
+                'SELECT tasks.id, documents.path, tasks.page, tasks.kind, documents.options, ocr.result '
+                'FROM tasks JOIN documents ON documents.id = tasks.document '
+                'LEFT JOIN tasks AS ocr '
+                "ON ocr.document = tasks.document AND ocr.page = tasks.page AND ocr.kind = 'ocr' "
+                "WHERE tasks.status = 'pending' OR (tasks.status = 'leased' AND tasks.lease_expires < ?) "
+                "ORDER BY tasks.kind = 'translate' DESC, tasks.id LIMIT ?", (now, limit)
+            ).fetchall()
+            self._connection.executemany(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?", [(worker, now + self.lease_seconds, row[0]) for row in rows]
+            )
+            return [{'id': task, 'path': path, 'page': page, 'kind': kind, 'options': json.loads(options),
+                     'text': text if kind == TASK_TRANSLATE else None}
+                    for task, path, page, kind, options, text in rows]
+
+        return self._transaction(lease)
+
+    def complete(self, task: int, worker: str, result: str) -> bool:
+        """
+        Records the result of a task. The translation task of the page is queued when an OCR task of a document with a
+        destination language completes.
+
+        :param task: task id
+        :param worker: id of the worker holding the lease
+        :param result: text of the page (OCR tasks) or its translation (translation tasks)
+        :return: False if the worker lost its lease (the task expired and was leased to another worker)
+        """
+        def complete():
+            updated = self._connection.execute(
+                "UPDATE tasks SET status = 'done', result = ?, error = NULL, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'leased'", (result, task, worker)
+            ).rowcount
+            if not updated:
+                return False
+            document, page, kind, options = self._connection.execute(
+                'SELECT tasks.document, tasks.page, tasks.kind, documents.options '
+                'FROM tasks JOIN documents ON documents.id = tasks.document WHERE tasks.id = ?', (task,)
+            ).fetchone()
+            if kind == TASK_OCR and json.loads(options).get('destination'):
+                self._connection.execute('INSERT OR IGNORE INTO tasks (document, page, kind) VALUES (?, ?, ?)',
+                                         (document, page, TASK_TRANSLATE))
+            return True
+
+        return self._transaction(complete)
+
+    def fail(self, task: int, worker: str, error: str) -> bool:
+        """
+        Reports a task that couldn't be processed. It is queued again until it has been attempted max_attempts times.
+
+        :param task: task id
+        :param worker: id of the worker holding the lease
+        :param error: error message
+        :return: False if the worker lost its lease
+        """
+        return self._transaction(lambda: self._connection.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?, "
+            "lease_expires = NULL WHERE id = ? AND worker = ? AND status = 'leased'",
+            (self.max_attempts, error, task, worker)
+        ).rowcount > 0)
+
+    def document_status(self, path: str) -> dict:
+        """
+        Returns the progress of a document.
+
+        :param path: path to the document (as passed to add_document)
+        :return: dictionary with the number of tasks per status ('pending', 'leased', 'done', 'failed'), 'finished'
+        (no task left to run) and the 'errors' of the failed tasks
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT tasks.status, COUNT(*) FROM tasks JOIN documents ON documents.id = tasks.document '
+                'WHERE documents.path = ? GROUP BY tasks.status', (path,)
+            ).fetchall()
+            errors = [row[0] for row in self._connection.execute(
+                "SELECT 'page ' || tasks.page || ' (' || tasks.kind || '): ' || tasks.error "
+                "FROM tasks JOIN documents ON documents.id = tasks.document "
+                "WHERE documents.path = ? AND tasks.status = 'failed'", (path,)
+            )]
+        status = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        status.update(rows)
+        options = self.options(path)
+        # translation tasks are only created as OCR tasks complete, a finished document has all of them
+        expected = self.page_count(path) * (2 if options.get('destination') else 1)
+        status['finished'] = status['pending'] == status['leased'] == 0 and (
+            status['done'] + status['failed'] >= expected or status['failed'] > 0)
+        status['errors'] = errors
+        return status
+
+    def options(self, path: str) -> dict:
+        with self._lock:
+            row = self._connection.execute('SELECT options FROM documents WHERE path = ?', (path,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def page_count(self, path: str) -> int:
+        with self._lock:
+            row = self._connection.execute('SELECT pages FROM documents WHERE path = ?', (path,)).fetchone()
+        return row[0] if row else 0
+
+    def results(self, path: str, kind: str = TASK_OCR) -> dict:
+        """
+        Returns the results of the finished tasks of a document.
+
+        :param path: path to the document
+        :param kind: TASK_OCR for the text of the pages, TASK_TRANSLATE for their translations
+        :return: dictionary mapping page numbers to their text
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT tasks.page, tasks.result FROM tasks JOIN documents ON documents.id = tasks.document '
+                "WHERE documents.path = ? AND tasks.kind = ? AND tasks.status = 'done'", (path, kind)
+            ).fetchall()
+        return dict(rows)
+
+    def stats(self) -> dict:
+        """
+        Returns the number of tasks per kind and status.
+
+        :return: dictionary such as {'ocr': {'done': 10, 'pending': 5}, 'translate': {'leased': 2}}
+        """
+        with self._lock:
+            rows = self._connection.execute('SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status').fetchall()
+        stats = {}
+        for kind, status, count in rows:
+            stats.setdefault(kind, {})[status] = count
+        return stats
+
+    def close(self):
+        """
+        Closes the underlying database.
+
+        :return: None
+        """
+        with self._lock:
+            self._connection.close()
+
+
+class _QueueHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _respond(self, status: int, body: dict):
+        response = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def _authorized(self) -> bool:
+        if self.server.token and self.headers.get('Authorization') != f'Bearer {self.server.token}':
+            self.close_connection = True  # the request body is never read
+            self._respond(401, {'error': 'unauthorized'})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == '/stats':
+            self._respond(200, self.server.queue.stats())
+        else:
+            self._respond(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError as e:
+            self._respond(400, {'error': f'invalid request: {e}'})
+            return
+        queue = self.server.queue
+        try:
+            if self.path == '/lease':
+                self._respond(200, {'tasks': queue.lease(body['worker'], body.get('limit', 1))})
+            elif self.path == '/complete':
+                self._respond(200, {'ok': queue.complete(body['task'], body['worker'], body['result'])})
+            elif self.path == '/fail':
+                self._respond(200, {'ok': queue.fail(body['task'], body['worker'], body['error'])})
+            else:
+                self._respond(404, {'error': 'not found'})
+        except (KeyError, TypeError) as e:
+            self._respond(400, {'error': f'invalid request: {e}'})
+
+    def log_message(self, *_):
+        pass
+
+
+def is_loopback(host: str) -> bool:
+    """
+    Checks whether a host only accepts connections from the local machine.
+
+    :param host: host name or IP address ('' and '0.0.0.0' listen on every interface)
+    :return: True for 'localhost' and loopback addresses
+    """
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class QueueServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, queue: WorkQueue, host: str = '127.0.0.1', port: int = 8765, token: str = ''):
+        """
+        Serves a WorkQueue over HTTP (JSON), so workers on other machines can lease tasks without sharing the
+        database file (see RemoteQueue).
+        The server runs in a background thread between start and stop.
+
+        :param queue: work queue
+        :param host: interface to listen on. A token is required to listen on other interfaces than the loopback one,
+        since the queue gives access to the pages and the results of every document.
+        :param port: port to listen on
+        :param token: (optional) shared secret the workers must send, requests without it are refused
+        """
+        if not token and not is_loopback(host):
+            raise ValueError(f'A token is required to serve the work queue on {host}')
+        super().__init__((host, port), _QueueHandler)
+        self.queue = queue
+        self.token = token
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+
+class RemoteQueue:
+    def __init__(self, url: str, token: str = '', timeout: float = 60):
+        """
+        Client of a QueueServer, with the same lease, complete, fail and stats methods as WorkQueue.
+
+        :param url: url of the coordinator (eg. 'http://coordinator:8765')
+        :param token: (optional) shared secret of the server
+        :param timeout: request timeout in seconds
+        """
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+
+    def _post(self, endpoint: str, body: dict) -> dict:
+        response = self.session.post(f'{self.url}/{endpoint}', json=body, timeout=self.timeout)
+        if response.status_code == 401:
+            raise AuthenticationError(f'{self.url} rejected the queue token')
+        response.raise_for_status()
+        return response.json()
+
+    def lease(self, worker: str, limit: int = 1) -> [dict]:
+        return self._post('lease', {'worker': worker, 'limit': limit})['tasks']
+
+    def complete(self, task: int, worker: str, result: str) -> bool:
+        return self._post('complete', {'task': task, 'worker': worker, 'result': result})['ok']
+
+    def fail(self, task: int, worker: str, error: str) -> bool:
+        return self._post('fail', {'task': task, 'worker': worker, 'error': error})['ok']
+
+    def stats(self) -> dict:
+        response = self.session.get(f'{self.url}/stats', timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.session.close()
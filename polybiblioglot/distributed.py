@@ -0,0 +1,289 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+import requests
+
+from polybiblioglot.batch import PAGE_BREAK, EXIT_CODES, output_paths, write_output
+from polybiblioglot.components import Converter, MultiTranslator, Preprocessor, SearchIndex, AuthenticationError, \
+    TRANSLATOR_TYPES
+from polybiblioglot.components.work_queue import WorkQueue, TASK_OCR, TASK_TRANSLATE
+
+
+class Coordinator:
+    def __init__(self, queue: WorkQueue, converter: Converter, source: str = '', destination: str = '',
+                 translation_method: str = TRANSLATOR_TYPES.translator, output_dir: str = None,
+                 index: SearchIndex = None, poll_interval: float = 2,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Splits documents into page level tasks on a work queue, waits for workers (see QueueWorker) to process them
+        and writes the outputs of every document once all its pages are done. Outputs are the same as the batch
+        command's (see output_paths).
+
+        :param queue: work queue
+        :param converter: converter, only used to count pages. Its OCR profile, OCR engine and preprocessing are passed on
+        to the workers so every page is read the same way whichever worker reads it.
+        :param source: source language code (eg. 'de'), tesseract's default language is used when empty
+        :param destination: (optional) destination language code. Documents are only converted when empty.
+        :param translation_method: translation backend used by the workers (see TRANSLATION_BACKENDS)
+        :param output_dir: (optional) directory the outputs are written to, they are written next to the inputs when
+        None
+        :param index: (optional) search index finished documents are added to
+        :param poll_interval: seconds between two checks of the progress of the documents
+        :param logger: logger
+        """
+        self.queue = queue
+        self.converter = converter
+        self.source = source
+        self.destination = destination
+        self.translation_method = translation_method
+        self.output_dir = output_dir
+        self.index = index
+        self.poll_interval = poll_interval
+        self.logger = logger
+
+    def submit(self, inputs: [(str, str)]) -> [(str, str)]:
+        """
+        Queues the pages of every input. Inputs that are already queued are resumed.
+
+        :param inputs: list of (file path, root) tuples (see collect_inputs)
+        :return: list of (absolute file path, root) tuples, as seen by the workers
+        """
+        preprocessor = self.converter.preprocessor
+        options = {'profile': self.converter.profile.name, 'source': self.source, 'destination': self.destination,
+                   'method': self.translation_method, 'ocr_backend': self.converter.ocr_backend,
+                   'preprocess': preprocessor.to_dict() if preprocessor is not None else None}
+        submitted = []
+        for path, root in inputs:
+            path = os.path.abspath(path)
+            if self.queue.add_document(path, self.converter.page_count(path), options):
+                self.logger.info(f'Queued {path}')
+            else:
+                self.logger.info(f'{path} is already queued, resuming')
+            submitted += [(path, root)]
+        return submitted
+
+    def _finish(self, path: str, root: str, status: dict) -> dict:
+        """
+        Writes the outputs of a finished document.
+
+        :param path: document path
+        :param root: directory the document was found under
+        :param status: status of the document (see WorkQueue.document_status)
+        :return: record describing the outcome ({'path', 'status', 'outputs', 'pages', 'error'})
+        """
+        outputs = output_paths(path, root, self.output_dir, self.destination or None)
+        record = {'path': path, 'status': 'converted', 'outputs': outputs, 'pages': self.queue.page_count(path),
+                  'error': None}
+        if status['failed']:
+            record.update(status='failed', error='; '.join(status['errors']))
+            self.logger.error(f'Failed to process {path}: {record["error"]}')
+            return record
+        for output, kind, language in zip(outputs, (TASK_OCR, TASK_TRANSLATE), (self.source, self.destination)):
+            results = self.queue.results(path, kind)
+            pages = [results[page] for page in sorted(results)]
+            write_output(output, PAGE_BREAK.join(pages))
+            if self.index is not None:
+                self.index.add_document(path, pages, kind='source' if kind == TASK_OCR else 'translation',
+                                        language=language)
+        self.logger.info(f'Converted {path} ({record["pages"]} pages)')
+        return record
+
+    def wait(self, documents: [(str, str)]) -> dict:
+        """
+        Waits until every document is finished, writing the outputs of each one as soon as it is.
+
+        :param documents: list of (file path, root) tuples returned by submit
+        :return: summary of the run ({'exit_code', 'converted', 'failed', 'pages', 'seconds', 'files'})
+        """
+        start = time.monotonic()
+        remaining = dict(documents)
+        records = []
+        while remaining:
+            for path, root in list(remaining.items()):
+                status = self.queue.document_status(path)
+                if status['finished']:
+                    records += [self._finish(path, root, status)]
+                    del remaining[path]
+            if remaining:
+                self.logger.debug(f'Queue: {self.queue.stats()}')
+                time.sleep(self.poll_interval)
+
+        summary = {status: sum(record['status'] == status for record in records) for status in ('converted', 'failed')}
+        summary.update(exit_code=EXIT_CODES['failed'] if summary['failed'] else EXIT_CODES['ok'],
+                       pages=sum(record['pages'] for record in records), seconds=time.monotonic() - start,
+                       files=records)
+        return summary
+
+
+class QueueWorker:
+    def __init__(self, queue, converter: Converter, translator: MultiTranslator = None, worker_id: str = None,
+                 authentication=None, jobs: int = 1, poll_interval: float = 2, max_retries: int = 5,
+                 logger: logging.Logger = logging.getLogger(__name__)):
+        """
+        Leases page level tasks from a work queue, runs OCR or translation and writes the results back.
+        Several workers (on one or many machines) can serve the same queue, throughput grows with the number of
+        workers as long as they can read the documents (eg. from a shared filesystem).
+
+        :param queue: WorkQueue, or RemoteQueue to go through a coordinator's QueueServer
+        :param converter: converter used for OCR tasks. The OCR profile, language, OCR engine and preprocessing of every
+        task are applied to it (tasks queued without an OCR engine or preprocessing keep the converter's).
+        :param translator: (optional) translator used for translation tasks, they fail on workers without one
+        :param worker_id: id of the worker in the queue, defaults to <hostname>-<pid>
+        :param authentication: authentication passed to MultiTranslator.translate
+        :param jobs: number of tasks processed at once (one thread each, OCR runs on the converter's workers)
+        :param poll_interval: seconds to wait before asking again when the queue is empty or unreachable
+        :param max_retries: number of times the outcome of a task is sent again when the queue is unreachable. The task
+        is leased to another worker once its lease expires if the queue still can't be reached.
+        :param logger: logger
+        """
+        self.queue = queue
+        self.converter = converter
+        self.translator = translator
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        self.authentication = authentication
+        self.jobs = max(jobs, 1)
+        self.poll_interval = poll_interval
+        self.max_retries = max_retries
+        self.logger = logger
+        self.processed = 0
+        self.failed = 0
+        self._converters = {}  # (profile, source, OCR engine, preprocessing) -> converter
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _converter(self, options: dict) -> Converter:
+        preprocess = options['preprocess'] if 'preprocess' in options else (
+            self.converter.preprocessor.to_dict() if self.converter.preprocessor is not None else None)
+        key = (options.get('profile') or self.converter.profile.name, options.get('source') or '',
+               options.get('ocr_backend') or self.converter.ocr_backend,
+               tuple(sorted(preprocess.items())) if preprocess is not None else None)
+        with self._lock:
+            if key not in self._converters:
+                converter = self.converter.with_profile(key[0]).with_ocr_backend(key[2])
+                converter = converter.with_preprocessor(
+                    Preprocessor(logger=self.logger, **preprocess) if preprocess is not None else None)
+                self._converters[key] = converter.with_language(key[1]) if key[1] else converter
+            return self._converters[key]
+
+    def process(self, task: dict) -> str:
+        """
+        Runs a task.
+
+        :param task: task returned by the queue's lease
+        :return: text of the page (OCR tasks) or its translation (translation tasks)
+        """
+        options = task['options']
+        if task['kind'] == TASK_OCR:
+            return self._converter(options).convert_page(task['path'], task['page'])
+        if self.translator is None:
+            raise ValueError(f'worker {self.worker_id} cannot translate')
+        return self.translator.translate(task['text'], options['source'], options['destination'],
+                                         translation_method=options.get('method', ''),
+                                         authentication=self.authentication)
+
+    def _report(self, method, task: dict, worker_id: str, value: str):
+        """
+        Sends the outcome of a task to the queue (its complete or fail method), retrying while the queue is unreachable.
+
+        :param method: queue method called as method(task id, worker_id, value)
+        :param task: the task
+        :param worker_id: id of the worker thread holding the lease
+        :param value: result or error of the task
+        :return: what the queue returned, None when the outcome couldn't be sent
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return method(task['id'], worker_id, value)
+            except AuthenticationError as e:
+                # retrying won't help, every thread of the worker stops
+                self.logger.error(str(e))
+                self._stop.set()
+                return None
+            except (requests.RequestException, sqlite3.OperationalError) as e:
+                if attempt == self.max_retries:
+                    self.logger.error(f'Could not report {task["kind"]} of {task["path"]} page {task["page"]} ({e}), '
+                                      f'it will be leased again once its lease expires')
+                    return None
+                self.logger.warning(f'Could not reach the work queue ({e}), retrying in {self.poll_interval}s')
+                time.sleep(self.poll_interval)
+            except Exception as e:
+                self.logger.error(f'Could not report {task["kind"]} of {task["path"]} page {task["page"]}: {e}')
+                return None
+        return None
+
+    def _run(self, worker_id: str, exit_when_empty: bool):
+        while not self._stop.is_set():
+            try:
+                tasks = self.queue.lease(worker_id)
+            except AuthenticationError as e:
+                # retrying won't help, every thread of the worker stops
+                self.logger.error(str(e))
+                self._stop.set()
+                return
+            except (requests.RequestException, sqlite3.OperationalError) as e:
+                self.logger.warning(f'Could not reach the work queue ({e}), retrying in {self.poll_interval}s')
+                self._stop.wait(self.poll_interval)
+                continue
+            if not tasks:
+                if exit_when_empty:
+                    return
+                self._stop.wait(self.poll_interval)
+                continue
+            for task in tasks:
+                self.logger.debug(f'{worker_id}: {task["kind"]} {task["path"]} page {task["page"]}')
+                try:
+                    result = self.process(task)
+                except Exception as e:
+                    self.logger.error(f'{task["kind"]} of {task["path"]} page {task["page"]} failed: {e}')
+                    self._report(self.queue.fail, task, worker_id, str(e))
+                    with self._lock:
+                        self.failed += 1
+                    continue
+                completed = self._report(self.queue.complete, task, worker_id, result)
+                if completed is None:
+                    with self._lock:
+                        self.failed += 1
+                    continue
+                if not completed:
+                    self.logger.warning(f'Lease of {task["path"]} page {task["page"]} expired before it was done')
+                with self._lock:
+                    self.processed += 1
+
+    def run(self, exit_when_empty: bool = False) -> dict:
+        """
+        Processes tasks until stop is called (or until the queue is empty).
+
+        :param exit_when_empty: return as soon as there is no task left to lease instead of waiting for more
+        :return: dictionary with the number of tasks 'processed' and 'failed', and the 'exit_code' of the worker
+        (see counts)
+        """
+        threads = [threading.Thread(target=self._run, args=(f'{self.worker_id}-{number}', exit_when_empty),
+                                    daemon=True) for number in range(1, self.jobs + 1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.counts()
+
+    def counts(self) -> dict:
+        """
+        Returns the number of tasks processed and failed so far. The exit code is EXIT_CODES['failed'] when any task
+        failed (or its outcome couldn't be sent to the queue).
+
+        :return: dictionary with the 'processed', 'failed' and 'exit_code' keys
+        """
+        with self._lock:
+            return {'processed': self.processed, 'failed': self.failed,
+                    'exit_code': EXIT_CODES['failed'] if self.failed else EXIT_CODES['ok']}
+
+    def stop(self):
+        """
+        Stops the worker once the tasks in progress are done.
+
+        :return: None
+        """
+        self._stop.set()
@@ -1,2 +1,4 @@
-from polybiblioglot.lang.languages import lang
-__all__ = ["languages", "lang"]
+from polybiblioglot.lang.languages import lang, tesseract_lang
+from polybiblioglot.lang.detect import LanguageDetector, detect_language, tesseract_language, AUTO_DETECT
+__all__ = ["languages", "detect", "lang", "tesseract_lang", "LanguageDetector", "detect_language", "tesseract_language",
+           "AUTO_DETECT"]
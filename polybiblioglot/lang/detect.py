@@ -0,0 +1,161 @@
+import math
+import unicodedata
+from collections import Counter
+
+from polybiblioglot.lang.languages import tesseract_lang
+from polybiblioglot.lang.samples import samples
+
+# Value of a source language meaning the language should be detected from the text
+AUTO_DETECT = 'auto'
+
+# Scripts used by a single language (of the languages in languages.py). Text written in one of these scripts is
+# identified without comparing n-grams. Scripts are named like in the Unicode character names.
+SCRIPT_LANGUAGES = {
+    'GREEK': 'el',
+    'HEBREW': 'he',
+    'ARMENIAN': 'hy',
+    'GEORGIAN': 'ka',
+    'HANGUL': 'ko',
+    'HIRAGANA': 'ja',
+    'KATAKANA': 'ja',
+    'CJK': 'zh',
+    'THAI': 'th',
+    'LAO': 'lo',
+    'KHMER': 'km',
+    'MYANMAR': 'my',
+    'TIBETAN': 'bo',
+    'ETHIOPIC': 'am',
+    'BENGALI': 'bn',
+    'GURMUKHI': 'pa',
+    'GUJARATI': 'gu',
+    'ORIYA': 'or',
+    'TAMIL': 'ta',
+    'TELUGU': 'te',
+    'KANNADA': 'kn',
+    'MALAYALAM': 'ml',
+    'SINHALA': 'si',
+}
+# Japanese mixes kana with CJK ideographs, text with at least this share of kana is Japanese rather than Chinese
+KANA_RATIO = 0.1
+# Texts with fewer letters than this are too short to be identified reliably
+MIN_LETTERS = 20
+
+
+def script(character: str) -> str:
+    """
+    Returns the script a character is written in.
+
+    :param character: a single character
+    :return: script name (eg. 'LATIN', 'CYRILLIC', 'CJK'), '' for characters without a name
+    """
+    return unicodedata.name(character, '').split(' ', 1)[0]
+
+
+def ngrams(text: str, min_n: int = 2, max_n: int = 3) -> Counter:
+    """
+    Counts the character n-grams of a text. Words are lower cased and padded with spaces so the n-grams capture the
+    beginning and end of words. Digits and punctuation are ignored.
+
+    :param text: text
+    :param min_n: shortest n-grams counted
+    :param max_n: longest n-grams counted
+    :return: Counter of n-grams
+    """
+    counts = Counter()
+    for word in ''.join(c if c.isalpha() else ' ' for c in text.lower()).split():
+        word = f' {word} '
+        for n in range(min_n, max_n + 1):
+            counts.update(word[i:i + n] for i in range(len(word) - n + 1))
+    return counts
+
+
+def weigh(counts: Counter) -> (dict, float):
+    """
+    Weighs n-gram counts sublinearly (1 + log(count)), so a few very frequent n-grams (eg. the n-grams of 'the') don't
+    outweigh the n-grams telling close languages apart.
+
+    :param counts: n-gram counts (see ngrams)
+    :return: tuple of the n-gram weights and their euclidean norm
+    """
+    weights = {ngram: 1 + math.log(count) for ngram, count in counts.items()}
+    return weights, math.sqrt(sum(weight * weight for weight in weights.values()))
+
+
+class LanguageDetector:
+    def __init__(self, reference_texts: dict = None):
+        """
+        Identifies the language of a text by comparing its character bigrams and trigrams to those of reference texts.
+        Scripts used by a single language (see SCRIPT_LANGUAGES) are identified from the script alone. Otherwise the
+        text is compared (cosine similarity of weighted n-grams) to the reference texts written in the same script.
+        Profiles are small and built once, so identifying a page takes a few milliseconds.
+
+        :param reference_texts: dictionary mapping language codes to reference texts (see samples.py)
+        """
+        self.profiles = {}  # language code -> (script, n-gram weights, norm)
+        for code, text in (reference_texts if reference_texts is not None else samples).items():
+            self.profiles[code] = (self.dominant_script(text)[0],) + weigh(ngrams(text))
+
+    @staticmethod
+    def dominant_script(text: str) -> (str, Counter):
+        """
+        Returns the script most letters of a text are written in.
+
+        :param text: text
+        :return: tuple of the script name ('' when the text has no letters) and the letter count of every script
+        """
+        scripts = Counter(script(c) for c in text if c.isalpha())
+        return (scripts.most_common(1)[0][0] if scripts else ''), scripts
+
+    def detect(self, text: str) -> [(str, float)]:
+        """
+        Ranks the languages the text could be written in.
+
+        :param text: text (eg. the OCR'd text of a page)
+        :return: list of (language code, score) tuples, best first. Scores are between 0 and 1. The list is empty when
+        the text is too short or its script is unknown.
+        """
+        main_script, scripts = self.dominant_script(text)
+        letter_count = sum(scripts.values())
+        if letter_count < MIN_LETTERS:
+            return []
+        if main_script in SCRIPT_LANGUAGES:
+            kana = scripts['HIRAGANA'] + scripts['KATAKANA']
+            if main_script == 'CJK' and kana >= KANA_RATIO * letter_count:
+                return [('ja', 1.0)]
+            return [(SCRIPT_LANGUAGES[main_script], 1.0)]
+
+        weights, norm = weigh(ngrams(text))
+        scores = []
+        for code, (profile_script, profile, profile_norm) in self.profiles.items():
+            if profile_script != main_script:
+                continue
+            dot = sum(weight * profile[ngram] for ngram, weight in weights.items() if ngram in profile)
+            scores += [(code, dot / (norm * profile_norm))]
+        return sorted(scores, key=lambda score: score[1], reverse=True)
+
+
+_detector = None
+
+
+def detect_language(text: str) -> str:
+    """
+    Returns the most likely language of a text.
+
+    :param text: text
+    :return: language code (eg. 'de'), None when the language can't be identified
+    """
+    global _detector
+    if _detector is None:
+        _detector = LanguageDetector()
+    scores = _detector.detect(text)
+    return scores[0][0] if scores else None
+
+
+def tesseract_language(code: str) -> str:
+    """
+    Returns the tesseract language pack of a language.
+
+    :param code: language code (eg. 'de')
+    :return: tesseract language (eg. 'deu'), None when tesseract can't read the language
+    """
+    return tesseract_lang.get(code)
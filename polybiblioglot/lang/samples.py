@@ -0,0 +1,160 @@
+# Reference text of the languages written in scripts shared by several languages, keyed by language code.
+# Every sample is the first article of the Universal Declaration of Human Rights followed by frequent words of the
+# language. Character n-gram profiles are built from these samples to identify the language of OCR'd text.
+samples = {
+  'en': 'All human beings are born free and equal in dignity and rights. They are endowed with reason and conscience '
+        'and should act towards one another in a spirit of brotherhood. the of and to in is that it was for on are '
+        'with as his they at be this from have or by one had not but what all were when we there can an your which '
+        'their said if do will each about how up out them then she many some so these would other into has more her '
+        'two like him see time could no make than first been its who now people my made over did down only way find '
+        'use may water long little very after words called just where most know through should because',
+  'de': 'Alle Menschen sind frei und gleich an Würde und Rechten geboren. Sie sind mit Vernunft und Gewissen begabt und '
+        'sollen einander im Geist der Brüderlichkeit begegnen. der die und in den von zu das mit sich des auf für ist '
+        'im dem nicht ein eine als auch es an werden aus er hat dass sie nach wird bei einer um am sind noch wie einem '
+        'über einen so zum war haben nur oder aber vor zur bis mehr durch man sein wurde sei hatte kann gegen vom '
+        'können schon wenn habe seine ihre dann unter wir soll ich eines jahr zwei jahren diese dieser wieder keine '
+        'seiner worden will zwischen immer was sagte gibt alle diesem seit muss doch jetzt weil ganz',
+  'fr': 'Tous les êtres humains naissent libres et égaux en dignité et en droits. Ils sont doués de raison et de '
+        'conscience et doivent agir les uns envers les autres dans un esprit de fraternité. le de un être et à il '
+        'avoir ne je son que se qui ce dans en du elle au pour pas sur plus pouvoir par tout faire avec comme mais on '
+        'leur dire nous vous ou bien où sans même aller autre lui deux cette aussi être fait été ces ont très après '
+        'encore peu celui entre toujours quelque chose depuis jamais ainsi dont parce leurs avait était nos notre',
+  'es': 'Todos los seres humanos nacen libres e iguales en dignidad y derechos y, dotados como están de razón y '
+        'conciencia, deben comportarse fraternalmente los unos con los otros. el la de que y a en un ser se no haber '
+        'por con su para como estar tener le lo todo pero más hacer o poder decir este ir otro ese la si me ya ver '
+        'porque dar cuando él muy sin vez mucho saber qué sobre mi alguno mismo yo también hasta año dos querer entre '
+        'así primero desde grande eso ni nos llegar pasar tiempo ella sí día uno bien poco deber entonces poner cosa',
+  'it': 'Tutti gli esseri umani nascono liberi ed eguali in dignità e diritti. Essi sono dotati di ragione e di '
+        'coscienza e devono agire gli uni verso gli altri in spirito di fratellanza. il di che è e la per un in non '
+        'una sono mi ho lo ma ha le si con cosa se io come da ci questo qui hai bene tu del sei al più della anche '
+        'lei te era gli mio solo ti tutto grazie perché fare niente lui chi quando nel molto questa ne hanno dove '
+        'sua suo degli nella alla quello essere fatto stato delle così abbiamo ancora sempre dopo poi allora perché',
+  'pt': 'Todos os seres humanos nascem livres e iguais em dignidade e em direitos. Dotados de razão e de consciência, '
+        'devem agir uns para com os outros em espírito de fraternidade. o de a que e do da em um para é com não uma '
+        'os no se na por mais as dos como mas foi ao ele das tem à seu sua ou ser quando muito há nos já está eu '
+        'também só pelo pela até isso ela entre era depois sem mesmo aos ter seus quem nas me esse eles estão você '
+        'tinha foram essa num nem suas meu às minha têm numa pelos elas havia seja qual será nós tenho lhe deles',
+  'nl': 'Alle mensen worden vrij en gelijk in waardigheid en rechten geboren. Zij zijn begiftigd met verstand en '
+        'geweten, en behoren zich jegens elkander in een geest van broederschap te gedragen. de en van ik te dat die '
+        'in een hij het niet zijn is was op aan met als voor had er maar om hem dan zou of wat mijn men dit zo door '
+        'over ze zich bij ook tot je mij uit der daar haar naar heb hoe heeft hebben deze u want nog zal me zij nu '
+        'ge geen omdat iets worden toch al waren veel meer doen toen moet ben zonder kan hun dus alles onder ja',
+  'sv': 'Alla människor är födda fria och lika i värde och rättigheter. De har utrustats med förnuft och samvete och '
+        'bör handla gentemot varandra i en anda av broderskap. och i att det som en på är av för med till den har de '
+        'inte om ett han men var jag sig från vi så kan man när år säger hon under också efter eller nu sin där vid '
+        'mot ska skulle kommer ut får finns vara hade alla andra mycket än här då sedan över bara in blir upp även '
+        'vad få två vill ha många hur mer går sverige kronor detta nya procent skall hans utan sina något svenska',
+  'da': 'Alle mennesker er født frie og lige i værdighed og rettigheder. De er udstyret med fornuft og samvittighed, '
+        'og de bør handle mod hverandre i en broderskabets ånd. og i at det er en til på som de med han af for ikke '
+        'der var jeg har den sig om et men så vi kan fra hun du skal ud blev også være efter når jo kunne meget hvor '
+        'ved sin nu over eller hvad kan hans ham man min havde op bare alle sige denne dette hendes nogle sådan '
+        'mange lige igen lidt andre hele godt skulle første derfor mig dig noget været kommer gør øje',
+  'no': 'Alle mennesker er født frie og med samme menneskeverd og menneskerettigheter. De er utstyrt med fornuft og '
+        'samvittighet og bør handle mot hverandre i brorskapets ånd. og i det på som er en til å han av for med at '
+        'var de ikke den har jeg om et men så seg hun hadde fra vi du kan da ble ut skal vil ham etter over ved også '
+        'bare eller sa nå dette noe være meg mot opp der når inn dem kunne andre blir alle noen sin ha år henne '
+        'hans hvor mye sier disse blitt mer hva gjennom jo kom skulle mellom ingen både hvis dag slik ja',
+  'fi': 'Kaikki ihmiset syntyvät vapaina ja tasavertaisina arvoltaan ja oikeuksiltaan. Heille on annettu järki ja '
+        'omatunto, ja heidän on toimittava toisiaan kohtaan veljeyden hengessä. ja on ei että se oli hän mutta kun '
+        'niin ole tai myös jo nyt vain kuin sen ovat mitä jos sitten hänen he me minä sinä tämä joka jotka mukaan '
+        'vielä kanssa jälkeen vuoden vuonna ennen koska siitä sekä olla ollut olisi aina mikä missä miten kaikki '
+        'paljon tässä hyvin itse siis kuitenkin täällä ainakin heidän meidän niiden kaksi uusi suomen',
+  'pl': 'Wszyscy ludzie rodzą się wolni i równi pod względem swej godności i swych praw. Są oni obdarzeni rozumem i '
+        'sumieniem i powinni postępować wobec innych w duchu braterstwa. i w nie na się z do to że jest jak ale co '
+        'o tak za od po już tylko jego jej mnie może być dla przez ich czy jeszcze bardzo było który gdy gdzie '
+        'kiedy został roku także lub więc tego tym jako będzie oraz sobie mu ten są można jednak nawet nic przy '
+        'między bez pod które która których przed potem wszystko tu tam teraz zawsze dwa polski wiele',
+  'cs': 'Všichni lidé rodí se svobodní a sobě rovní co do důstojnosti a práv. Jsou nadáni rozumem a svědomím a mají '
+        'spolu jednat v duchu bratrství. a se v na je že to s z do o k i jako ale by pro na jeho které která který '
+        'jsem jsou není tak už jen po od za také jsme bylo byl byla mě mi ve pak když jak co nebo aby než při tom '
+        'podle toho této tento jejich mezi může bude jsme však ještě velmi před kde proto tady všechno nic vždy '
+        'dva roku české první také řekl ani něco jeho',
+  'sk': 'Všetci ľudia sa rodia slobodní a sebe rovní, čo sa týka ich dôstojnosti a práv. Sú obdarení rozumom a '
+        'svedomím a majú spolu jednať v bratskom duchu. a sa v na je že to s z do o k i ako ale by pre jeho ktoré '
+        'ktorá ktorý som sú nie tak už len po od za aj sme bolo bol bola ma mi vo potom keď čo alebo aby než pri '
+        'tom podľa toho tejto tento ich medzi môže bude však ešte veľmi pred kde preto tu všetko nič vždy dva '
+        'roku slovenskej prvý povedal ani niečo',
+  'hu': 'Minden emberi lény szabadon születik és egyenlő méltósága és joga van. Az emberek, ésszel és '
+        'lelkiismerettel bírván, egymással szemben testvéri szellemben kell hogy viseltessenek. a az és hogy nem is '
+        'egy de meg már csak ez volt van mint még ha el azt ki be kell fel mert lesz nagyon most itt ott mi amit '
+        'aki ami miért hol mikor sem vagy minden után több között szerint után alatt mellett vele neki őket '
+        'magyar évben első két sok lehet nincs lett volna vannak voltak ezt azt',
+  'tr': 'Bütün insanlar hür, haysiyet ve haklar bakımından eşit doğarlar. Akıl ve vicdana sahiptirler ve birbirlerine '
+        'karşı kardeşlik zihniyeti ile hareket etmelidirler. ve bir bu da de için ile çok ne o daha gibi ama en '
+        'kadar olarak sonra değil var ben sen biz siz onlar şey her ki mi mı diye olan oldu olduğu yok büyük iki '
+        'yıl zaman kendi şimdi önce göre bütün bile ancak nasıl neden nerede hiç şu ise artık yeni türkiye '
+        'tarafından üzerinde içinde arasında yapılan',
+  'ro': 'Toate ființele umane se nasc libere și egale în demnitate și în drepturi. Ele sunt înzestrate cu rațiune și '
+        'conștiință și trebuie să se comporte unele față de altele în spiritul fraternității. și în de la a cu nu '
+        'se pe din un o că este care mai pentru sau ca dar sunt lui au fost ce le lor acest această după fi am '
+        'foarte când unde cum doar până despre prin între asupra acum încă toate toți ani două poate trebuie '
+        'noi voi el ea ei ele eu tu',
+  'hr': 'Sva ljudska bića rađaju se slobodna i jednaka u dostojanstvu i pravima. Ona su obdarena razumom i sviješću '
+        'pa jedna prema drugima trebaju postupati u duhu bratstva. i je u se na da za su od s a to koji ne što iz '
+        'ali kao će bi o sam smo ste biti bio bila bilo ja ti on ona mi vi oni ovo taj kad gdje kako zašto jer još '
+        'samo već vrlo sve nakon prije između godine dva hrvatske koja koje više može treba nije',
+  'sl': 'Vsi ljudje se rodijo svobodni in imajo enako dostojanstvo in enake pravice. Obdarjeni so z razumom in vestjo '
+        'in bi morali ravnati drug z drugim kakor bratje. in je v se na za da so z pa ki ne bi po tudi od kot ali '
+        'to iz še ga so smo ste biti bil bila bilo jaz ti on ona mi vi oni ko kje kako zakaj ker samo že zelo vse '
+        'po pred med leta dva slovenije lahko več ni',
+  'lt': 'Visi žmonės gimsta laisvi ir lygūs savo orumu ir teisėmis. Jiems suteiktas protas ir sąžinė, todėl jie '
+        'turi elgtis vienas kito atžvilgiu kaip broliai. ir yra kad su į iš o bet kaip tai jis ji jie aš tu mes '
+        'jūs buvo bus nuo per apie dar jau tik labai kur kai kas kuris kuri kurie ne taip savo po prieš tarp metų '
+        'du lietuvos gali daugiau nėra',
+  'lv': 'Visi cilvēki piedzimst brīvi un vienlīdzīgi savā pašcieņā un tiesībās. Viņi ir apveltīti ar saprātu un '
+        'sirdsapziņu, un viņiem jāizturas citam pret citu brālības garā. un ir ka ar no uz par bet kā tas tā viņš '
+        'viņa viņi es tu mēs jūs bija būs pēc vēl jau tikai ļoti kur kad kas kurš kura kuri ne arī savu pirms '
+        'starp gadā divi latvijas var vairāk nav',
+  'et': 'Kõik inimesed sünnivad vabadena ja võrdsetena oma väärikuselt ja õigustelt. Neile on antud mõistus ja '
+        'südametunnistus ja nende suhtumist üksteisesse peab kandma vendluse vaim. ja on ei et see oli ta kui aga '
+        'ka nii või veel siis mis kes kus kuidas miks nad me mina sina tema meie teie nemad oma olema olnud pärast '
+        'enne vahel aasta kaks eesti võib rohkem pole',
+  'id': 'Semua orang dilahirkan merdeka dan mempunyai martabat dan hak-hak yang sama. Mereka dikaruniai akal dan hati '
+        'nurani dan hendaknya bergaul satu sama lain dalam semangat persaudaraan. yang dan di itu dengan untuk tidak '
+        'ini dari dalam akan pada juga saya ke karena tersebut bisa ada mereka lebih kata tahun sudah atau saat oleh '
+        'menjadi orang kami telah ia kita harus dia jika hanya namun masih seperti banyak bahwa setelah sangat',
+  'ca': 'Tots els éssers humans neixen lliures i iguals en dignitat i en drets. Són dotats de raó i de consciència, i '
+        'han de comportar-se fraternalment els uns amb els altres. el la de i a que en un per és amb no una els les '
+        'es del al com però més ho hi seu seva quan molt ja també va fer ser tenir aquest aquesta després sense '
+        'fins entre era així perquè on qui jo tu ell ella nosaltres vosaltres ells dos any catalunya pot',
+  'la': 'Omnes homines liberi aequique dignitate atque iuribus nascuntur. Ratione conscientiaque praediti sunt et alii '
+        'erga alios cum fraternitate se gerere debent. et in est non ad cum quod ut sed qui quae si esse sunt enim '
+        'eius autem per hoc etiam atque ab ex neque tamen nec quam vel ille illa hic haec id ego tu nos vos sibi '
+        'erat fuit esset omnia deus dominus rex post ante inter sine propter nunc tunc semper',
+  'ru': 'Все люди рождаются свободными и равными в своем достоинстве и правах. Они наделены разумом и совестью и '
+        'должны поступать в отношении друг друга в духе братства. и в не на я быть он с что а по это она этот к но '
+        'они мы как из у который то за свой что весь год от так о для ты же все тот мочь вы человек такой его '
+        'сказать только или ещё бы себя один как уже до время если сам когда другой вот говорить наш мой знать '
+        'стать при чтобы дело жизнь кто первый очень два день её новый рука даже во со раз где там под можно ну',
+  'uk': 'Всі люди народжуються вільними і рівними у своїй гідності та правах. Вони наділені розумом і совістю і '
+        'повинні діяти у відношенні один до одного в дусі братерства. і в не на що я з як до у та це він вона '
+        'вони ми ви ти але за від по так його її їх був була було були бути є який яка яке які також вже ще тільки '
+        'дуже коли де тут там після перед між року два україни може більше немає свій своїй через щоб',
+  'bg': 'Всички хора се раждат свободни и равни по достойнство и права. Те са надарени с разум и съвест и следва да '
+        'се отнасят помежду си в дух на братство. и на да се в не за от с е че това по са като но ще той тя те ние '
+        'вие аз ти бе беше бяха има няма още само много когато къде тук там след преди между година две българия '
+        'може повече който която които един една',
+  'sr': 'Сва људска бића рађају се слободна и једнака у достојанству и правима. Она су обдарена разумом и свешћу и '
+        'треба једни према другима да поступају у духу братства. и је у се на да за су од с а то који не што из '
+        'али као ће би о сам смо сте бити био била било ја ти он она ми ви они ово тај кад где како зашто јер још '
+        'само већ веома све након пре између године два србије која које више може треба није',
+  'mk': 'Сите човечки суштества се раѓаат слободни и еднакви по достоинство и права. Тие се обдарени со разум и '
+        'совест и треба да се однесуваат еден кон друг во духот на братството. и на да се во не за од со е дека '
+        'тоа по се како но ќе тој таа тие ние вие јас ти беше беа има нема уште само многу кога каде тука таму по '
+        'пред меѓу година два македонија може повеќе кој која кои еден една',
+  'ar': 'يولد جميع الناس أحرارا متساوين في الكرامة والحقوق. وقد وهبوا عقلا وضميرا وعليهم أن يعامل بعضهم بعضا بروح '
+        'الإخاء. في من على إلى أن عن مع هذا هذه التي الذي كان قد لا ما هو هي ذلك كل بين بعد قبل عند حتى إذا أو ثم '
+        'لم لن كما أيضا يكون كانت الله العربية الدولة العام اليوم الوقت',
+  'fa': 'تمام افراد بشر آزاد به دنیا می‌آیند و از لحاظ حیثیت و حقوق با هم برابرند. همه دارای عقل و وجدان هستند و '
+        'باید نسبت به یکدیگر با روح برادری رفتار کنند. و در به از که این را با است برای آن یک خود تا کرد بر هم '
+        'نیز شده شد می کند گفت ما من تو او آنها ایران سال پس چه اما یا باید بود هست نیست دو',
+  'ur': 'تمام انسان آزاد اور حقوق و عزت کے اعتبار سے برابر پیدا ہوئے ہیں۔ انہیں ضمیر اور عقل ودیعت ہوئی ہے۔ اس '
+        'لئے انہیں ایک دوسرے کے ساتھ بھائی چارے کا سلوک کرنا چاہیئے۔ کے میں کی ہے اور سے کو نے پر یہ کہ ایک '
+        'ہیں تھا تھے وہ بھی کر ہو گیا کیا جو اس ان لیے پاکستان سال',
+  'hi': 'सभी मनुष्यों को गौरव और अधिकारों के मामले में जन्मजात स्वतन्त्रता और समानता प्राप्त है। उन्हें बुद्धि और '
+        'अन्तरात्मा की देन प्राप्त है और परस्पर उन्हें भाईचारे के भाव से बर्ताव करना चाहिए। के है में की और से को '
+        'का एक पर यह हैं कि भी लिए था नहीं तो इस ने वह जो कर हो गया साथ रहा भारत साल',
+  'mr': 'सर्व मानवी व्यक्ति जन्मतःच स्वतंत्र आहेत व त्यांना समान प्रतिष्ठा व समान अधिकार आहेत. त्यांना विचारशक्ति व '
+        'सदसद्विवेकबुद्धि लाभलेली आहे व त्यांनी एकमेकांशी बंधुत्वाच्या भावनेने आचरण करावे. आहे व या आणि हे ते '
+        'की होते करण्यात त्या ही तर मी आम्ही तुम्ही महाराष्ट्र वर्ष',
+}
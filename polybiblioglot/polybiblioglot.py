@@ -1,10 +1,21 @@
+import itertools
 import logging
 import os
 
 from dearpygui import core, simple
 
-from polybiblioglot.components import Converter, MultiTranslator, ApiError, TRANSLATOR_TYPES
-from polybiblioglot.lang import lang
+from polybiblioglot.components import Converter, MultiTranslator, ApiError, UnsupportedLanguagePair, OcrCache, \
+    TranslationMemory, JobJournal, Job, JobScheduler, Metrics, Preprocessor, SearchIndex, DocumentReader, Pipeline, \
+    OcrAutoscaler, InvalidDocument, save_document, TRANSLATOR_TYPES, DOCUMENT_EXTENSION, OCR_PROFILES, \
+    DEFAULT_OCR_PROFILE, DEFAULT_OCR_BACKEND, TRANSLATION_BACKENDS, DEFAULT_PHRASE_TABLE_DIR
+from polybiblioglot.lang import lang, detect_language
+
+# separates pages in saved text files
+PAGE_SEPARATOR = ' - - - - - \n'
+# title of the window listing the results of library searches
+SEARCH_WINDOW_TITLE = 'Search results'
+# source language combo item detecting the language of the file (from its first page) instead of using a fixed language
+AUTO_DETECT_LABEL = 'Detect automatically'
 
 
 class Payload:
@@ -28,42 +39,87 @@ class Payload:
         self.destination_value_name: str = ''
         self.source_language_value: str = ''  # source language (for translation)
         self.destination_language_value: str = ''  # source language (for translation)
+        self.profile_value: str = ''  # OCR profile name (for conversion)
+        self.progress_bar: str = ''  # progress bar name
+        self.detected_language: str = ''  # name of the language detected during conversion
 
 
 class Polybiblioglot:
-    def __init__(self, logger=logging.getLogger(__name__)):
+    def __init__(self, logger=logging.getLogger(__name__), workers: int = 1, ocr_cache: OcrCache = None,
+                 translation_memory: TranslationMemory = None, journal_dir: str = None, profile=DEFAULT_OCR_PROFILE,
+                 ocr_backend: str = DEFAULT_OCR_BACKEND, max_jobs: int = 2, filter_pages: bool = False,
+                 preprocessor: Preprocessor = None, metrics: Metrics = None,
+                 phrase_table_dir: str = DEFAULT_PHRASE_TABLE_DIR, search_index: SearchIndex = None,
+                 translate_workers: int = 2, autoscaler: OcrAutoscaler = None):
         self.logger = logger
-        self.converter = Converter(logger=logger)
-        self.translator: MultiTranslator = MultiTranslator(TRANSLATOR_TYPES.translator, logger=logger)
+        # pages translated at once by "Convert and Translate", while the next pages are converted (see Pipeline)
+        self.translate_workers = translate_workers
+        # when set, converted and translated pages are indexed as soon as they are ready and the library can be searched
+        self.search_index = search_index
+        # records stage durations, queue depths and callback durations when set (see Metrics)
+        self.metrics = metrics
+        # background work (OCR, translation) is queued per convert window, at most max_jobs jobs run at once
+        self.scheduler = JobScheduler(max_workers=max_jobs, logger=logger, metrics=metrics)
+        self.progress_bars = {}  # job queue name (window title) -> progress bar name
+        # pages of text displayed by the convert windows, keyed by value name. Background jobs append pages to these
+        # lists as they are ready and the render callback displays them. Pages that failed (eg. a translation refused
+        # by the API) are None, and the error is kept in self.page_errors instead.
+        self.pages = {}
+        self.page_errors = {}  # value name -> {page number: error message}
+        self.displayed_page_counts = {}  # value name -> number of pages the page selector currently offers
+        self.journal_dir = journal_dir  # when set, conversions are journaled so they can resume after a crash
+        self.converter = Converter(logger=logger, workers=workers, cache=ocr_cache, profile=profile,
+                                   ocr_backend=ocr_backend, filter_pages=filter_pages, preprocessor=preprocessor,
+                                   metrics=metrics, autoscaler=autoscaler)
+        self.translator: MultiTranslator = MultiTranslator(TRANSLATOR_TYPES.translator, logger=logger,
+                                                           memory=translation_memory, metrics=metrics,
+                                                           phrase_table_dir=phrase_table_dir)
         self.current_uid = 0
         self.control_window = simple.window("Control", x_pos=0, y_pos=0, height=800)
         self.convert_window_list = []  # todo: this stores windows indefinitely. Figure out a way to delete them.
         self.data_to_save = ''  # this is the data that will be written to the disk by self.save_text
+        self.book_to_save = None  # Payload of the convert window whose pages will be written by self.save_book
+        self.documents = []  # open documents, their pages are read from disk as they are displayed
         with self.control_window:
             # allow user to select image to convert
-            core.add_text("Select an Image or PDF")
+            core.add_text(f"Select an Image, PDF or saved book ({DOCUMENT_EXTENSION})")
             core.add_button("Select file", callback=lambda *_: core.open_file_dialog(callback=self.select_file))
             language_list = list(lang.keys())
             core.add_text("Default Source Language:")
-            core.add_combo(f'default_source_language', label='', items=language_list,
+            core.add_combo(f'default_source_language', label='', items=[AUTO_DETECT_LABEL] + language_list,
                            default_value='German')
             core.add_text("Default Destiation Language:")
             core.add_combo(f'default_destination_language', label='', items=language_list,
                            default_value='French')
 
+            core.add_text("Default OCR Profile:")
+            core.add_combo(f'default_ocr_profile', label='', items=list(OCR_PROFILES.keys()),
+                           default_value=self.converter.profile.name)
+
             core.add_text("Translation Method:")
             core.add_combo(f'translation_method', label='',
-                           items=list(TRANSLATOR_TYPES.__dict__.values()), default_value=TRANSLATOR_TYPES.translator)
+                           items=list(TRANSLATION_BACKENDS), default_value=TRANSLATOR_TYPES.translator)
 
             core.add_text('API token (if using IBM)')
             core.add_input_text(f'api_token', label='', password=True)
 
+            if self.search_index is not None:
+                core.add_text('Search the library:')
+                core.add_input_text('search_query', label='', on_enter=True, callback=self.search_library)
+                core.add_button('search_button', label='Search', callback=self.search_library)
+
+        core.set_render_callback(self._on_render)
+
     def start(self):
         """
         Starts the app
         :return:
         """
         core.start_dearpygui()
+        self.scheduler.shutdown()
+        self.converter.close()
+        for document in self.documents:
+            document.close()
 
     def _get_uid(self):
         """
@@ -75,7 +131,7 @@ class Polybiblioglot:
         self.current_uid += 1
         return uid
 
-    def create_convert_window(self, payload: Payload):
+    def create_convert_window(self, payload: Payload, document: DocumentReader = None):
         """
         Creates a convert window. This window represents a file. From this window you can convert the file to text.
         Then translate the text. And finally you can save it to a file.
@@ -84,8 +140,10 @@ class Polybiblioglot:
         - translated the converted file
         - save the text to disk
         - save ethe translation to disk
+        - save both to a book file that can be opened again
 
         :param payload: Payload object
+        :param document: (optional) saved book to display instead of converting the file
         :return:
         """
         unique_id = self._get_uid()
@@ -99,9 +157,13 @@ class Polybiblioglot:
             bottom_spacer = f'bottom_{unique_id}'
 
             convert_button = f'convert_{unique_id}'
+            pipeline_button = f'convert_and_translate_{unique_id}'
             translate_button = f'translate_{unique_id}'
             save_text_button = f'save_text_{unique_id}'
             save_translation_button = f'save_translation_{unique_id}'
+            save_book_button = f'save_book_{unique_id}'
+            cancel_button = f'cancel_{unique_id}'
+            progress_bar = f'progress_{unique_id}'
 
             text_spacer = f'text_spacer_{unique_id}'
             translated_text_spacer = f'translated_text_spacer_{unique_id}'
@@ -111,9 +173,12 @@ class Polybiblioglot:
             text_value_name = f'text_{unique_id}'  # the name of the value holding the text gathered from OCR
             source_lang_combo_name = f'text_language{unique_id}'
             destination_lang_combo_name = f'destination_language{unique_id}'
+            profile_combo_name = f'ocr_profile{unique_id}'
             translated_text_value_name = f'translated_text_{unique_id}'  # the name of the value holding the translation
-            core.add_value(text_value_name, '')  # the value that stores the OCR text
-            core.add_value(translated_text_value_name, '')  # the value that stores the translated text
+            core.add_value(text_value_name, '')  # the value that stores the displayed page of OCR text
+            core.add_value(translated_text_value_name, '')  # the value that stores the displayed translated page
+            self.pages[text_value_name] = []
+            self.pages[translated_text_value_name] = []
 
             # Creating widgets
             tab_bar = simple.tab_bar(tab_bar_name)
@@ -129,21 +194,42 @@ class Polybiblioglot:
                     core.add_spacing(count=1, name=bottom_spacer)
 
                     language_list = list(lang.keys())
-                    core.add_combo(source_lang_combo_name, label='Source Language', items=language_list,
+                    core.add_combo(source_lang_combo_name, label='Source Language',
+                                   items=[AUTO_DETECT_LABEL] + language_list,
                                    default_value=core.get_value('default_source_language'))
                     core.add_combo(destination_lang_combo_name, label='Destination Language',
                                    items=language_list, default_value=core.get_value('default_destination_language'))
+                    core.add_combo(profile_combo_name, label='OCR Profile', items=list(OCR_PROFILES.keys()),
+                                   default_value=core.get_value('default_ocr_profile'))
                     # Creating payload for the convert button
                     convert_payload = Payload()
                     convert_payload.value_name = text_value_name
                     convert_payload.file_path = payload.file_path
                     convert_payload.parent = window_title
-                    convert_payload.disable = [convert_button]
-                    convert_payload.enable = [translate_button, save_text_button]
+                    convert_payload.profile_value = profile_combo_name
+                    convert_payload.source_language_value = source_lang_combo_name
+                    convert_payload.disable = [convert_button, pipeline_button, profile_combo_name]
+                    convert_payload.enable = [translate_button, save_text_button, save_book_button]
                     core.add_button(convert_button, label='Convert to Text',
                                     callback=self.convert_file, callback_data=convert_payload)
 
+                    pipeline_payload = Payload()
+                    pipeline_payload.value_name = text_value_name
+                    pipeline_payload.destination_value_name = translated_text_value_name
+                    pipeline_payload.file_path = payload.file_path
+                    pipeline_payload.parent = window_title
+                    pipeline_payload.profile_value = profile_combo_name
+                    pipeline_payload.source_language_value = source_lang_combo_name
+                    pipeline_payload.destination_language_value = destination_lang_combo_name
+                    pipeline_payload.disable = [convert_button, pipeline_button, translate_button, profile_combo_name]
+                    pipeline_payload.enable = [translate_button, save_text_button, save_translation_button,
+                                               save_book_button]
+                    core.add_button(pipeline_button, label='Convert and Translate',
+                                    callback=self.convert_and_translate, callback_data=pipeline_payload)
+
                     translate_payload = Payload()
+                    translate_payload.parent = window_title
+                    translate_payload.file_path = payload.file_path
                     translate_payload.value_name = text_value_name
                     translate_payload.destination_value_name = translated_text_value_name
                     translate_payload.source_language_value = source_lang_combo_name
@@ -162,12 +248,30 @@ class Polybiblioglot:
                     save_translation_payload.value_name = translated_text_value_name
                     core.add_button(save_translation_button, label='Save Translation',
                                     callback=self.save_prompt, callback_data=save_translation_payload, enabled=False)
+                    save_book_payload = Payload()
+                    save_book_payload.file_path = payload.file_path
+                    save_book_payload.value_name = text_value_name
+                    save_book_payload.destination_value_name = translated_text_value_name
+                    save_book_payload.source_language_value = source_lang_combo_name
+                    save_book_payload.destination_language_value = destination_lang_combo_name
+                    save_book_payload.profile_value = profile_combo_name
+                    core.add_button(save_book_button, label='Save Book', callback=self.save_book_prompt,
+                                    callback_data=save_book_payload, enabled=False)
+
+                    core.add_progress_bar(progress_bar, value=0.0, overlay='')
+                    self.progress_bars[window_title] = progress_bar
+                    cancel_payload = Payload()
+                    cancel_payload.parent = window_title
+                    core.add_button(cancel_button, label='Cancel', callback=self.cancel_jobs,
+                                    callback_data=cancel_payload)
 
                 # creating the Text tab
                 with tabs[1]:
                     core.add_text('File Text:')
                     core.add_spacing(count=1, name=text_spacer)
 
+                    # pages are displayed one at a time, the slider selects the page
+                    self._add_page_selector(text_value_name)
                     # this is the text box that holds the text extracted with OCR
                     core.add_text(f'text_box_{unique_id}', source=text_value_name)
 
@@ -176,21 +280,86 @@ class Polybiblioglot:
                     core.add_text('Translated text:')
                     core.add_spacing(count=1, name=translated_text_spacer)
 
+                    self._add_page_selector(translated_text_value_name)
                     # this is the text box that holds the translated text response
                     core.add_text(f'translated_text_box_{unique_id}', source=translated_text_value_name)
 
+        if document is not None:
+            # pages are decompressed from the memory-mapped book as they are displayed
+            self.pages[text_value_name] = document.pages('source')
+            self.pages[translated_text_value_name] = document.pages('translation')
+            for combo, key in ((source_lang_combo_name, 'source_language'),
+                               (destination_lang_combo_name, 'destination_language')):
+                if self._language_name(document.metadata.get(key, '')):
+                    core.set_value(combo, self._language_name(document.metadata[key]))
+            if document.metadata.get('profile') in OCR_PROFILES:
+                core.set_value(profile_combo_name, document.metadata['profile'])
+            self._enable_widgets([translate_button, save_text_button, save_book_button])
+            if document.translation_count:
+                self._enable_widgets([save_translation_button])
+            if not os.path.isfile(payload.file_path):
+                self._disable_widgets([convert_button, pipeline_button])
+
         # add the window to the window list
         self.convert_window_list += [convert_window]
 
+    def _add_page_selector(self, value_name: str):
+        """
+        Adds a slider used to select the page displayed by the value value_name.
+        :param value_name: name of the value displaying the pages in self.pages[value_name]
+        :return:
+        """
+        payload = Payload()
+        payload.value_name = value_name
+        core.add_slider_int(self._page_selector_name(value_name), label='Page', default_value=1, min_value=1,
+                            max_value=1, callback=self.show_page, callback_data=payload)
+        self.displayed_page_counts[value_name] = 0
+
+    @staticmethod
+    def _page_selector_name(value_name: str) -> str:
+        return f'{value_name}_page'
+
+    def show_page(self, sender, data: Payload):
+        """
+        Callback of the page selectors. Displays the selected page of self.pages[data.value_name].
+        :param sender:
+        :param data: Payload object, data.value_name is the value displaying the pages
+        :return:
+        """
+        pages = self.pages[data.value_name]
+        page_number = core.get_value(self._page_selector_name(data.value_name))
+        page = pages[page_number - 1] if 0 < page_number <= len(pages) else ''
+        if page is None:
+            page = self.page_errors.get(data.value_name, {}).get(page_number, '')
+        core.set_value(data.value_name, page)
+
+    def _refresh_page_selectors(self):
+        """
+        Helper function called every frame. Extends the page selectors of the pages that grew since the last frame,
+        and displays the first page as soon as it is ready.
+        :return:
+        """
+        for value_name, pages in self.pages.items():
+            page_count = len(pages)
+            if page_count == self.displayed_page_counts[value_name]:
+                continue
+            core.configure_item(self._page_selector_name(value_name), max_value=max(page_count, 1))
+            if self.displayed_page_counts[value_name] == 0 or page_count == 0:
+                core.set_value(self._page_selector_name(value_name), 1)
+                payload = Payload()
+                payload.value_name = value_name
+                self.show_page(None, payload)
+            self.displayed_page_counts[value_name] = page_count
+
     def save_prompt(self, sender, data: Payload):
         """
-        This helper fucntion will set the self.data_to_save attribute using the value passed in data.value_name.
+        This helper fucntion will set the self.data_to_save attribute using the pages displayed by data.value_name.
         It will then open a file prompt that will save the data in self.data_to_save to the select file
         :param sender:
         :param data: Payload object
         :return:
         """
-        self.data_to_save = core.get_value(data.value_name)
+        self.data_to_save = ''.join(f'{page or ""}{PAGE_SEPARATOR}' for page in self.pages[data.value_name])
         core.open_file_dialog(callback=self.save_text)
 
     def save_text(self, sender, data):
@@ -204,10 +373,64 @@ class Polybiblioglot:
         with open(os.path.join(*data), 'w') as f:
             f.write(self.data_to_save)
 
+    def save_book_prompt(self, sender, data: Payload):
+        """
+        Callback of the save book buttons. Opens a file prompt, the pages and translations of the convert window are
+        saved to the selected file by self.save_book.
+        :param sender:
+        :param data: Payload object of the convert window
+        :return:
+        """
+        self.book_to_save = data
+        core.open_file_dialog(callback=self.save_book)
+
+    def save_book(self, sender, data):
+        """
+        Writes the pages and translations of a convert window (self.book_to_save) to a book file (see DocumentWriter).
+        The book can be opened again with the select file button, without converting the file again.
+        :param sender:
+        :param data: file path in the format returned by a file prompt
+        :return:
+        """
+        path = os.path.join(*data)
+        if not path.endswith(DOCUMENT_EXTENSION):
+            path += DOCUMENT_EXTENSION
+        payload = self.book_to_save
+        source_language = core.get_value(payload.source_language_value)
+        metadata = {
+            'source_path': payload.file_path,
+            'source_language': lang.get(source_language, ''),
+            'destination_language': lang.get(core.get_value(payload.destination_language_value), ''),
+            'profile': core.get_value(payload.profile_value),
+        }
+        pages = self.pages[payload.value_name]
+        # translations are saved up to the first page that failed, the book format only stores a prefix of them
+        translations = list(itertools.takewhile(lambda page: page is not None,
+                                                self.pages[payload.destination_value_name]))
+        save_document(path, list(pages), translations=translations, metadata=metadata)
+        self.logger.info(f'Saved {len(pages)} pages ({len(translations)} translated) to {path}')
+
+    def open_document(self, path: str):
+        """
+        Opens a saved book in a new convert window. Only the pages displayed are read.
+        :param path: path to the book
+        :return:
+        """
+        try:
+            document = DocumentReader(path)
+        except InvalidDocument as e:
+            self.logger.error(f'{e}')
+            return
+        self.documents += [document]
+        payload = Payload()
+        payload.file_path = document.metadata.get('source_path', '')
+        payload.file_name = os.path.basename(path)
+        self.create_convert_window(payload, document=document)
+
     def convert_file(self, sender, data: Payload):
         """
         Callback function, will convert the currently selected image.
-        It works asynchronously by calling _convert_file using run_async_function. And once completed, calls
+        It works asynchronously by queuing _convert_file on the job scheduler. And once completed, calls
         _convert_file_return_callback to create the text window containing the OCR text gathered from the image.
         :param sender: The sender object (see dearpygui documentation)
         :param data: Payload object
@@ -216,97 +439,316 @@ class Polybiblioglot:
         # if the data has a delete element, delete it
         self._delete_widgets(data.delete)
         self._disable_widgets(data.disable)
-        core.run_async_function(self._convert_file, data, return_handler=self._convert_file_return_callback)
+        self.scheduler.submit(data.parent, self._convert_file, data, on_done=self._convert_file_return_callback)
 
-    def _convert_file(self, sender, data: Payload):
+    def _convert_file(self, job: Job, data: Payload):
         """
         The async part of the convert_file function. It does the CPU intensive OCR work and returns the text generated.
         The path to an image can be provided or the image data itself
-        :param sender: dearpygui sender object
+        Progress is reported to the job after every page, and the conversion stops if the job is cancelled.
+        :param job: the job running the conversion
         :param data: Payload object
         :return: object containing the image path and image text {"image path": image_path, "image text": image_text}
         """
-        pages = self.converter.convert_file(path=data.file_path)
+        converter, journal, language = self._prepare_conversion(data)
+        # pages are appended to the list displayed by the window as soon as they are ready
+        pages = self.pages[data.value_name] = []
+        try:
+            job.report(0, converter.page_count(data.file_path))
+            for page in converter.iter_file(path=data.file_path, journal=journal):
+                pages.append(page)
+                if self.search_index is not None:
+                    self.search_index.add_page(data.file_path, len(pages), page, language=language)
+                job.report(len(pages))
+        finally:
+            if journal is not None:
+                journal.close()
         data.pages = pages
         return data
 
-    def _convert_file_return_callback(self, sender, data: Payload):
+    def _prepare_conversion(self, data: Payload) -> (Converter, JobJournal, str):
+        """
+        Helper function of the conversion jobs. Picks the converter of a convert window (detecting the language of the
+        file first if needed), opens the journal of the file and removes its previous pages from the search index.
+        :param data: Payload object
+        :return: converter, journal (None when journaling is disabled) and language code of the file ('' if unknown)
+        """
+        # every window can use its own profile, the converters share the same workers and cache
+        converter = self.converter.with_profile(core.get_value(data.profile_value) or self.converter.profile.name)
+        self.logger.info(f'Converting {data.file_path} with the {converter.profile.name} OCR profile')
+        if core.get_value(data.source_language_value) == AUTO_DETECT_LABEL:
+            # OCR a sample page first, so a book isn't converted with the wrong language pack
+            language = converter.detect_language(data.file_path)
+            if language is not None:
+                converter = converter.with_language(language)
+                data.detected_language = self._language_name(language)
+
+        journal = None
+        if self.journal_dir and data.file_path:
+            journal = JobJournal.for_document(data.file_path, self.journal_dir, logger=self.logger)
+        # language code the pages are indexed with, unknown when detection failed
+        language = lang[data.detected_language] if data.detected_language else \
+            lang.get(core.get_value(data.source_language_value), '')
+        if self.search_index is not None and data.file_path:
+            self.search_index.remove_document(data.file_path)
+        return converter, journal, language
+
+    def convert_and_translate(self, sender, data: Payload):
+        """
+        Callback function, converts the selected file and translates every page as soon as it is converted, instead of
+        waiting for the whole file (see Pipeline). Queues _convert_and_translate on the job scheduler.
+        :param sender:
+        :param data: Payload object
+        :return: None
+        """
+        self._delete_widgets(data.delete)
+        self._disable_widgets(data.disable)
+        self.scheduler.submit(data.parent, self._convert_and_translate, data,
+                              on_done=self._convert_file_return_callback)
+
+    def _convert_and_translate(self, job: Job, data: Payload):
+        """
+        The async part of the convert_and_translate function. Pages and their translations are appended to the pages
+        displayed by the window as soon as they are ready.
+        :param job: the job running the conversion and translation
+        :param data: Payload object
+        :return: the Payload object, with the converted pages
+        """
+        converter, journal, source_lang = self._prepare_conversion(data)
+        if not source_lang:
+            if journal is not None:
+                journal.close()
+            # failing the job re-enables the widgets of the window (see _job_succeeded)
+            raise ValueError('Could not detect the source language, please select it.')
+        destination_lang = lang[core.get_value(data.destination_language_value)]
+        translation_method = core.get_value('translation_method')
+        authentication = {'token': core.get_value('api_token')}
+        pages = self.pages[data.value_name] = []
+        translated_pages = self.pages[data.destination_value_name] = []
+        errors = self.page_errors[data.destination_value_name] = {}
+
+        def on_page(page_number: int, page: str):
+            pages.append(page)
+            if self.search_index is not None:
+                self.search_index.add_page(data.file_path, page_number, page, language=source_lang)
+            job.report(len(pages) + len(translated_pages))
+
+        def on_translation(page_number: int, translated_page: str):
+            translated_pages.append(translated_page)
+            if self.search_index is not None:
+                self.search_index.add_page(data.file_path, page_number, translated_page, kind='translation',
+                                           language=destination_lang)
+            job.report(len(pages) + len(translated_pages))
+
+        pipeline = Pipeline(
+            lambda page_number, page: self.translator.translate(page, source_lang, destination_lang,
+                                                                translation_method=translation_method,
+                                                                authentication=authentication),
+            workers=self.translate_workers, metrics=self.metrics, logger=self.logger
+        )
+        try:
+            # progress counts both the converted and the translated pages
+            job.report(0, 2 * converter.page_count(data.file_path))
+            pipeline.run(converter.iter_file(path=data.file_path, journal=journal), on_page=on_page,
+                         on_translation=on_translation)
+        except (ApiError, UnsupportedLanguagePair) as e:
+            self.logger.error(f'{e}')
+            errors[len(translated_pages) + 1] = f'{e}'
+            translated_pages.append(None)
+        finally:
+            if journal is not None:
+                journal.close()
+        data.pages = pages
+        return data
+
+    def _convert_file_return_callback(self, job: Job):
         """
         The UI synchronous part of the convert_file function. It takes the text generated by the async OCR function and
         displays it in a text window.
-        :param sender: dearpygui sender object
-        :param data: Payload object
+        :param job: the finished job, its result is the Payload object returned by _convert_file
         :return: None
         """
+        if not self._job_succeeded(job):
+            return
+        data: Payload = job.result
         if not data.pages:
             self.logger.error("No file selected or file is of the wrong type.")
+            self._enable_widgets(data.disable)
             return
+        if data.detected_language:
+            core.set_value(data.source_language_value, data.detected_language)
 
-        full_text = ''
-        for page in data.pages:
-            full_text = f'{page} - - - - - \n{full_text}'
-        core.set_value(data.value_name, full_text)
         self._enable_widgets(data.enable)
 
     def translate_text(self, sender, data: Payload):
         """
-        Will use data.value_name (as a key) to get text in the value storage.
-        It will then asynchronously translate the text.
+        Will use data.value_name (as a key) to get the converted pages.
+        It will then asynchronously translate the pages.
         The source language is defined in the data.source_language attribute
         The destination language is defined in the data.destination_language
-        The translated text is stored back into a value storage using data.destination_value_name as a key
+        The translated pages are stored back in self.pages using data.destination_value_name as a key
         :param sender:
         :param data: Payload object containing the text and source+destination languages
         :return:
         """
         self._disable_widgets(data.disable)
 
-        text = core.get_value(data.value_name)
-        data.text = text
-        core.run_async_function(self._translate_text, data, return_handler=self._translate_text_callback)
+        data.pages = list(self.pages[data.value_name])
+        self.scheduler.submit(data.parent, self._translate_text, data, on_done=self._translate_text_callback)
         return data
 
-    def _translate_text(self, sender, data: Payload):
+    def _translate_text(self, job: Job, data: Payload):
         """
         Asynchronous portion of the translate_text method.
-        This is when the API is executed. The results are passed to the callback in the data.text attribute.
-        :param sender:
-        :param data: Payload object used to pass the translated text.
+        This is when the API is executed. Pages are translated one by one and appended to the translated pages of the
+        window as soon as they are ready.
+        :param job: the job running the translation
+        :param data: Payload object containing the pages to translate
         :return:
         """
-        source_lang = lang[core.get_value(data.source_language_value)]
+        source_lang = core.get_value(data.source_language_value)
+        if source_lang == AUTO_DETECT_LABEL:
+            source_lang = detect_language('\n'.join(data.pages[:3]))
+            if source_lang is None:
+                self.logger.error('Could not detect the source language, please select it.')
+                return data
+        else:
+            source_lang = lang[source_lang]
         destination_lang = lang[core.get_value(data.destination_language_value)]
-        try:
-            translated_text = self.translator.translate(data.text, source_lang, destination_lang,
-                                                    translation_method=core.get_value('translation_method'),
-                                                    authentication={'token': core.get_value('api_token')})
-        except ApiError as e:
-            self.logger.error(f'API error: {e}')
-            translated_text = f'{e}'
-
-        data.text = translated_text
+        translated_pages = self.pages[data.destination_value_name] = []
+        errors = self.page_errors[data.destination_value_name] = {}
+        job.report(0, len(data.pages))
+        for page in data.pages:
+            try:
+                translated_page = self.translator.translate(page, source_lang, destination_lang,
+                                                            translation_method=core.get_value('translation_method'),
+                                                            authentication={'token': core.get_value('api_token')})
+            except ApiError as e:
+                self.logger.error(f'API error: {e}')
+                errors[len(translated_pages) + 1] = f'{e}'
+                translated_pages.append(None)
+                break
+            except UnsupportedLanguagePair as e:
+                self.logger.error(f'{e}')
+                errors[len(translated_pages) + 1] = f'{e}'
+                translated_pages.append(None)
+                break
+            translated_pages.append(translated_page)
+            if self.search_index is not None and data.file_path:
+                self.search_index.add_page(data.file_path, len(translated_pages), translated_page, kind='translation',
+                                           language=destination_lang)
+            job.report(len(translated_pages))
         return data
 
-    def _translate_text_callback(self, sender, data: Payload):
+    def _translate_text_callback(self, job: Job):
         """
         The callback portion of the translate_text method.
         Here the translated text is taken from data and put into the value storage with key data.destination_value_name.
-        :param sender:
-        :param data: Payload object
+        :param job: the finished job, its result is the Payload object returned by _translate_text
         :return:
         """
-        core.set_value(data.destination_value_name, data.text)
+        if not self._job_succeeded(job):
+            return
+        data: Payload = job.result
         self._enable_widgets(data.enable)
 
+    @staticmethod
+    def _language_name(code: str) -> str:
+        """
+        Helper function returning the name of a language (as displayed in the language combos) given its code.
+        :param code: language code (eg. 'de')
+        :return: language name (eg. 'German')
+        """
+        return next((name for name, language_code in lang.items() if language_code == code), '')
+
+    def search_library(self, sender, data):
+        """
+        Callback function, searches the search index for the words typed in the search box and lists the matching pages
+        in the search results window. Searches are fast enough to run in the UI thread.
+        :param sender:
+        :param data:
+        :return:
+        """
+        query = core.get_value('search_query')
+        results = self.search_index.search(query, limit=50)
+        lines = [f"{os.path.basename(result['path'])} p.{result['page']} ({result['kind']}"
+                 f"{', ' + result['language'] if result['language'] else ''}): {result['snippet']}"
+                 for result in results]
+        text = '\n\n'.join(lines) if lines else f'No page matches "{query}"'
+        if not core.does_item_exist(SEARCH_WINDOW_TITLE):
+            core.add_value('search_results', '')
+            with simple.window(SEARCH_WINDOW_TITLE, width=600, height=400, x_pos=200, y_pos=100):
+                core.add_text('search_results_text', source='search_results', wrap=580)
+        core.set_value('search_results', text)
+        core.configure_item(SEARCH_WINDOW_TITLE, show=True)
+
+    def cancel_jobs(self, sender, data: Payload):
+        """
+        Cancels the running and queued jobs of a convert window.
+        :param sender:
+        :param data: Payload object, data.parent is the window title
+        :return:
+        """
+        self.scheduler.cancel(data.parent)
+
+    def _job_succeeded(self, job: Job) -> bool:
+        """
+        Helper function used by job callbacks. When the job was cancelled or failed, the widgets disabled when it was
+        submitted are enabled again.
+        :param job: finished job
+        :return: True if the job completed successfully
+        """
+        data: Payload = job.args[0]
+        if job.cancelled or job.error is not None:
+            self.logger.info(f'{data.parent}: job {"cancelled" if job.cancelled else "failed"}')
+            self._set_progress(job.queue, 0.0, 'Cancelled' if job.cancelled else 'Failed')
+            self._enable_widgets(data.disable)
+            return False
+        self._set_progress(job.queue, 1.0, 'Done')
+        return True
+
+    def _set_progress(self, queue: str, value: float, overlay: str):
+        """
+        Helper function updating the progress bar of a convert window.
+        :param queue: job queue name (window title)
+        :param value: progress between 0 and 1
+        :param overlay: text displayed over the progress bar
+        :return:
+        """
+        if queue in self.progress_bars:
+            core.set_value(self.progress_bars[queue], value)
+            core.configure_item(self.progress_bars[queue], overlay=overlay)
+
+    def _on_render(self, sender, data):
+        """
+        Render callback, called every frame from the UI thread.
+        It runs the callbacks of finished jobs and updates the progress bars of the running ones.
+        :param sender:
+        :param data:
+        :return:
+        """
+        self.scheduler.poll()
+        self._refresh_page_selectors()
+        for queue in self.progress_bars:
+            jobs = self.scheduler.jobs(queue)
+            if jobs:
+                overlay = f'{jobs[0].done_count}/{jobs[0].total}' if jobs[0].total else 'Starting...'
+                if len(jobs) > 1:
+                    overlay += f' (+{len(jobs) - 1} queued)'
+                self._set_progress(queue, jobs[0].progress, overlay)
+
     def select_file(self, sender, data):
         """
         Sets the selected file path so it can be used later on.
         This sets a global variable containing the path to the currently select image. This image will be converted to
-        text by OCR once the user presses the convert image button.
+        text by OCR once the user presses the convert image button. Saved books are opened as they are.
         :param sender: dearpygui sender object
         :param data: data should be the image path object of format ["path/to/directory", "file_name.png"]
         :return: None
         """
+        if data[1].endswith(DOCUMENT_EXTENSION):
+            self.open_document(os.path.join(*data))
+            return
         payload = Payload()
         payload.file_path = os.path.join(*data)
         payload.file_name = data[1]
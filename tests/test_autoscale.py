@@ -0,0 +1,71 @@
+import pytest
+
+from polybiblioglot.components import autoscale
+from polybiblioglot.components.autoscale import OcrAutoscaler
+
+GIB = 2 ** 30
+
+
+@pytest.fixture
+def machine(monkeypatch):
+    """
+    An 8 core machine with 16 GiB of memory. Set machine['available'] to change the available memory.
+    """
+    memory = {'available': 12 * GIB}
+    monkeypatch.setattr(autoscale.os, 'cpu_count', lambda: 8)
+    monkeypatch.setattr(autoscale, 'total_memory', lambda: 16 * GIB)
+    monkeypatch.setattr(autoscale, 'available_memory', lambda: memory['available'])
+    return memory
+
+
+def ocr_pages(autoscaler: OcrAutoscaler, wall: float, cpu: float, rss: int = GIB // 4):
+    for _ in range(autoscaler.window):
+        autoscaler.acquire()
+        autoscaler.release(wall, cpu, rss)
+
+
+def test_starts_at_half_speed(machine):
+    autoscaler = OcrAutoscaler(window=2)
+    assert (autoscaler.workers, autoscaler.threads) == (4, 2)
+    assert autoscaler.reserve == int(1.6 * GIB)
+
+
+def test_scales_up_while_cpus_and_memory_allow(machine):
+    autoscaler = OcrAutoscaler(window=2)
+    ocr_pages(autoscaler, wall=1, cpu=2)
+    assert (autoscaler.workers, autoscaler.threads) == (5, 1)
+    assert autoscaler.rss == GIB // 4
+    for _ in range(5):
+        ocr_pages(autoscaler, wall=1, cpu=1)
+    # never more pages at once than CPUs
+    assert (autoscaler.workers, autoscaler.threads) == (8, 1)
+
+
+def test_unused_threads_go_to_more_workers(machine):
+    autoscaler = OcrAutoscaler(window=2)
+    ocr_pages(autoscaler, wall=2, cpu=1)
+    assert (autoscaler.workers, autoscaler.threads) == (5, 1)
+
+
+def test_scales_down_when_oversubscribed(machine):
+    autoscaler = OcrAutoscaler(window=2)
+    autoscaler.workers, autoscaler.threads = 8, 1
+    ocr_pages(autoscaler, wall=1, cpu=0.3)
+    assert (autoscaler.workers, autoscaler.threads) == (7, 1)
+
+
+def test_scales_down_when_memory_runs_low(machine):
+    autoscaler = OcrAutoscaler(window=2)
+    # two workers' worth of memory missing from the reserve
+    machine['available'] = autoscaler.reserve - 2 * GIB
+    ocr_pages(autoscaler, wall=1, cpu=2, rss=GIB)
+    assert (autoscaler.workers, autoscaler.threads) == (2, 4)
+
+
+def test_failed_pages_are_not_measured(machine):
+    autoscaler = OcrAutoscaler(window=2)
+    for _ in range(4):
+        autoscaler.acquire()
+        autoscaler.release()
+    assert (autoscaler.workers, autoscaler.threads) == (4, 2)
+    assert autoscaler.rss is None
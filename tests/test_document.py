@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from polybiblioglot.components import DocumentReader, DocumentWriter, InvalidDocument, save_document
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = os.path.join(str(tmp_path), 'book.pbg')
+    save_document(path, ['Erste Seite', 'Zweite Seite', 'Dritte Seite'], translations=['Page one', 'Page two'],
+                  confidences=[91.5], metadata={'source': 'de', 'destination': 'en'})
+    return path
+
+
+def test_round_trip(document):
+    with DocumentReader(document) as reader:
+        assert len(reader) == 3
+        assert reader.translation_count == 2
+        assert reader.metadata['source'] == 'de' and 'created' in reader.metadata
+        assert reader.page(2) == 'Zweite Seite'
+        assert reader.page(2, 'translation') == 'Page two'
+        assert list(reader.pages()) == ['Erste Seite', 'Zweite Seite', 'Dritte Seite']
+        assert reader.pages('translation')[-1] == 'Page two'
+        assert reader.pages()[1:] == ['Zweite Seite', 'Dritte Seite']
+        assert reader.confidence(1) == 91.5
+        assert reader.confidence(2) is None
+        with pytest.raises(IndexError):
+            reader.page(3, 'translation')
+        with pytest.raises(IndexError):
+            reader.page(4)
+
+
+def test_translations_must_be_a_prefix(tmp_path):
+    path = os.path.join(str(tmp_path), 'book.pbg')
+    with pytest.raises(ValueError):
+        with DocumentWriter(path) as writer:
+            writer.add_page('one')
+            writer.add_page('two', translation='deux')
+    # the interrupted save left nothing behind
+    assert os.listdir(str(tmp_path)) == []
+
+
+@pytest.mark.parametrize('size', [0, 10, 100])
+def test_truncated_documents_are_rejected(document, size):
+    with open(document, 'rb') as f:
+        data = f.read()
+    with open(document, 'wb') as f:
+        f.write(data[:size])
+    with pytest.raises(InvalidDocument):
+        DocumentReader(document)
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = os.path.join(str(tmp_path), 'book.pbg')
+    with open(path, 'wb') as f:
+        f.write(b'%PDF-1.4' + b'\0' * 100)
+    with pytest.raises(InvalidDocument):
+        DocumentReader(path)
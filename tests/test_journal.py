@@ -0,0 +1,55 @@
+import os
+import sqlite3
+
+from polybiblioglot.components.journal import JobJournal
+
+
+def test_pages_are_keyed_on_settings():
+    journal = JobJournal(':memory:')
+    journal.record_page(1, 'page one', settings='a')
+    journal.record_page(2, 'page two', settings='a')
+    journal.record_page(2, 'page two again', settings='b')
+    assert journal.pages('a') == {1: 'page one'}
+    assert journal.pages('b') == {2: 'page two again'}
+    assert journal.pages('c') == {}
+
+
+def test_translations_are_tied_to_their_text():
+    journal = JobJournal(':memory:')
+    journal.record_translation(1, 'Hallo Welt', 'Bonjour le monde', 'de', 'fr', 'ibm')
+    assert journal.translation(1, 'Hallo Welt', 'de', 'fr', 'ibm') == 'Bonjour le monde'
+    # the page was OCR'd again and reads differently
+    assert journal.translation(1, 'Hallo Welt!', 'de', 'fr', 'ibm') is None
+    assert journal.translation(1, 'Hallo Welt', 'de', 'en', 'ibm') is None
+    assert journal.translation(1, 'Hallo Welt', 'de', 'fr', 'translator') is None
+    assert journal.translation(2, 'Hallo Welt', 'de', 'fr', 'ibm') is None
+
+
+def test_for_document_changes_with_the_document(tmp_path):
+    document = os.path.join(str(tmp_path), 'book.pdf')
+    with open(document, 'wb') as f:
+        f.write(b'first version')
+    journal = JobJournal.for_document(document, directory=str(tmp_path))
+    journal.record_page(1, 'text')
+    path = journal.path
+    journal.close()
+    assert JobJournal.for_document(document, directory=str(tmp_path)).pages() == {1: 'text'}
+    with open(document, 'wb') as f:
+        f.write(b'second, longer version')
+    assert JobJournal.for_document(document, directory=str(tmp_path)).path != path
+
+
+def test_translations_of_old_journals_are_ignored(tmp_path):
+    path = os.path.join(str(tmp_path), 'journal.sqlite3')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE translations (page INTEGER NOT NULL, source TEXT NOT NULL, '
+                       'destination TEXT NOT NULL, backend TEXT NOT NULL, translation TEXT NOT NULL, '
+                       'PRIMARY KEY (page, source, destination, backend))')
+    connection.execute("INSERT INTO translations VALUES (1, 'de', 'fr', 'ibm', 'Bonjour')")
+    connection.commit()
+    connection.close()
+    journal = JobJournal(path)
+    assert journal.translation(1, 'Hallo', 'de', 'fr', 'ibm') is None
+    journal.record_translation(1, 'Hallo', 'Salut', 'de', 'fr', 'ibm')
+    assert journal.translation(1, 'Hallo', 'de', 'fr', 'ibm') == 'Salut'
+    journal.close()
@@ -0,0 +1,47 @@
+import numpy as np
+from PIL import Image, ImageDraw
+
+from polybiblioglot.components.page_filter import PageFilter, PAGE_KEPT, PAGE_BLANK, PAGE_DUPLICATE
+
+
+def sparse_page(last_glyph: str = 'bar', body_lines: int = 0, noise: float = 0, seed: int = 0):
+    """
+    Draws a 1700x2200 page holding a heading (a row of glyph sized blocks) and optionally a few lines of body text.
+    Pages drawn with a different last_glyph only differ by a single character of their heading.
+    """
+    image = Image.new('L', (1700, 2200), 255)
+    draw = ImageDraw.Draw(image)
+    for x in range(600, 960, 45):
+        draw.rectangle((x, 300, x + 30, 360), fill=0)
+    if last_glyph == 'bar':
+        draw.rectangle((975, 300, 985, 360), fill=0)
+    elif last_glyph == 'ring':
+        draw.ellipse((960, 300, 1000, 360), outline=0, width=8)
+    for line in range(body_lines):
+        for x in range(200, 1500, 60):
+            draw.rectangle((x, 500 + line * 45, x + 40, 520 + line * 45), fill=0)
+    if noise:
+        pixels = np.asarray(image, dtype=np.float32) + np.random.default_rng(seed).normal(0, noise, (2200, 1700))
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    return image.convert('RGB')
+
+
+def test_blank_page():
+    page_filter = PageFilter()
+    assert page_filter.check(Image.new('RGB', (1700, 2200), 'white'), 1) == (PAGE_BLANK, None)
+    assert page_filter.skipped == {1: PAGE_BLANK}
+
+
+def test_rescanned_page_is_a_duplicate():
+    page_filter = PageFilter()
+    assert page_filter.check(sparse_page(body_lines=5), 1) == (PAGE_KEPT, None)
+    assert page_filter.check(sparse_page(body_lines=5, noise=6, seed=1), 2) == (PAGE_DUPLICATE, 1)
+    assert page_filter.skipped == {2: f'{PAGE_DUPLICATE} of page 1'}
+
+
+def test_near_identical_sparse_pages_are_kept():
+    page_filter = PageFilter()
+    pages = [sparse_page('bar'), sparse_page('ring'), sparse_page(None), sparse_page('bar', body_lines=5),
+             sparse_page('bar', body_lines=6)]
+    assert [page_filter.check(page, number) for number, page in enumerate(pages, start=1)] == [(PAGE_KEPT, None)] * 5
+    assert page_filter.skipped == {}
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from polybiblioglot.components.translation_backends import UnsupportedLanguagePair
+from polybiblioglot.components.translator import MultiTranslator
+
+
+@pytest.fixture
+def translator(tmp_path):
+    with open(os.path.join(str(tmp_path), 'de-fr.tsv'), 'w', encoding='utf-8') as f:
+        f.write('# German to French\n'
+                'guten tag\tbonjour\n'
+                'guten\tbon\n'
+                'Welt\tmonde\n'
+                'die\tle\n'
+                'Hund\tchien\n'
+                'ignored line without a tab\n')
+    return MultiTranslator('phrase_table', phrase_table_dir=str(tmp_path))
+
+
+def test_longest_phrases_are_replaced(translator):
+    assert translator.translate('Guten Tag, die Welt!', 'de', 'fr') == 'Bonjour, le monde!'
+    assert translator.translate('Die guten Hund', 'de', 'fr') == 'Le bon chien'
+
+
+def test_unknown_words_and_punctuation_are_kept(translator):
+    assert translator.translate('Die Katze. Die Welt?', 'de', 'fr') == 'Le Katze. Le monde?'
+
+
+def test_phrases_never_span_punctuation(translator):
+    # "guten" and "Tag" are separated by a comma, so "guten tag" doesn't apply
+    assert translator.translate('die guten, Tag', 'de', 'fr') == 'le bon, Tag'
+
+
+def test_pairs_and_unsupported_pair(translator):
+    backend = translator.backend('phrase_table')
+    assert backend.pairs == {('de', 'fr')}
+    assert backend.supports('de', 'fr') and not backend.supports('fr', 'de')
+    with pytest.raises(UnsupportedLanguagePair):
+        translator.translate('Bonjour', 'fr', 'de')
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from polybiblioglot.components.preprocess import grayscale_pixels, Preprocessor
+
+
+def page(mode: str):
+    """
+    Draws a white page with a black block of text-like ink in the given mode.
+    """
+    image = Image.new('L', (400, 300), 255)
+    ImageDraw.Draw(image).rectangle((100, 100, 300, 120), fill=0)
+    if mode == 'I;16':
+        return Image.frombytes('I;16', image.size, (np.asarray(image, dtype='<u2') * 257).tobytes())
+    if mode == 'P':
+        return image.convert('RGB').convert('P', palette=Image.ADAPTIVE)
+    return image.convert(mode)
+
+
+@pytest.mark.parametrize('mode', ['L', 'LA', 'P', 'RGB', 'RGBA', 'I;16', '1'])
+def test_grayscale_pixels(mode):
+    gray = grayscale_pixels(page(mode))
+    assert gray.shape == (300, 400)
+    assert gray[0, 0] == pytest.approx(255, abs=1)
+    assert gray[110, 200] == pytest.approx(0, abs=1)
+
+
+@pytest.mark.parametrize('mode', ['LA', 'P', 'I;16'])
+def test_binarize(mode):
+    image = Preprocessor(binarize=True).process(page(mode))
+    assert image.mode == '1'
+    ink = ~np.asarray(image)
+    assert ink[110, 200] and not ink[0, 0] and not ink[200, 200]
@@ -0,0 +1,29 @@
+from polybiblioglot.components.search_index import SearchIndex
+
+
+def test_to_match_query():
+    assert SearchIndex.to_match_query('hello world') == '"hello" "world"'
+    assert SearchIndex.to_match_query('"exact phrase" transl*') == '"exact phrase" "transl"*'
+    assert SearchIndex.to_match_query('say "" * ') == '"say"'
+    assert SearchIndex.to_match_query('') == ''
+
+
+def test_to_match_query_escapes_fts_syntax():
+    assert SearchIndex.to_match_query('AND OR NOT') == '"AND" "OR" "NOT"'
+    assert SearchIndex.to_match_query('wo"rd (x)') == '"wo""rd" "(x)"'
+    assert SearchIndex.to_match_query('col:umn') == '"col:umn"'
+
+
+def test_search(tmp_path):
+    index = SearchIndex(str(tmp_path / 'index.sqlite3'))
+    index.add_document('/books/a.pdf', ['Der Hund schläft.', 'Die Übersetzung ist fertig.'], language='de')
+    index.add_page('/books/a.pdf', 1, 'Le chien dort.', kind='translation', language='fr')
+    assert [(result['path'], result['page']) for result in index.search('hund')] == [('/books/a.pdf', 1)]
+    assert [result['page'] for result in index.search('ubersetz*')] == [2]
+    assert [result['kind'] for result in index.search('chien', kind='translation')] == ['translation']
+    assert index.search('chien', language='de') == []
+    assert index.search('wo"rd (x) AND NEAR') == []
+    assert index.search('"hund schläft"')[0]['snippet'] == 'Der [Hund schläft].'
+    index.remove_document('/books/a.pdf')
+    assert index.search('hund') == []
+    index.close()
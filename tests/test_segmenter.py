@@ -0,0 +1,34 @@
+from polybiblioglot.components.segmenter import split_paragraph, segment_text, join_segments, pack_segments
+
+
+def test_short_paragraph_is_kept_whole():
+    assert split_paragraph('One  sentence.\nTwo sentences.', 100) == ['One sentence. Two sentences.']
+    assert split_paragraph('   ', 100) == []
+
+
+def test_long_paragraph_is_split_on_sentences():
+    paragraph = 'First sentence here. Second sentence here! Third one? Fourth.'
+    segments = split_paragraph(paragraph, 30)
+    assert segments == ['First sentence here.', 'Second sentence here!', 'Third one? Fourth.']
+    assert all(len(segment) <= 30 for segment in segments)
+
+
+def test_sentence_without_boundary_is_split_on_whitespace():
+    segments = split_paragraph('word ' * 20, 22)
+    assert all(len(segment) <= 22 for segment in segments)
+    assert ' '.join(segments).split() == ['word'] * 20
+    assert split_paragraph('x' * 25, 10) == ['x' * 10, 'x' * 10, 'x' * 5]
+
+
+def test_segment_and_join_round_trip():
+    text = 'First paragraph. It has two sentences.\n\n\n\nSecond paragraph.\n  \n'
+    paragraphs = segment_text(text, 20)
+    assert paragraphs == [['First paragraph.', 'It has two', 'sentences.'], ['Second paragraph.']]
+    assert join_segments(paragraphs) == 'First paragraph. It has two sentences.\n\nSecond paragraph.'
+
+
+def test_pack_segments_respects_limits():
+    segments = ['aaaa', 'bbbb', 'cc', 'dddddd', 'e']
+    assert pack_segments(segments, max_chars=10, max_segments=10) == [['aaaa', 'bbbb', 'cc'], ['dddddd', 'e']]
+    assert pack_segments(segments, max_chars=100, max_segments=2) == [['aaaa', 'bbbb'], ['cc', 'dddddd'], ['e']]
+    assert pack_segments([], max_chars=10, max_segments=2) == []
@@ -0,0 +1,37 @@
+import pytest
+
+from polybiblioglot.components import throttle
+from polybiblioglot.components.throttle import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Replaces the clock of the throttle module with a fake one, sleeping advances it instantly.
+    """
+    now = [0.0]
+    monkeypatch.setattr(throttle.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(throttle.time, 'sleep', lambda seconds: now.__setitem__(0, now[0] + seconds))
+    return now
+
+
+def test_burst_up_to_capacity_then_rate(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert clock[0] == pytest.approx(1.0)
+
+
+def test_tokens_refill_up_to_capacity(clock):
+    bucket = TokenBucket(rate=1)
+    assert bucket.capacity == 1
+    assert bucket.acquire() == 0
+    clock[0] += 10
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
@@ -0,0 +1,31 @@
+import os
+
+from polybiblioglot.components.translation_memory import TranslationMemory
+
+
+def test_whitespace_is_normalized():
+    memory = TranslationMemory(':memory:')
+    memory.put('Guten  Tag,\nWelt', 'Bonjour, monde', 'de', 'fr', 'ibm')
+    assert memory.get('Guten Tag, Welt', 'de', 'fr', 'ibm') == 'Bonjour, monde'
+    assert memory.get('  Guten Tag,   Welt ', 'de', 'fr', 'ibm') == 'Bonjour, monde'
+
+
+def test_entries_are_keyed_on_languages_and_backend():
+    memory = TranslationMemory(':memory:')
+    memory.put('Hallo', 'Bonjour', 'de', 'fr', 'ibm')
+    assert memory.get('Hallo', 'de', 'en', 'ibm') is None
+    assert memory.get('Hallo', 'de', 'fr', 'translator') is None
+    assert memory.get('Hallo', 'nl', 'fr', 'ibm') is None
+    memory.put('Hallo', 'Salut', 'de', 'fr', 'ibm')
+    assert memory.get('Hallo', 'de', 'fr', 'ibm') == 'Salut'
+    assert memory.stats() == {'hits': 1, 'misses': 3, 'hit_rate': 0.25, 'entries': 1}
+
+
+def test_memory_persists(tmp_path):
+    path = os.path.join(str(tmp_path), 'memory', 'tm.sqlite3')
+    memory = TranslationMemory(path)
+    memory.put('Hallo', 'Bonjour', 'de', 'fr', 'ibm')
+    memory.close()
+    memory = TranslationMemory(path)
+    assert memory.get('Hallo', 'de', 'fr', 'ibm') == 'Bonjour'
+    memory.close()
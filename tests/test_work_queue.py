@@ -0,0 +1,80 @@
+from polybiblioglot.components import Converter, Preprocessor
+from polybiblioglot.components.work_queue import WorkQueue, TASK_OCR, TASK_TRANSLATE
+from polybiblioglot.distributed import QueueWorker
+
+
+def test_ocr_tasks_lead_to_translation_tasks():
+    queue = WorkQueue(':memory:')
+    assert queue.add_document('/books/a.pdf', 2, {'source': 'de', 'destination': 'fr'})
+    assert not queue.add_document('/books/a.pdf', 2, {'source': 'de', 'destination': 'fr'})
+    tasks = queue.lease('w1', limit=10)
+    assert [(task['page'], task['kind']) for task in tasks] == [(1, TASK_OCR), (2, TASK_OCR)]
+    assert tasks[0]['options'] == {'source': 'de', 'destination': 'fr'}
+    assert queue.lease('w2') == []
+
+    assert queue.complete(tasks[0]['id'], 'w1', 'Seite eins')
+    translation, = queue.lease('w2')
+    assert (translation['page'], translation['kind'], translation['text']) == (1, TASK_TRANSLATE, 'Seite eins')
+    assert queue.complete(translation['id'], 'w2', 'Page un')
+    assert not queue.document_status('/books/a.pdf')['finished']
+
+    assert queue.complete(tasks[1]['id'], 'w1', 'Seite zwei')
+    translation, = queue.lease('w2')
+    assert queue.complete(translation['id'], 'w2', 'Page deux')
+    assert queue.document_status('/books/a.pdf')['finished']
+    assert queue.results('/books/a.pdf') == {1: 'Seite eins', 2: 'Seite zwei'}
+    assert queue.results('/books/a.pdf', TASK_TRANSLATE) == {1: 'Page un', 2: 'Page deux'}
+
+
+def test_expired_leases_go_to_another_worker():
+    queue = WorkQueue(':memory:', lease_seconds=-1)
+    queue.add_document('/books/a.pdf', 1)
+    task, = queue.lease('w1')
+    task_again, = queue.lease('w2')
+    assert task_again['id'] == task['id']
+    # w1 lost its lease, its result is dropped
+    assert not queue.complete(task['id'], 'w1', 'late')
+    assert not queue.fail(task['id'], 'w1', 'late')
+    assert queue.complete(task['id'], 'w2', 'text')
+    assert queue.results('/books/a.pdf') == {1: 'text'}
+
+
+def test_tasks_are_given_up_after_max_attempts():
+    queue = WorkQueue(':memory:', lease_seconds=-1, max_attempts=2)
+    queue.add_document('/books/a.pdf', 1)
+    queue.lease('w1')
+    queue.lease('w2')
+    assert queue.lease('w3') == []
+    status = queue.document_status('/books/a.pdf')
+    assert status['failed'] == 1 and status['finished']
+    assert status['errors'] == ['page 1 (ocr): lease expired 2 times']
+
+
+def test_failed_tasks_are_retried_until_max_attempts():
+    queue = WorkQueue(':memory:', max_attempts=2)
+    queue.add_document('/books/a.pdf', 1)
+    task, = queue.lease('w1')
+    assert queue.fail(task['id'], 'w1', 'tesseract crashed')
+    assert queue.document_status('/books/a.pdf')['pending'] == 1
+    task, = queue.lease('w1')
+    assert queue.fail(task['id'], 'w1', 'tesseract crashed again')
+    assert queue.lease('w1') == []
+    status = queue.document_status('/books/a.pdf')
+    assert status['finished']
+    assert status['errors'] == ['page 1 (ocr): tesseract crashed again']
+
+
+def test_workers_apply_the_settings_of_the_tasks():
+    converter = Converter(workers=1, profile='fast', preprocessor=Preprocessor.from_steps('binarize'))
+    worker = QueueWorker(WorkQueue(':memory:'), converter)
+    preprocessor = Preprocessor(grayscale=True, deskew=True, margin=5)
+    task_converter = worker._converter({'profile': 'accurate', 'ocr_backend': 'tesserocr',
+                                        'preprocess': preprocessor.to_dict()})
+    assert task_converter.profile.name == 'accurate'
+    assert task_converter.ocr_backend == 'tesserocr'
+    assert task_converter.preprocessor.settings == preprocessor.settings
+    assert worker._converter({'profile': 'accurate', 'ocr_backend': 'tesserocr', 'preprocess': None}).preprocessor is None
+    # tasks queued before the settings were sent keep the worker's own
+    assert worker._converter({'profile': 'fast'}).preprocessor.steps == ['binarize']
+    assert converter.profile.name == 'fast' and converter.ocr_backend != 'tesserocr'
+    converter.close()